@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Callable
+
+from .data import snapshot
+from .database import init_db
+from .services import maintenance, progress_transfer
+
+
+def _export(args: argparse.Namespace) -> int:
+    init_db()
+    if args.output == "-":
+        progress_transfer.write_export(args.format, sys.stdout.buffer, args.chunk_size)
+        return 0
+    with open(args.output, "wb") as output:
+        progress_transfer.write_export(args.format, output, args.chunk_size)
+    return 0
+
+
+def _import(args: argparse.Namespace) -> int:
+    init_db()
+    source = Path(args.source)
+    if source.suffix == ".db":
+        rows = progress_transfer.read_database(source, args.chunk_size)
+        stats = progress_transfer.import_rows(
+            rows, email_override=args.email, chunk_size=args.chunk_size
+        )
+    else:
+        with open(source, "rb") as lines:
+            stats = progress_transfer.import_rows(
+                progress_transfer.read_ndjson(lines, require_email=args.email is None),
+                email_override=args.email,
+                chunk_size=args.chunk_size,
+            )
+    print(json.dumps(stats, ensure_ascii=False))
+    return 0
+
+
+def _build_snapshot(args: argparse.Namespace) -> int:
+    for path, tasks in snapshot.build(Path(args.output) if args.output else None):
+        print(json.dumps({"path": str(path), "tasks": tasks}, ensure_ascii=False))
+    return 0
+
+
+def _print_progress(status: dict) -> None:
+    if status.get("pages_total"):
+        print(f"\r{status['pages_done']}/{status['pages_total']} страниц", end="", file=sys.stderr, flush=True)
+    elif status.get("step"):
+        print(f"{status['step']}…", file=sys.stderr, flush=True)
+
+
+def _backup(args: argparse.Namespace) -> int:
+    result = maintenance.backup(
+        Path(args.output) if args.output else None, pages=args.pages, progress=_print_progress
+    )
+    print(file=sys.stderr)
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+def _vacuum(args: argparse.Namespace) -> int:
+    result = maintenance.vacuum(analyze_only=args.analyze_only, progress=_print_progress)
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Служебные команды тренажёра")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Выгрузить прогресс всех пользователей")
+    export.add_argument("--format", choices=progress_transfer.EXPORT_FORMATS, default="ndjson")
+    export.add_argument("--output", default="-", help="Файл для записи, '-' — stdout")
+    export.add_argument("--chunk-size", type=int, default=progress_transfer.DEFAULT_CHUNK_SIZE)
+    export.set_defaults(handler=_export)
+
+    load = commands.add_parser("import", help="Загрузить прогресс из NDJSON или app.db")
+    load.add_argument("source", help="Файл .ndjson или база app.db десктопного приложения")
+    load.add_argument("--email", help="Привязать все записи к пользователю с этим email")
+    load.add_argument("--chunk-size", type=int, default=progress_transfer.DEFAULT_CHUNK_SIZE)
+    load.set_defaults(handler=_import)
+
+    build = commands.add_parser("build-snapshot", help="Собрать снимки курсов каталога задач")
+    build.add_argument(
+        "--output", help="Каталог для снимков (по умолчанию VISHMAT_CATALOG_SNAPSHOTS или app/data/snapshots)"
+    )
+    build.set_defaults(handler=_build_snapshot)
+
+    copy = commands.add_parser("backup", help="Резервная копия базы без остановки сервера")
+    copy.add_argument("--output", help="Файл копии (по умолчанию VISHMAT_BACKUP_DIR/app-<время>.db)")
+    copy.add_argument("--pages", type=int, default=maintenance.BACKUP_PAGES, help="Страниц за шаг")
+    copy.set_defaults(handler=_backup)
+
+    compact = commands.add_parser("vacuum", help="VACUUM и ANALYZE базы")
+    compact.add_argument("--analyze-only", action="store_true", help="Только обновить статистику (ANALYZE)")
+    compact.set_defaults(handler=_vacuum)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    handler: Callable[[argparse.Namespace], int] = args.handler
+    return handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,33 @@
 from __future__ import annotations
 
-from datetime import date
+import logging
+from datetime import date, timedelta
 
 from sqlmodel import select
 
 from .database import get_session
-from .models import TopicProgress, User
+from .models import CohortMember, DailyXp, JobAnswer, TopicAccuracy, TopicProgress, User
+from .services import leaderboard, progress_cache, progress_events, sync
+
+logger = logging.getLogger(__name__)
 
 
 DEFAULT_USER_EMAIL = "student@example.com"
+DAILY_XP_WINDOW_DAYS = 7
 
 
 def get_or_create_demo_user() -> User:
+    return get_or_create_user(DEFAULT_USER_EMAIL, "Demo Student")
+
+
+def get_or_create_user(email: str, display_name: str) -> User:
     with get_session() as session:
-        user = session.exec(select(User).where(User.email == DEFAULT_USER_EMAIL)).first()
+        user = session.exec(select(User).where(User.email == email)).first()
         if not user:
-            user = User(email=DEFAULT_USER_EMAIL, display_name="Demo Student")
+            user = User(email=email, display_name=display_name)
             session.add(user)
+            session.flush()
+            sync.record(session, user.id)
             session.commit()
             session.refresh(user)
         return user
@@ -29,8 +40,10 @@ def update_user_settings(user_id: int, preferred_language: str) -> User:
             raise ValueError("User not found")
         user.preferred_language = preferred_language
         session.add(user)
+        sync.record(session, user_id)
         session.commit()
         session.refresh(user)
+        progress_cache.apply_user(user)
         return user
 
 
@@ -41,8 +54,23 @@ def update_daily_goal(user_id: int, minutes: int) -> User:
             raise ValueError("User not found")
         user.daily_goal_minutes = minutes
         session.add(user)
+        sync.record(session, user_id)
         session.commit()
         session.refresh(user)
+        progress_cache.apply_user(user)
+        return user
+
+
+def add_cohort_member(cohort_id: str, user_id: int) -> User:
+    with get_session() as session:
+        user = session.get(User, user_id)
+        if not user:
+            raise ValueError("User not found")
+        if not session.get(CohortMember, (cohort_id, user_id)):
+            session.add(CohortMember(cohort_id=cohort_id, user_id=user_id))
+            session.commit()
+            session.refresh(user)
+        leaderboard.add_cohort_member(cohort_id, user)
         return user
 
 
@@ -53,7 +81,15 @@ def upsert_progress(
     correct: bool,
     difficulty: int,
     time_spent_seconds: int,
+    task_id: str | None = None,
+    job_item: tuple[str, str] | None = None,
 ) -> tuple[User, TopicProgress, dict[str, float]]:
+    """Record one graded answer.
+
+    ``job_item`` (job id, item) marks an answer recorded by a grading job: it is
+    stored in the same transaction, and a job rerun after a crash finds it and
+    leaves the progress as it is.
+    """
     mastery_gain = 0.05 * difficulty if correct else 0.01
     xp_gain = 20 * difficulty if correct else 5
 
@@ -73,6 +109,12 @@ def upsert_progress(
             session.add(progress)
             session.flush()
 
+        if job_item is not None:
+            if session.get(JobAnswer, job_item) is not None:
+                return user, progress, {"xp_gain": xp_gain, "mastery_gain": mastery_gain}
+            session.add(JobAnswer(job_id=job_item[0], item=job_item[1]))
+
+        previous_mastery = progress.mastery
         progress.completed_lessons += 1
         progress.mastery = min(1.0, progress.mastery + mastery_gain)
         if correct:
@@ -89,14 +131,73 @@ def upsert_progress(
 
         session.add(progress)
         session.add(user)
+        sync.record(
+            session,
+            user_id,
+            topic_id,
+            xp=xp_gain,
+            mastery=progress.mastery - previous_mastery,
+            completed_lessons=1,
+            xp_earned=xp_gain,
+        )
         session.commit()
         session.refresh(progress)
         session.refresh(user)
 
+        leaderboard.record_progress(user, progress)
+        progress_cache.apply_answer(
+            user,
+            progress,
+            correct=correct,
+            xp_gain=xp_gain,
+            window_start=_daily_window_start(),
+        )
+        progress_events.record_answer(
+            user_id=user_id,
+            task_id=task_id,
+            topic_id=topic_id,
+            correct=correct,
+            difficulty=difficulty,
+            duration_seconds=time_spent_seconds,
+            xp_gain=xp_gain,
+        )
         return user, progress, {"xp_gain": xp_gain, "mastery_gain": mastery_gain}
 
 
+def _daily_window_start() -> date:
+    return date.today() - timedelta(days=DAILY_XP_WINDOW_DAYS - 1)
+
+
 def get_progress_payload(user_id: int) -> dict:
+    cached = progress_cache.get(user_id)
+    if cached is not None and not _has_expired_days(cached):
+        return cached
+    token = progress_cache.generation(user_id)
+    flushed = _flush_events()
+    payload = _load_progress_payload(user_id)
+    # Without the flush the rollups may miss buffered answers, so that snapshot
+    # is served but not cached.
+    if flushed:
+        progress_cache.put(user_id, payload, token)
+    return payload
+
+
+def _flush_events() -> bool:
+    try:
+        progress_events.flush()
+    except Exception:
+        # A read still gets what is committed; the batch stays buffered.
+        logger.exception("Не удалось записать журнал ответов")
+        return False
+    return True
+
+
+def _has_expired_days(snapshot: dict) -> bool:
+    daily = snapshot["daily_xp"]
+    return bool(daily) and daily[0]["day"] < _daily_window_start()
+
+
+def _load_progress_payload(user_id: int) -> dict:
     with get_session() as session:
         user = session.get(User, user_id)
         if not user:
@@ -104,6 +205,18 @@ def get_progress_payload(user_id: int) -> dict:
         progress_entries = session.exec(
             select(TopicProgress).where(TopicProgress.user_id == user_id)
         ).all()
+        accuracy = {
+            row.topic_id: row
+            for row in session.exec(
+                select(TopicAccuracy).where(TopicAccuracy.user_id == user_id)
+            )
+        }
+        window_start = _daily_window_start()
+        daily_rows = session.exec(
+            select(DailyXp)
+            .where(DailyXp.user_id == user_id, DailyXp.day >= window_start)
+            .order_by(DailyXp.day)
+        ).all()
         return {
             "user_id": user.id,
             "xp": user.xp,
@@ -117,7 +230,18 @@ def get_progress_payload(user_id: int) -> dict:
                     "completed_lessons": entry.completed_lessons,
                     "best_score": entry.best_score,
                     "xp_earned": entry.xp_earned,
+                    **_accuracy_fields(accuracy.get(entry.topic_id)),
                 }
                 for entry in progress_entries
             ],
+            "daily_xp": [
+                {"day": row.day, "xp": row.xp, "answers": row.answers}
+                for row in daily_rows
+            ],
         }
+
+
+def _accuracy_fields(row: TopicAccuracy | None) -> dict:
+    if not row or not row.attempts:
+        return {"attempts": 0, "accuracy": 0.0}
+    return {"attempts": row.attempts, "accuracy": row.correct / row.attempts}
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import copyreg
+import hashlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import sympy
+from sympy.core.function import UndefinedFunction
+
+FORMAT_VERSION = 2
+DEFAULT_DIR = Path(__file__).with_name("snapshots")
+# Modules whose code decides what goes into the snapshot or how it unpickles.
+SOURCE_FILES = ("topics.py", "templates.py", "snapshot.py", "../services/sympy_checker.py")
+
+
+@dataclass
+class Catalog:
+    """The materialized tasks of one course."""
+
+    tasks: dict[str, Any]
+    index: dict[str, tuple[list[int], list[Any]]]
+    artifacts: dict[str, dict]
+
+
+@dataclass(frozen=True)
+class Header:
+    """Written ahead of the catalog so a stale file is rejected before unpickling it."""
+
+    runtime: tuple
+    sources: str | None
+    course: str
+
+
+def _reduce_undefined_function(function: UndefinedFunction) -> tuple:
+    # y = Function("y") is a class created at runtime, so pickle cannot find it
+    # by name; recreate it instead (SymPy compares such functions by name).
+    return sympy.Function, (function.__name__,)
+
+
+def _pickler(handle: Any) -> pickle.Pickler:
+    pickler = pickle.Pickler(handle, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = {**copyreg.dispatch_table, UndefinedFunction: _reduce_undefined_function}
+    return pickler
+
+
+def dumps(value: Any) -> bytes:
+    """Pickle parsed SymPy data, e.g. to hand it to a grading process."""
+    buffer = io.BytesIO()
+    _pickler(buffer).dump(value)
+    return buffer.getvalue()
+
+
+def snapshot_dir() -> Path:
+    return Path(os.getenv("VISHMAT_CATALOG_SNAPSHOTS", str(DEFAULT_DIR)))
+
+
+def snapshot_path(course_id: str, directory: Path | None = None) -> Path:
+    return (directory or snapshot_dir()) / f"{course_id}.snapshot"
+
+
+def runtime_key() -> tuple:
+    return (FORMAT_VERSION, sys.version_info[:2], sympy.__version__)
+
+
+def source_digest() -> str | None:
+    """Hash of the catalog sources, or ``None`` when they are not on disk (frozen builds)."""
+    root = Path(__file__).parent
+    digest = hashlib.sha256()
+    for name in SOURCE_FILES:
+        try:
+            digest.update((root / name).read_bytes())
+        except OSError:
+            return None
+    return digest.hexdigest()
+
+
+def current_header(course_digest: str) -> Header:
+    return Header(runtime=runtime_key(), sources=source_digest(), course=course_digest)
+
+
+def is_fresh(header: Header, course_digest: str) -> bool:
+    if header.runtime != runtime_key() or header.course != course_digest:
+        return False
+    sources = source_digest()
+    # A frozen build cannot change its sources, so the snapshot bundled with it
+    # is trusted as long as the interpreter and SymPy match.
+    return sources is None or header.sources == sources
+
+
+def load(course_id: str, course_digest: str, directory: Path | None = None) -> Catalog | None:
+    """The snapshot of a course file with ``course_digest``, or ``None`` when it
+    is missing, stale or unreadable."""
+    path = snapshot_path(course_id, directory)
+    try:
+        with open(path, "rb") as handle:
+            header = pickle.load(handle)
+            if not isinstance(header, Header) or not is_fresh(header, course_digest):
+                return None
+            catalog = pickle.load(handle)
+    except FileNotFoundError:
+        return None
+    except Exception:  # pragma: no cover - a broken snapshot must not stop the app
+        return None
+    return catalog if isinstance(catalog, Catalog) else None
+
+
+def build(directory: Path | None = None) -> list[tuple[Path, int]]:
+    """Build every course live and write one snapshot per course atomically.
+
+    Returns the written paths with the number of tasks in each.
+    """
+    from ..services import sympy_checker
+    from . import topics
+
+    directory = directory or snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    written = []
+    for entry in topics.scan().values():
+        course = topics.build_course(entry)
+        catalog = Catalog(
+            tasks=course.tasks,
+            index=course.index,
+            artifacts=sympy_checker.compile_artifacts(course.tasks.values()),
+        )
+        path = snapshot_path(entry.id, directory)
+        _write(path, current_header(entry.digest), catalog)
+        written.append((path, len(course.tasks)))
+    return written
+
+
+def _write(path: Path, header: Header, catalog: Catalog) -> None:
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            pickler = _pickler(handle)
+            pickler.dump(header)
+            # Each object is read back by its own pickle.load.
+            pickler.clear_memo()
+            pickler.dump(catalog)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
@@ -2,32 +2,64 @@ from __future__ import annotations
 
 import itertools
 import random
-from typing import Callable, Optional
+import sys
+import threading
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from ..services import laplace_table, linear_systems, numeric_engine
 
 COUNTER = itertools.count(1)
 
 TemplateFn = Callable[[], dict]
 
+# Generated tasks are the bulk of the heap, so their records drop the
+# per-instance __dict__ where the interpreter allows it. Frozen slotted
+# dataclasses only pickle reliably from 3.11 on, and exam grading ships tasks
+# to worker processes.
+COMPACT = {"slots": True} if sys.version_info >= (3, 11) else {}
+
+
+@dataclass(frozen=True, **COMPACT)
+class PromptRef:
+    """Prompt kept as a shared template plus its arguments, rendered on demand."""
+
+    template: str
+    args: tuple[Any, ...]
+
+    def __str__(self) -> str:
+        return self.template.format(*self.args)
+
 
 LINEAR_COEFFICIENTS = [1, 2, 3]
 RHS_COEFFICIENTS = [1, 2, 3]
+LINEAR_PROMPT = "Решите уравнение y' + {} y = {} e^x"
+IVP_INITIAL_VALUES = [0, 1, 2]
+IVP_PROMPT = "Решите задачу Коши y' + {} y = {} e^x, y(0) = {}"
+METHOD_CHOICE_PROMPT = "Какой метод подходит для уравнения {}?"
+METHOD_OPTIONS = (
+    "Метод разделения переменных",
+    "Метод интегрирующего множителя",
+    "Метод Бернулли",
+)
 
 
 def _ode_linear_variant() -> dict:
     idx = next(COUNTER)
     k = random.choice(LINEAR_COEFFICIENTS)
     rhs_coeff = random.choice(RHS_COEFFICIENTS)
-    task_id = f"fo-linear-generated-{idx}"
-    prompt = f"Решите уравнение y' + {k} y = {rhs_coeff} e^x"
     return {
-        "id": task_id,
+        "id": f"fo-linear-generated-{idx}",
         "topic_id": "ode-first-order",
         "title": "Генератор: линейное ОДУ",
         "type": "solve-ode",
-        "prompt": prompt,
+        "prompt": PromptRef(LINEAR_PROMPT, (k, rhs_coeff)),
         "difficulty": 2,
         "hints": [
-            {"level": 1, "text": "Интегрирующий множитель μ(x) = e^{∫{k} dx}"},
+            {"level": 1, "text": f"Интегрирующий множитель μ(x) = e^{{∫{k} dx}}"},
             {"level": 2, "text": f"Получите (e^{{{k}x}} y)' = {rhs_coeff} e^{{(1+{k})x}}"},
         ],
         "validation": {
@@ -38,6 +70,33 @@ def _ode_linear_variant() -> dict:
     }
 
 
+def _ode_ivp_variant() -> dict:
+    idx = next(COUNTER)
+    k = random.choice(LINEAR_COEFFICIENTS)
+    rhs_coeff = random.choice(RHS_COEFFICIENTS)
+    start = random.choice(IVP_INITIAL_VALUES)
+    return {
+        "id": f"fo-ivp-generated-{idx}",
+        "topic_id": "ode-first-order",
+        "title": "Генератор: задача Коши",
+        "type": "solve-ode",
+        "prompt": PromptRef(IVP_PROMPT, (k, rhs_coeff, start)),
+        "difficulty": 3,
+        "hints": [
+            {"level": 1, "text": f"Общее решение: y = C e^{{-{k}x}} + \\frac{{{rhs_coeff}}}{{{k + 1}}} e^x"},
+            {"level": 2, "text": f"Из y(0) = {start}: C + {rhs_coeff}/{k + 1} = {start}"},
+        ],
+        # Hidden reference: the general solution whose constant the checker fits.
+        "expected": f"C*exp(-{k}*x) + {rhs_coeff}*exp(x)/{k + 1}",
+        "validation": {
+            "type": "ode",
+            "equation": f"Eq(Derivative(y(x), x) + {k}*y(x), {rhs_coeff}*exp(x))",
+            "symbol": "x",
+            "initial_conditions": {"y(0)": start},
+        },
+    }
+
+
 def _method_choice_variant() -> dict:
     idx = next(COUNTER)
     equation = random.choice([
@@ -52,45 +111,303 @@ def _method_choice_variant() -> dict:
         "topic_id": "ode-first-order",
         "title": "Выбор метода",
         "type": "method-choice",
-        "prompt": f"Какой метод подходит для уравнения {equation}?",
+        "prompt": PromptRef(METHOD_CHOICE_PROMPT, (equation,)),
         "difficulty": 1,
         "hints": [
             {"level": 1, "text": "Посмотрите на структуру правой части"},
         ],
-        "options": [
-            "Метод разделения переменных",
-            "Метод интегрирующего множителя",
-            "Метод Бернулли",
-        ],
+        "options": METHOD_OPTIONS,
         "expected": correct_method,
     }
 
 
-def _numeric_euler_variant() -> dict:
+NUMERIC_BATCH_SIZE = 16
+NUMERIC_INITIAL_VALUES = [0.5, 1.0, 2.0]
+NUMERIC_STEPS = [0.1, 0.2]
+# (method, steps, difficulty) of the table tasks; one step is the classic single
+# Euler step, more steps turn the task into filling a whole table.
+NUMERIC_TABLE_KINDS = [
+    ("euler", 1, 3),
+    ("euler", 3, 3),
+    ("improved-euler", 2, 4),
+    ("rk4", 1, 4),
+]
+NUMERIC_CONVERGENCE_KINDS = [("euler", 2, 5), ("improved-euler", 2, 5)]
+NUMERIC_MIN_DIFFICULTY = min(kind[2] for kind in NUMERIC_TABLE_KINDS + NUMERIC_CONVERGENCE_KINDS)
+METHOD_TITLES = {
+    "euler": "метода Эйлера",
+    "improved-euler": "улучшенного метода Эйлера",
+    "rk4": "метода Рунге–Кутты 4-го порядка",
+}
+METHOD_TITLES_INSTRUMENTAL = {
+    "euler": "методом Эйлера",
+    "improved-euler": "улучшенным методом Эйлера",
+    "rk4": "методом Рунге–Кутты 4-го порядка",
+}
+METHOD_HINTS = {
+    "euler": "y_{n+1} = y_n + h f(x_n, y_n)",
+    "improved-euler": "y_{n+1} = y_n + h/2 (f(x_n, y_n) + f(x_n + h, y_n + h f(x_n, y_n)))",
+    "rk4": "y_{n+1} = y_n + h/6 (k_1 + 2k_2 + 2k_3 + k_4)",
+}
+
+NUMERIC_STEP_PROMPT = "Сделайте один шаг {} (h={:g}) для y' = {}, y(0)={:g}"
+NUMERIC_TABLE_PROMPT = (
+    "Заполните таблицу {} для y' = {}, y(0)={:g}, h={:g}: найдите y_1 … y_{} "
+    "через точку с запятой с точностью до 4 знаков"
+)
+NUMERIC_CONVERGENCE_PROMPT = (
+    "Для y' = {}, y(0)={:g} вычислите y({}) {} с шагами h={:g} и h/2, "
+    "затем оцените погрешность по правилу Рунге. Ответ: y_h; y_(h/2); оценка"
+)
+
+_numeric_pool: list[dict] = []
+_numeric_pool_lock = threading.Lock()
+
+
+def _format_number(value: float) -> str:
+    return f"{value:g}"
+
+
+def _numeric_table_batch(method: str, steps: int, difficulty: int) -> list[dict]:
+    slope = random.choice(list(numeric_engine.SLOPES))
+    y0 = np.array([random.choice(NUMERIC_INITIAL_VALUES) for _ in range(NUMERIC_BATCH_SIZE)])
+    h = np.array([random.choice(NUMERIC_STEPS) for _ in range(NUMERIC_BATCH_SIZE)])
+    x0 = np.zeros(NUMERIC_BATCH_SIZE)
+    table = numeric_engine.trajectories(method, slope, x0, y0, h, steps)
+    f0 = numeric_engine.SLOPES[slope](x0, y0)
+    title = METHOD_TITLES[method]
+
+    variants = []
+    for row, start, step, slope_at_start in zip(table, y0, h, f0):
+        hints = [
+            {"level": 1, "text": METHOD_HINTS[method]},
+            {"level": 2, "text": f"f(0, {_format_number(start)}) = {_format_number(round(slope_at_start, 6))}"},
+        ]
+        if steps == 1:
+            variants.append(
+                {
+                    "method": method,
+                    "difficulty": difficulty,
+                    "title": "Генератор шага Эйлера" if method == "euler" else "Генератор шага метода",
+                    "prompt": PromptRef(NUMERIC_STEP_PROMPT, (title, float(step), slope, float(start))),
+                    "hints": hints,
+                    "expected": round(float(row[1]), 3),
+                    "validation": {"type": "numeric", "tolerance": 1e-2},
+                }
+            )
+            continue
+        values = [round(float(value), 4) for value in row[1:]]
+        variants.append(
+            {
+                "method": method,
+                "difficulty": difficulty,
+                "title": "Таблица численного метода",
+                "prompt": PromptRef(NUMERIC_TABLE_PROMPT, (title, slope, float(start), float(step), steps)),
+                "hints": hints,
+                "expected": values,
+                "validation": {
+                    "type": "numeric-table",
+                    "tolerances": numeric_engine.step_tolerances(steps, 2e-3),
+                    "labels": [f"y_{index}" for index in range(1, steps + 1)],
+                },
+            }
+        )
+    return variants
+
+
+def _numeric_convergence_batch(method: str, steps: int, difficulty: int) -> list[dict]:
+    slope = random.choice(list(numeric_engine.SLOPES))
+    y0 = np.array([random.choice(NUMERIC_INITIAL_VALUES) for _ in range(NUMERIC_BATCH_SIZE)])
+    h = np.array([random.choice(NUMERIC_STEPS) for _ in range(NUMERIC_BATCH_SIZE)])
+    x0 = np.zeros(NUMERIC_BATCH_SIZE)
+    coarse, fine, estimate = numeric_engine.runge_error_estimates(method, slope, x0, y0, h, steps)
+    exact = numeric_engine.rk45(slope, x0, y0, x0 + h * steps)
+    title = METHOD_TITLES_INSTRUMENTAL[method]
+    order = numeric_engine.METHOD_ORDERS[method]
+
+    variants = []
+    for start, step, y_h, y_half, error, reference in zip(y0, h, coarse, fine, estimate, exact):
+        if abs(error) < 1e-4:
+            # The method is exact for this variant (e.g. y' = y - x, y(0)=1), so
+            # there is nothing to estimate.
+            continue
+        end = _format_number(round(float(step) * steps, 6))
+        variants.append(
+            {
+                "method": method,
+                "difficulty": difficulty,
+                "title": "Сходимость по шагу",
+                "prompt": PromptRef(
+                    NUMERIC_CONVERGENCE_PROMPT, (slope, float(start), end, title, float(step))
+                ),
+                "hints": [
+                    {"level": 1, "text": METHOD_HINTS[method]},
+                    {"level": 2, "text": f"Оценка Рунге: (y_(h/2) - y_h) / (2^{order} - 1)"},
+                    {"level": 3, "text": f"Точное значение y({end}) ≈ {reference:.6f}"},
+                ],
+                "expected": [round(float(y_h), 4), round(float(y_half), 4), round(float(error), 5)],
+                "validation": {
+                    "type": "numeric-table",
+                    "tolerances": [2e-3 * steps, 2e-3 * steps * 2, max(1e-4, abs(float(error)) * 0.05)],
+                    "labels": ["y_h", "y_(h/2)", "оценка"],
+                },
+            }
+        )
+    return variants
+
+
+def _refill_numeric_pool() -> None:
+    variants: list[dict] = []
+    for kind in NUMERIC_TABLE_KINDS:
+        variants.extend(_numeric_table_batch(*kind))
+    for kind in NUMERIC_CONVERGENCE_KINDS:
+        variants.extend(_numeric_convergence_batch(*kind))
+    random.shuffle(variants)
+    # Replace rather than extend: leftovers are only the difficulties nobody asked
+    # for lately, and keeping them would let the pool grow without bound.
+    _numeric_pool[:] = variants
+
+
+def _take_numeric_variant(target_difficulty: int) -> dict:
+    with _numeric_pool_lock:
+        if not _numeric_pool or (
+            target_difficulty >= NUMERIC_MIN_DIFFICULTY
+            and not any(item["difficulty"] <= target_difficulty for item in _numeric_pool)
+        ):
+            _refill_numeric_pool()
+        fallback = min(range(len(_numeric_pool)), key=lambda i: _numeric_pool[i]["difficulty"])
+        index = next(
+            (i for i, item in enumerate(_numeric_pool) if item["difficulty"] <= target_difficulty),
+            fallback,
+        )
+        return _numeric_pool.pop(index)
+
+
+def _numeric_variant(target_difficulty: int) -> dict:
+    variant = _take_numeric_variant(target_difficulty)
     idx = next(COUNTER)
-    slope = random.choice(["x + y", "y - x"])
-    h = random.choice([0.1, 0.2])
-    prompt = f"Сделайте один шаг метода Эйлера (h={h}) для y' = {slope}, y(0)=1"
-    f0 = 1 if slope == "x + y" else 1
-    y1 = 1 + h * f0
+    method = variant.pop("method")
     return {
-        "id": f"numeric-euler-generated-{idx}",
+        "id": f"numeric-{method}-generated-{idx}",
         "topic_id": "numerical-methods",
-        "title": "Генератор шага Эйлера",
         "type": "numeric",
+        **variant,
+    }
+
+
+SYSTEM_EIGEN_PROMPT = "Найдите собственные значения и собственные векторы матрицы A = {}. Ответ: λ: v1, v2; …"
+SYSTEM_FUNDAMENTAL_PROMPT = (
+    "Найдите общее решение системы Y' = AY, A = {}. Ответ: y1 = …; y2 = …{} "
+    "с постоянными C1…C{} и переменной t"
+)
+# (size, mode, difficulty) of the generated linear systems.
+SYSTEM_KINDS = [(2, "eigen", 3), (2, "fundamental", 4), (3, "eigen", 4), (3, "fundamental", 5)]
+
+
+def _format_matrix(matrix: np.ndarray) -> str:
+    return "[" + ", ".join("[" + ", ".join(str(int(value)) for value in row) + "]" for row in matrix) + "]"
+
+
+def _system_variant(target_difficulty: int) -> dict:
+    idx = next(COUNTER)
+    kinds = [kind for kind in SYSTEM_KINDS if kind[2] <= target_difficulty] or SYSTEM_KINDS[:1]
+    size, mode, difficulty = random.choice(kinds)
+    matrix, eigenvalues = linear_systems.matrix_with_spectrum(size, random.Random(random.getrandbits(64)))
+    shown = _format_matrix(matrix)
+    if mode == "eigen":
+        prompt = PromptRef(SYSTEM_EIGEN_PROMPT, (shown,))
+        hints = [
+            {"level": 1, "text": r"Решите det(A - \lambda I) = 0"},
+            {"level": 2, "text": r"Для каждого \lambda найдите ненулевое решение (A - \lambda I)v = 0"},
+        ]
+    else:
+        prompt = PromptRef(SYSTEM_FUNDAMENTAL_PROMPT, (shown, "; y3 = …" if size == 3 else "", size))
+        hints = [
+            {"level": 1, "text": "Найдите собственные значения и векторы матрицы A"},
+            {"level": 2, "text": r"Y = C_1 e^{\lambda_1 t} v_1 + … + C_n e^{\lambda_n t} v_n"},
+        ]
+    return {
+        "id": f"systems-{mode}-generated-{idx}",
+        "topic_id": "systems",
+        "title": "Собственные пары матрицы" if mode == "eigen" else "Общее решение системы",
+        "type": "solve-system",
         "prompt": prompt,
-        "difficulty": 3,
+        "difficulty": difficulty,
+        "hints": hints,
+        # Hidden: the spectrum the matrix was built from.
+        "expected": eigenvalues,
+        "validation": {
+            "type": "system",
+            "mode": mode,
+            "matrix": matrix.tolist(),
+            "symbol": "t",
+        },
+    }
+
+
+LAPLACE_PROMPT = "Найдите изображение по Лапласу F(s) функции f(t) = {}"
+LAPLACE_COEFFICIENTS = [-3, -2, -1, 1, 2, 3]
+LAPLACE_RATES = [-3, -2, -1, 1, 2, 3]
+LAPLACE_FREQUENCIES = [1, 2, 3, 4]
+# Families by the difficulty they start at; shifted families need the shift theorem.
+LAPLACE_FAMILIES = [("power", 2), ("exp", 2), ("sin", 2), ("cos", 2), ("texp", 3), ("expsin", 3), ("expcos", 3)]
+
+
+def _laplace_term(family: str) -> laplace_table.Term:
+    coefficient = random.choice(LAPLACE_COEFFICIENTS)
+    if family == "power":
+        return family, coefficient, random.randint(0, 3), 0
+    if family in ("sin", "cos"):
+        return family, coefficient, random.choice(LAPLACE_FREQUENCIES), 0
+    return family, coefficient, random.choice(LAPLACE_RATES), random.choice(LAPLACE_FREQUENCIES)
+
+
+def _laplace_variant(target_difficulty: int) -> dict:
+    idx = next(COUNTER)
+    families = [family for family, difficulty in LAPLACE_FAMILIES if difficulty <= target_difficulty]
+    count = 2 if target_difficulty >= 3 else random.choice([1, 2])
+    chosen = random.sample(families, count)
+    terms = tuple(_laplace_term(family) for family in chosen)
+    shifted = any(family in ("texp", "expsin", "expcos") for family in chosen)
+    return {
+        "id": f"laplace-image-generated-{idx}",
+        "topic_id": "laplace-transform",
+        "title": "Генератор: изображение по Лапласу",
+        "type": "laplace",
+        "prompt": PromptRef(LAPLACE_PROMPT, (laplace_table.describe(terms),)),
+        "difficulty": 3 if shifted else 2,
         "hints": [
-            {"level": 1, "text": "y_{n+1} = y_n + h f(x_n, y_n)"},
+            {"level": 1, "text": "Преобразование Лапласа линейно: найдите изображение каждого слагаемого"},
+            {"level": 2, "text": r"t^n \to n!/s^{n+1},\ e^{at} \to 1/(s-a),\ e^{at}f(t) \to F(s-a)"},
         ],
-        "expected": round(y1, 3),
-        "validation": {"type": "numeric", "tolerance": 1e-2},
+        # Hidden reference, read off the table rather than computed per check.
+        "expected": str(laplace_table.image(terms)),
+        "validation": {
+            "type": "laplace",
+            "symbol": "s",
+            "terms": [list(term) for term in terms],
+        },
     }
 
 
-def choose_template(topic_id: str, target_difficulty: int) -> Optional[TemplateFn]:
-    if topic_id == "ode-first-order":
-        return random.choice([_ode_linear_variant, _method_choice_variant])
-    if topic_id == "numerical-methods":
-        return _numeric_euler_variant
+def _ignoring_target(variant: TemplateFn) -> Callable[[int], dict]:
+    return lambda target_difficulty: variant()
+
+
+# Generators that course files refer to by name in their "templates" section.
+GENERATORS: dict[str, Callable[[int], dict]] = {
+    "ode-linear": _ignoring_target(_ode_linear_variant),
+    "ode-ivp": _ignoring_target(_ode_ivp_variant),
+    "method-choice": _ignoring_target(_method_choice_variant),
+    "linear-system": _system_variant,
+    "numeric": _numeric_variant,
+    "laplace-image": _laplace_variant,
+}
+
+
+def choose_template(rules: Optional[list[dict[str, Any]]], target_difficulty: int) -> Optional[TemplateFn]:
+    """Pick a generator from a topic's rules, ordered by descending ``min_difficulty``."""
+    for rule in rules or ():
+        if target_difficulty >= rule["min_difficulty"]:
+            return partial(GENERATORS[random.choice(rule["generators"])], target_difficulty)
     return None
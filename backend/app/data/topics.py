@@ -1,362 +1,410 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 import random
-from dataclasses import dataclass
-from typing import Any, Dict
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Union
 
-from . import templates
+from . import snapshot, templates
+from .templates import COMPACT, PromptRef
 
 
-@dataclass
+class Hint(NamedTuple):
+    level: int
+    text: str
+
+
+# Least recently used last; bounded so that free-text hints of generated tasks
+# cannot grow it without limit, and emptied by ``reload``.
+_INTERNED: OrderedDict[tuple, tuple] = OrderedDict()
+_INTERN_LIMIT = int(os.getenv("VISHMAT_INTERN_LIMIT", "4096"))
+_intern_lock = threading.Lock()
+
+
+def _intern(values: tuple) -> tuple:
+    """Share one tuple between tasks with equal hints or options.
+
+    Templates draw from a handful of coefficients, so a small table catches
+    nearly every repeat however many tasks are generated.
+    """
+    with _intern_lock:
+        shared = _INTERNED.get(values)
+        if shared is not None:
+            _INTERNED.move_to_end(values)
+            return shared
+        _INTERNED[values] = values
+        while len(_INTERNED) > _INTERN_LIMIT:
+            _INTERNED.popitem(last=False)
+        return values
+
+
+def _freeze_hints(hints: Any) -> tuple[Hint, ...]:
+    return _intern(
+        tuple(
+            hint if isinstance(hint, Hint) else Hint(int(hint["level"]), hint["text"])
+            for hint in hints
+        )
+    )
+
+
+@dataclass(frozen=True, **COMPACT)
 class Task:
     id: str
     topic_id: str
     title: str
     type: str
-    prompt: str
+    prompt: Union[str, PromptRef]
     difficulty: int
-    hints: list[dict[str, Any]]
-    options: list[str] | None = None
+    hints: tuple[Hint, ...]
+    options: tuple[str, ...] | None = None
     pairs: list[dict[str, str]] | None = None
     expected: Any | None = None
     validation: dict[str, Any] | None = None
 
+    def __post_init__(self) -> None:
+        # Templates and stored exam tickets pass plain lists and dicts.
+        object.__setattr__(self, "hints", _freeze_hints(self.hints))
+        if self.options is not None:
+            object.__setattr__(self, "options", _intern(tuple(self.options)))
+
+    def to_record(self) -> dict[str, Any]:
+        """JSON-ready fields, with the prompt rendered and hints as dicts."""
+        return {
+            "id": self.id,
+            "topic_id": self.topic_id,
+            "title": self.title,
+            "type": self.type,
+            "prompt": str(self.prompt),
+            "difficulty": self.difficulty,
+            "hints": [{"level": hint.level, "text": hint.text} for hint in self.hints],
+            "options": list(self.options) if self.options is not None else None,
+            "pairs": self.pairs,
+            "expected": self.expected,
+            "validation": self.validation,
+        }
 
-TOPICS: list[dict[str, Any]] = [
-    {
-        "id": "ode-first-order",
-        "title": "ОДУ первого порядка",
-        "summary": "Разбираемся с основными типами ОДУ первого порядка: разделяющиеся, линейные, точные.",
-        "objectives": [
-            "Распознавать тип уравнения",
-            "Применять корректный метод интегрирования",
-            "Проверять полученный ответ",
-        ],
-        "recommended_path": [
-            "ode-first-order", "ode-second-order", "laplace-transform",
-        ],
-        "theory_points": [
-            "Линейные ОДУ: y' + P(x)y = Q(x). Интегрирующий множитель μ(x) = e^{∫P(x)dx}.",
-            "Разделяющиеся уравнения: приведение к виду g(y)dy = f(x)dx.",
-            "Точные уравнения: dF(x, y) = 0, проверка условия ∂M/∂y = ∂N/∂x.",
-        ],
-        "examples": [
-            "y' + y = e^x → μ(x) = e^{∫1 dx} = e^x → y = C e^{-x} + \frac{1}{2}e^x",
-            "(2xy + y^2)dx + (x^2 + 2xy)dy = 0 → точное → F(x,y) = x^2 y + xy^2",
-        ],
-        "practice_outline": [
-            "Выбор метода",
-            "Решение линейного уравнения",
-            "Решение точного уравнения",
-            "Экзаменационная задача",
-        ],
-        "exam_reference": "Билет №2, задача 3: линейное уравнение с интегрирующим множителем",
-    },
-    {
-        "id": "ode-second-order",
-        "title": "ОДУ второго порядка",
-        "summary": "Классические уравнения с постоянными коэффициентами и вариацией постоянных.",
-        "objectives": [
-            "Решать однородные уравнения с характеристическим уравнением",
-            "Решать неоднородные уравнения методом вариации постоянных",
-        ],
-        "recommended_path": [
-            "ode-second-order", "euler-cauchy", "laplace-transform",
-        ],
-        "theory_points": [
-            "Характеристическое уравнение: r^2 + a r + b = 0.",
-            "При кратных корнях решение имеет вид y = (C_1 + C_2 x)e^{rx}.",
-            "Метод вариации постоянных: ищем y_p = u_1(x)y_1 + u_2(x)y_2.",
-        ],
-        "examples": [
-            "y'' - 4y = 0 → y = C_1 e^{2x} + C_2 e^{-2x}",
-            r"y'' + y = \sin x → y = C_1 \cos x + C_2 \sin x - \frac{1}{2}x \cos x",
-        ],
-        "practice_outline": [
-            "Характеристическое уравнение",
-            "Неоднородные решения",
-        ],
-        "exam_reference": "Билет №4, задача 2: дифференциальное уравнение второго порядка",
-    },
-    {
-        "id": "euler-cauchy",
-        "title": "Метод Эйлера–Коши",
-        "summary": "Уравнения вида x^2 y'' + a x y' + b y = g(x).",
-        "objectives": [
-            "Понимать замену y = x^m",
-            "Решать неоднородные уравнения с правой частью",
-        ],
-        "recommended_path": [
-            "euler-cauchy", "ode-second-order", "variation-of-parameters",
-        ],
-        "theory_points": [
-            "Подстановка y = x^m → характеристическое уравнение m(m-1)+am+b=0.",
-            "Для неоднородных решений используем метод вариации постоянных или Анзаты.",
-        ],
-        "examples": [
-            r"x^2 y'' - x y' + y = 0 → y = C_1 x + C_2 x \ln x",
-        ],
-        "practice_outline": [
-            "Характеристический корень",
-            "Неоднородное решение",
-        ],
-        "exam_reference": "Билет №5, задача 1",
-    },
-    {
-        "id": "systems",
-        "title": "Системы дифференциальных уравнений",
-        "summary": "Линеаризация, диагонализация и численные методы для систем.",
-        "objectives": [
-            "Приводить систему к нормальной форме",
-            "Использовать собственные значения",
-        ],
-        "recommended_path": [
-            "systems", "laplace-transform", "numerical-methods",
-        ],
-        "theory_points": [
-            "Записываем систему в матричном виде Y' = AY + B(x).",
-            "Решение через e^{At} и метод вариации постоянных.",
-        ],
-        "examples": [
-            r"Y' = \begin{pmatrix}0 & 1\\-2 & -3\end{pmatrix}Y → e^{At} = P e^{Dt} P^{-1}",
-        ],
-        "practice_outline": [
-            "Нахождение собственных значений",
-            "Решение системы",
-        ],
-        "exam_reference": "Билет №6, система 2×2",
-    },
-    {
-        "id": "laplace-transform",
-        "title": "Преобразование Лапласа",
-        "summary": "Применение преобразования Лапласа для решения ОДУ.",
-        "objectives": [
-            "Выполнять прямое и обратное преобразование",
-            "Использовать таблицы Лапласа",
-        ],
-        "recommended_path": [
-            "laplace-transform", "ode-second-order", "systems",
-        ],
-        "theory_points": [
-            r"\mathcal{L}\{f'\} = s F(s) - f(0).",
-            "Обратное преобразование через разложение на простые дроби.",
-        ],
-        "examples": [
-            r"y' + 2y = e^{-t}, y(0)=1 → Y(s) = \frac{1}{s+2} + \frac{1}{s+2} \cdot \frac{1}{s+1}",
-        ],
-        "practice_outline": [
-            "Выбор изображения",
-            "Решение ОДУ",
-        ],
-        "exam_reference": "Билет №7, задача 3",
-    },
-    {
-        "id": "numerical-methods",
-        "title": "Численные методы",
-        "summary": "Методы Эйлера и Рунге–Кутты для аппроксимации решений.",
-        "objectives": [
-            "Использовать явный метод Эйлера",
-            "Сравнивать с методом Рунге–Кутты",
-        ],
-        "recommended_path": [
-            "numerical-methods", "systems",
-        ],
-        "theory_points": [
-            "Метод Эйлера: y_{n+1} = y_n + h f(x_n, y_n).",
-            "RK4: y_{n+1} = y_n + \frac{h}{6}(k_1 + 2k_2 + 2k_3 + k_4).",
-        ],
-        "examples": [
-            "y' = x + y, y(0)=1, h=0.1 → y(0.1) ≈ 1.11",
-        ],
-        "practice_outline": [
-            "Шаг Эйлера",
-            "Шаг Рунге–Кутты",
-        ],
-        "exam_reference": "Билет №8, задача 1",
-    },
-]
 
+COURSES_DIR = Path(os.getenv("VISHMAT_COURSES_DIR", str(Path(__file__).with_name("courses"))))
+COURSE_FORMAT = 1
 
+# Generated tasks, looked up by id when an answer comes back. Static tasks live
+# in their course.
 TASK_BANK: Dict[str, Task] = {}
+# Tasks of every topic ordered by difficulty (with the difficulties alongside
+# for bisect), so sampling does not scan the whole bank.
+TopicIndex = Dict[str, tuple[list[int], list[Task]]]
+_bank_lock = threading.Lock()
+
+
+class CatalogError(Exception):
+    """A course file is missing, malformed or clashes with another course."""
+
+
+class TopicNotFound(LookupError):
+    """The topic is not in the catalog or has no tasks to offer."""
+
+
+@dataclass(frozen=True)
+class CourseEntry:
+    """What the scan keeps of a course file: its topics, not its tasks."""
+
+    id: str
+    title: str
+    path: Path
+    stamp: tuple[int, int]
+    digest: str
+    topics: tuple[dict[str, Any], ...]
+
+
+@dataclass(frozen=True)
+class Course:
+    entry: CourseEntry
+    tasks: Dict[str, Task]
+    index: TopicIndex
+    templates: dict[str, list[dict[str, Any]]]
+    artifacts: dict[str, dict]
+
+
+@dataclass(frozen=True)
+class CatalogState:
+    """One immutable view of the catalog.
+
+    Requests read the current state once and keep using it, so a reload swaps
+    in a new state without disturbing them. Courses are materialized on first
+    use and added by swapping in a copy with the new course.
+    """
+
+    courses: dict[str, CourseEntry] = field(default_factory=dict)
+    topic_courses: dict[str, str] = field(default_factory=dict)
+    loaded: dict[str, Course] = field(default_factory=dict)
+
+
+_state = CatalogState()
+# Serializes writers (reloads and materializations); readers never take it.
+_load_lock = threading.Lock()
+_artifact_sinks: list[Callable[[dict[str, dict]], None]] = []
+
+
+def _index_task(index: TopicIndex, task: Task) -> None:
+    difficulties, tasks = index.setdefault(task.topic_id, ([], []))
+    position = bisect_right(difficulties, task.difficulty)
+    difficulties.insert(position, task.difficulty)
+    tasks.insert(position, task)
 
 
 def register_task(task: Task) -> None:
-    TASK_BANK[task.id] = task
-
-
-def build_static_tasks() -> None:
-    register_task(
-        Task(
-            id="fo-linear-1",
-            topic_id="ode-first-order",
-            title="Определи метод решения",
-            type="method-choice",
-            prompt="Какой метод решения подходит для уравнения y' + 3y = 2e^{-x}?",
-            difficulty=1,
-            hints=[
-                {"level": 1, "text": "Уравнение линейное"},
-                {"level": 2, "text": "Применяется интегрирующий множитель"},
-            ],
-            options=[
-                "Метод разделения переменных",
-                "Метод интегрирующего множителя",
-                "Метод Бернулли",
-            ],
-            expected="Метод интегрирующего множителя",
-        )
-    )
+    with _bank_lock:
+        TASK_BANK[task.id] = task
 
-    register_task(
-        Task(
-            id="fo-linear-2",
-            topic_id="ode-first-order",
-            title="Реши линейное уравнение",
-            type="solve-ode",
-            prompt="Решите уравнение y' + y = e^x",
-            difficulty=2,
-            hints=[
-                {"level": 1, "text": "Вычислите μ(x) = e^{∫1 dx}"},
-                {"level": 2, "text": "Получите (e^x y)' = e^{2x}"},
-                {"level": 3, "text": "y = C e^{-x} + \frac{1}{2}e^x"},
-            ],
-            validation={
-                "type": "ode",
-                "equation": "Eq(Derivative(y(x), x) + y(x), exp(x))",
-                "symbol": "x",
-            },
-        )
-    )
 
-    register_task(
-        Task(
-            id="fo-exact-1",
-            topic_id="ode-first-order",
-            title="Проверь точность",
-            type="theory",
-            prompt="Верно ли, что уравнение (2xy + y^2)dx + (x^2 + 2xy)dy = 0 является точным?",
-            difficulty=2,
-            hints=[
-                {"level": 1, "text": "Сравните ∂M/∂y и ∂N/∂x"},
-            ],
-            expected=True,
-        )
-    )
+def _stamp(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
 
-    register_task(
-        Task(
-            id="so-characteristic-1",
-            topic_id="ode-second-order",
-            title="Корни характеристического уравнения",
-            type="method-choice",
-            prompt="Сколько различных корней имеет характеристическое уравнение y'' - 4y = 0?",
-            difficulty=1,
-            hints=[{"level": 1, "text": "Решите r^2 - 4 = 0"}],
-            options=["Один", "Два", "Бесконечно много"],
-            expected="Два",
-        )
-    )
 
-    register_task(
-        Task(
-            id="so-solve-1",
-            topic_id="ode-second-order",
-            title="Общее решение",
-            type="solve-ode",
-            prompt="Найдите общее решение y'' - 4y = 0",
-            difficulty=2,
-            hints=[
-                {"level": 1, "text": "Характеристическое уравнение r^2 - 4 = 0"},
-                {"level": 2, "text": "Корни r = ±2"},
-            ],
-            validation={
-                "type": "ode",
-                "equation": "Eq(Derivative(y(x), (x, 2)) - 4*y(x), 0)",
-                "symbol": "x",
-            },
-        )
-    )
+def _read_course(path: Path) -> tuple[dict[str, Any], str]:
+    try:
+        raw = path.read_bytes()
+        document = json.loads(raw)
+    except (OSError, ValueError) as exc:
+        raise CatalogError(f"{path.name}: {exc}") from exc
+    if not isinstance(document, dict) or document.get("format") != COURSE_FORMAT:
+        raise CatalogError(f"{path.name}: ожидается формат курса {COURSE_FORMAT}")
+    for key in ("id", "title", "topics"):
+        if key not in document:
+            raise CatalogError(f"{path.name}: нет поля {key!r}")
+    return document, hashlib.sha256(raw).hexdigest()
 
-    register_task(
-        Task(
-            id="laplace-1",
-            topic_id="laplace-transform",
-            title="Выбор изображения",
-            type="match",
-            prompt="Соотнесите функции и их образы Лапласа",
-            difficulty=2,
-            hints=[{"level": 1, "text": "Вспомните таблицу преобразований"}],
-            pairs=[
-                {"left": "f(t) = 1", "right": "F(s) = 1/s"},
-                {"left": "f(t) = e^{at}", "right": "F(s) = 1/(s-a)"},
-                {"left": r"f(t) = \sin t", "right": "F(s) = 1/(s^2 + 1)"},
-            ],
-            expected=[0, 1, 2],
-        )
-    )
 
-    register_task(
-        Task(
-            id="numeric-euler-1",
-            topic_id="numerical-methods",
-            title="Шаг метода Эйлера",
-            type="numeric",
-            prompt="Используя метод Эйлера с шагом h=0.1 для y' = x + y, y(0)=1, найдите приближение y(0.1)",
-            difficulty=3,
-            hints=[
-                {"level": 1, "text": "y_{n+1} = y_n + h f(x_n, y_n)"},
-                {"level": 2, "text": "f(0,1) = 1"},
-            ],
-            expected=1.1,
-            validation={"type": "numeric", "tolerance": 1e-2},
+def scan(directory: Path | None = None) -> dict[str, CourseEntry]:
+    """Read the topics of every course file; tasks are left for ``materialize``."""
+    directory = directory or COURSES_DIR
+    entries: dict[str, CourseEntry] = {}
+    for path in sorted(directory.glob("*.json")):
+        document, digest = _read_course(path)
+        course_id = document["id"]
+        if course_id in entries:
+            raise CatalogError(f"{path.name}: курс {course_id!r} уже описан в {entries[course_id].path.name}")
+        entries[course_id] = CourseEntry(
+            id=course_id,
+            title=document["title"],
+            path=path,
+            stamp=_stamp(path),
+            digest=digest,
+            topics=tuple(document["topics"]),
         )
-    )
+    return entries
 
-    register_task(
-        Task(
-            id="systems-eigen-1",
-            topic_id="systems",
-            title="Собственные значения",
-            type="method-choice",
-            prompt="Найдите количество различных собственных значений матрицы [[0,1],[-2,-3]]",
-            difficulty=2,
-            hints=[{"level": 1, "text": r"Решите det(A-\lambda I)=0"}],
-            options=["Одно", "Два", "Три"],
-            expected="Два",
-        )
-    )
 
-    register_task(
-        Task(
-            id="euler-cauchy-1",
-            topic_id="euler-cauchy",
-            title="Корень уравнения",
-            type="theory",
-            prompt=r"Верно ли, что y = C_1 x + C_2 x \ln x является решением x^2 y'' - x y' + y = 0?",
-            difficulty=3,
-            hints=[{"level": 1, "text": "Подставьте решение"}],
-            expected=True,
-        )
+def _topic_courses(entries: dict[str, CourseEntry]) -> dict[str, str]:
+    owners: dict[str, str] = {}
+    for entry in entries.values():
+        for topic in entry.topics:
+            owner = owners.setdefault(topic["id"], entry.id)
+            if owner != entry.id:
+                raise CatalogError(f"Тема {topic['id']!r} есть и в {owner!r}, и в {entry.id!r}")
+    return owners
+
+
+def _template_rules(entry: CourseEntry, document: dict[str, Any]) -> dict[str, list[dict[str, Any]]]:
+    rules: dict[str, list[dict[str, Any]]] = {}
+    for topic_id, topic_rules in document.get("templates", {}).items():
+        for rule in topic_rules:
+            unknown = [name for name in rule["generators"] if name not in templates.GENERATORS]
+            if unknown:
+                raise CatalogError(f"{entry.path.name}: неизвестные генераторы {', '.join(unknown)}")
+        rules[topic_id] = sorted(topic_rules, key=lambda rule: rule["min_difficulty"], reverse=True)
+    return rules
+
+
+def build_course(entry: CourseEntry, document: dict[str, Any] | None = None) -> Course:
+    """Build a course from its file, ignoring any snapshot."""
+    if document is None:
+        document, _ = _read_course(entry.path)
+    bank: Dict[str, Task] = {}
+    index: TopicIndex = {}
+    for record in document.get("tasks", []):
+        task = Task(**record)
+        bank[task.id] = task
+        _index_task(index, task)
+    return Course(entry=entry, tasks=bank, index=index, templates=_template_rules(entry, document), artifacts={})
+
+
+def _materialize(entry: CourseEntry) -> Course:
+    # A file edited since the last scan is used as it is now; the next reload
+    # sees the new digest and builds the course once more.
+    document, digest = _read_course(entry.path)
+    cached = snapshot.load(entry.id, digest)
+    if cached is None:
+        return build_course(entry, document)
+    return Course(
+        entry=entry,
+        tasks=cached.tasks,
+        index=cached.index,
+        templates=_template_rules(entry, document),
+        artifacts=cached.artifacts,
     )
 
 
-build_static_tasks()
+def course(course_id: str) -> Course | None:
+    """The materialized course, loading it on first use."""
+    global _state
+    state = _state
+    loaded = state.loaded.get(course_id)
+    if loaded is not None:
+        return loaded
+    with _load_lock:
+        state = _state
+        if course_id in state.loaded:
+            return state.loaded[course_id]
+        entry = state.courses.get(course_id)
+        if entry is None:
+            return None
+        loaded = _materialize(entry)
+        _state = CatalogState(state.courses, state.topic_courses, {**state.loaded, course_id: loaded})
+    for sink in _artifact_sinks:
+        sink(loaded.artifacts)
+    return loaded
+
+
+def on_artifacts(sink: Callable[[dict[str, dict]], None]) -> None:
+    """Call ``sink`` with the precompiled checker data of every loaded course."""
+    _artifact_sinks.append(sink)
+    for loaded in list(_state.loaded.values()):
+        sink(loaded.artifacts)
+
+
+def reload(directory: Path | None = None) -> dict[str, list[str]]:
+    """Rescan the course files and swap in the new catalog in one step.
+
+    Unchanged courses keep their materialized tasks; changed ones are loaded
+    again on next use. If any file is broken the current catalog stays.
+    """
+    global _state
+    with _load_lock:
+        entries = scan(directory)
+        owners = _topic_courses(entries)
+        old = _state
+        kept = {
+            course_id: loaded
+            for course_id, loaded in old.loaded.items()
+            if course_id in entries and entries[course_id].digest == loaded.entry.digest
+        }
+        _state = CatalogState(entries, owners, kept)
+    with _intern_lock:
+        _INTERNED.clear()
+    return {
+        "courses": sorted(entries),
+        "added": sorted(set(entries) - set(old.courses)),
+        "removed": sorted(set(old.courses) - set(entries)),
+        "changed": sorted(
+            course_id
+            for course_id in set(entries) & set(old.courses)
+            if entries[course_id].digest != old.courses[course_id].digest
+        ),
+    }
+
+
+def changed_on_disk(directory: Path | None = None) -> bool:
+    directory = directory or COURSES_DIR
+    state = _state
+    paths = set(directory.glob("*.json"))
+    known = {entry.path: entry.stamp for entry in state.courses.values()}
+    if paths != set(known):
+        return True
+    return any(_stamp(path) != known[path] for path in paths)
+
+
+def watch(interval: float) -> threading.Event:
+    """Reload whenever a course file changes; stops when the returned event is set."""
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while not stop.wait(interval):
+            try:
+                if changed_on_disk():
+                    reload()
+            except (CatalogError, OSError):
+                # Keep serving the last good catalog until the file is fixed.
+                continue
+
+    threading.Thread(target=_loop, name="catalog-watch", daemon=True).start()
+    return stop
+
+
+reload()
+
+
+def list_courses() -> list[dict[str, Any]]:
+    state = _state
+    return [
+        {
+            "id": entry.id,
+            "title": entry.title,
+            "topics": [topic["id"] for topic in entry.topics],
+            "loaded": entry.id in state.loaded,
+        }
+        for entry in state.courses.values()
+    ]
+
+
+def list_topics(course_id: str | None = None) -> list[dict[str, Any]]:
+    state = _state
+    return [
+        topic
+        for entry in state.courses.values()
+        if course_id is None or entry.id == course_id
+        for topic in entry.topics
+    ]
 
 
 def get_topic(topic_id: str) -> dict[str, Any] | None:
-    return next((topic for topic in TOPICS if topic["id"] == topic_id), None)
+    state = _state
+    owner = state.topic_courses.get(topic_id)
+    if owner is None:
+        return None
+    return next((topic for topic in state.courses[owner].topics if topic["id"] == topic_id), None)
+
+
+def course_for_topic(topic_id: str) -> Course | None:
+    owner = _state.topic_courses.get(topic_id)
+    return course(owner) if owner else None
+
+
+def find_task(task_id: str, topic_id: str) -> Task | None:
+    """A generated task, or a static one from the topic's course or any loaded course."""
+    task = TASK_BANK.get(task_id)
+    if task is not None:
+        return task
+    owner = course_for_topic(topic_id)
+    if owner is not None and task_id in owner.tasks:
+        return owner.tasks[task_id]
+    # The client may send a task together with a topic of another course.
+    for loaded in list(_state.loaded.values()):
+        if task_id in loaded.tasks:
+            return loaded.tasks[task_id]
+    return None
 
 
 def sample_task(topic_id: str, target_difficulty: int) -> Task:
-    candidates = [
-        task for task in TASK_BANK.values() if task.topic_id == topic_id and task.difficulty <= target_difficulty
-    ]
-    if not candidates:
-        candidates = [task for task in TASK_BANK.values() if task.topic_id == topic_id]
-    return random.choice(candidates)
+    owner = course_for_topic(topic_id)
+    difficulties, tasks = owner.index.get(topic_id, ([], [])) if owner else ([], [])
+    if not tasks:
+        raise TopicNotFound(topic_id)
+    eligible = bisect_right(difficulties, target_difficulty)
+    return tasks[random.randrange(eligible or len(tasks))]
 
 
 def generate_task(topic_id: str, target_difficulty: int) -> Task:
-    template = templates.choose_template(topic_id, target_difficulty)
+    owner = course_for_topic(topic_id)
+    rules = owner.templates.get(topic_id) if owner else None
+    template = templates.choose_template(rules, target_difficulty)
     if not template:
         return sample_task(topic_id, target_difficulty)
     payload = template()
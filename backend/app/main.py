@@ -1,33 +1,82 @@
 from __future__ import annotations
 
+import hmac
+import os
 import sys
+import threading
 from pathlib import Path
+from typing import Any, Callable
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, WebSocket
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import (
+    FileResponse,
+    ORJSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel
 
 from . import crud
 from .database import init_db
 from .schemas import (
     CheckRequest,
     CheckResponse,
+    CohortMembership,
+    CourseSummary,
     DailyGoalUpdate,
+    ExamResult,
+    ExamSessionPayload,
+    ExamStartRequest,
+    ExamSubmitRequest,
+    GradingJobPayload,
+    GradingJobRequest,
+    LeaderboardPage,
     Message,
     PracticeRequest,
+    ProfilingSettings,
     ProgressPayload,
     ProgressUpdate,
+    RankInfo,
     TaskPayload,
     TopicDetail,
+    TracemallocStart,
+    UserCreate,
     UserSettingsUpdate,
-    Hint,
+    UserSummary,
+)
+from .services import (
+    admission,
+    exam_service,
+    grading_jobs,
+    leaderboard,
+    maintenance,
+    practice_channel,
+    progress_cache,
+    progress_events,
+    profiling,
+    progress_transfer,
+    sync,
+    task_service,
 )
-from .services import task_service
+from .data import topics
 from .data.topics import Task
 
+FAST_JSON = os.getenv("VISHMAT_FAST_JSON") == "1"
+# Each worker process rereads changed course files on its own.
+CATALOG_WATCH_SECONDS = float(os.getenv("VISHMAT_CATALOG_WATCH_SECONDS", "0"))
+_catalog_watch: threading.Event | None = None
+_maintenance_schedule: threading.Event | None = None
+_event_flusher: threading.Event | None = None
+
 app = FastAPI(title="Differential Equations Trainer")
 
+
+# Registered before CORSMiddleware so that CORS stays the outer layer and
+# 429/503 responses still carry its headers.
+app.add_middleware(admission.AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -38,28 +87,70 @@ app.add_middleware(
 
 @app.on_event("startup")
 def startup() -> None:
+    global _catalog_watch, _maintenance_schedule, _event_flusher
     init_db()
     crud.get_or_create_demo_user()
+    leaderboard.rebuild()
+    grading_jobs.start()
+    if CATALOG_WATCH_SECONDS > 0:
+        _catalog_watch = topics.watch(CATALOG_WATCH_SECONDS)
+    _maintenance_schedule = maintenance.start_scheduler()
+    _event_flusher = progress_events.start_flusher()
 
 
-def _task_to_payload(task: Task) -> TaskPayload:
-    return TaskPayload(
-        id=task.id,
-        topic_id=task.topic_id,
-        title=task.title,
-        type=task.type,  # type: ignore[arg-type]
-        prompt=task.prompt,
-        difficulty=task.difficulty,
-        hints=[Hint(**hint) for hint in task.hints],
-        options=task.options,
-        pairs=task.pairs,
-        validation=task.validation,
-    )
+@app.on_event("shutdown")
+def shutdown() -> None:
+    if _catalog_watch is not None:
+        _catalog_watch.set()
+    if _maintenance_schedule is not None:
+        _maintenance_schedule.set()
+    grading_jobs.shutdown()
+    if _event_flusher is not None:
+        _event_flusher.set()
+    progress_events.flush()
+    exam_service.shutdown()
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    expected = os.getenv("VISHMAT_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Администрирование отключено")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Неверный токен администратора")
+
+
+def require_sync_token(x_sync_token: str | None = Header(default=None)) -> None:
+    expected = os.getenv("VISHMAT_SYNC_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Синхронизация отключена")
+    if not x_sync_token or not hmac.compare_digest(x_sync_token, expected):
+        raise HTTPException(status_code=403, detail="Неверный токен синхронизации")
+
+
+def _respond(model: type[BaseModel], data: dict[str, Any]) -> Any:
+    """Return ``data`` as ``model`` or, in fast mode, encode it once with orjson.
+
+    A ``Response`` instance is passed through by FastAPI untouched, which skips
+    the second validation pass against ``response_model``. Fast mode is only
+    used for dicts built by our own code, whose shape already matches ``model``.
+    """
+    if FAST_JSON:
+        return ORJSONResponse(data)
+    return model(**data)
+
+
+def _task_to_dict(task: Task) -> dict[str, Any]:
+    return {**task.to_record(), "expected": None}
+
+
+@app.get("/api/courses", response_model=list[CourseSummary])
+def list_courses() -> list[CourseSummary]:
+    return [CourseSummary(**course) for course in topics.list_courses()]
 
 
 @app.get("/api/topics", response_model=list[TopicDetail])
-def list_topics() -> list[TopicDetail]:
-    return [TopicDetail(**topic) for topic in task_service.list_topics()]
+def list_topics(course_id: str | None = None) -> list[TopicDetail]:
+    return [TopicDetail(**topic) for topic in task_service.list_topics(course_id)]
 
 
 @app.get("/api/topics/{topic_id}", response_model=TopicDetail)
@@ -72,32 +163,126 @@ def get_topic(topic_id: str) -> TopicDetail:
 
 @app.post("/api/practice/generate", response_model=TaskPayload)
 def generate_task(payload: PracticeRequest) -> TaskPayload:
-    task = task_service.generate_task(payload.topic_id, payload.target_difficulty)
-    return _task_to_payload(task)
+    with profiling.profiler.maybe_profile("generate_task"):
+        try:
+            task = task_service.generate_task(payload.topic_id, payload.target_difficulty)
+        except topics.TopicNotFound as exc:
+            raise HTTPException(status_code=404, detail="Тема не найдена") from exc
+        return _respond(TaskPayload, _task_to_dict(task))
 
 
 @app.post("/api/practice/check", response_model=CheckResponse)
 def check_task(payload: CheckRequest) -> CheckResponse:
-    task, correct, feedback = task_service.grade_answer(
-        payload.task_id, payload.topic_id, payload.user_answer
-    )
-    _, _, deltas = crud.upsert_progress(
-        user_id=payload.user_id,
-        topic_id=task.topic_id,
-        correct=correct,
-        difficulty=task.difficulty,
-        time_spent_seconds=60,
-    )
-    xp_awarded = int(deltas["xp_gain"])
-    mastery_delta = float(deltas["mastery_gain"])
-    return CheckResponse(
-        correct=correct,
-        feedback=feedback,
-        xp_awarded=xp_awarded,
-        mastery_delta=mastery_delta,
+    with profiling.profiler.maybe_profile("check_task"):
+        return _grade_and_record(payload)
+
+
+@app.websocket("/api/practice/ws")
+async def practice_socket(websocket: WebSocket, user_id: int = 1) -> None:
+    await websocket.accept()
+    await practice_channel.PracticeChannel(websocket, user_id).run()
+
+
+def _grade_and_record(payload: CheckRequest) -> Any:
+    try:
+        _, result = task_service.check_and_record(
+            payload.user_id, payload.task_id, payload.topic_id, payload.user_answer
+        )
+    except topics.TopicNotFound as exc:
+        raise HTTPException(status_code=404, detail="Тема не найдена") from exc
+    return _respond(CheckResponse, result)
+
+
+def _exam_session_payload(session: Any, tasks: list[Task]) -> dict[str, Any]:
+    return {
+        "session_id": session.id,
+        "user_id": session.user_id,
+        "deadline": session.deadline,
+        "status": session.status,
+        "tasks": [_task_to_dict(task) for task in tasks],
+    }
+
+
+@app.post("/api/exam/sessions", response_model=ExamSessionPayload)
+def start_exam(payload: ExamStartRequest) -> ExamSessionPayload:
+    try:
+        session, tasks = exam_service.create_session(
+            user_id=payload.user_id,
+            topic_ids=payload.topic_ids,
+            course_id=payload.course_id,
+            size=payload.size,
+            duration_minutes=payload.duration_minutes,
+            target_difficulty=payload.target_difficulty,
+        )
+    except exam_service.ExamSessionError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return _respond(ExamSessionPayload, _exam_session_payload(session, tasks))
+
+
+@app.get("/api/exam/sessions/{session_id}", response_model=ExamSessionPayload)
+def get_exam(session_id: str) -> ExamSessionPayload:
+    try:
+        session, tasks = exam_service.load_session(session_id)
+    except exam_service.ExamSessionNotFound as exc:
+        raise HTTPException(status_code=404, detail="Экзамен не найден") from exc
+    return _respond(ExamSessionPayload, _exam_session_payload(session, tasks))
+
+
+@app.post("/api/exam/sessions/{session_id}/submit", response_model=ExamResult)
+def submit_exam(session_id: str, payload: ExamSubmitRequest) -> ExamResult:
+    try:
+        result = exam_service.submit(session_id, payload.answers)
+    except exam_service.ExamSessionNotFound as exc:
+        raise HTTPException(status_code=404, detail="Экзамен не найден") from exc
+    except exam_service.ExamSessionClosed as exc:
+        detail = "Время экзамена истекло" if str(exc) == "expired" else "Экзамен уже сдан"
+        raise HTTPException(status_code=409, detail=detail) from exc
+    return _respond(ExamResult, result)
+
+
+def _queue_full(exc: admission.Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Очередь проверки заполнена, повторите позже",
+        headers={"Retry-After": str(exc.retry_after)},
     )
 
 
+@app.post("/api/exam/sessions/{session_id}/submit-async", response_model=GradingJobPayload, status_code=202)
+def submit_exam_async(session_id: str, payload: ExamSubmitRequest) -> GradingJobPayload:
+    try:
+        job = grading_jobs.submit_exam(session_id, payload.answers)
+    except exam_service.ExamSessionNotFound as exc:
+        raise HTTPException(status_code=404, detail="Экзамен не найден") from exc
+    except exam_service.ExamSessionClosed as exc:
+        detail = "Время экзамена истекло" if str(exc) == "expired" else "Экзамен уже сдан"
+        raise HTTPException(status_code=409, detail=detail) from exc
+    except admission.Overloaded as exc:
+        raise _queue_full(exc) from exc
+    return GradingJobPayload(**job)
+
+
+@app.post("/api/jobs", response_model=GradingJobPayload, status_code=202)
+def submit_grading_job(payload: GradingJobRequest) -> GradingJobPayload:
+    try:
+        job = grading_jobs.submit_practice(payload.user_id, [item.dict() for item in payload.items])
+    except admission.Overloaded as exc:
+        raise _queue_full(exc) from exc
+    return GradingJobPayload(**job)
+
+
+@app.get("/api/jobs/{job_id}", response_model=GradingJobPayload)
+async def get_grading_job(job_id: str, wait: float = Query(default=0.0, ge=0.0)) -> GradingJobPayload:
+    try:
+        if wait:
+            job = await grading_jobs.wait(job_id, wait)
+        else:
+            job = await run_in_threadpool(grading_jobs.get, job_id)
+    except grading_jobs.JobNotFound as exc:
+        raise HTTPException(status_code=404, detail="Задание проверки не найдено") from exc
+    return GradingJobPayload(**job)
+
+
 @app.post("/api/progress/update", response_model=ProgressPayload)
 def update_progress(payload: ProgressUpdate) -> ProgressPayload:
     crud.upsert_progress(
@@ -108,13 +293,13 @@ def update_progress(payload: ProgressUpdate) -> ProgressPayload:
         time_spent_seconds=payload.time_spent_seconds,
     )
     data = crud.get_progress_payload(payload.user_id)
-    return ProgressPayload(**data)
+    return _respond(ProgressPayload, data)
 
 
 @app.get("/api/progress/{user_id}", response_model=ProgressPayload)
 def get_progress(user_id: int) -> ProgressPayload:
     data = crud.get_progress_payload(user_id)
-    return ProgressPayload(**data)
+    return _respond(ProgressPayload, data)
 
 
 @app.post("/api/user/settings", response_model=Message)
@@ -129,6 +314,241 @@ def update_goal(payload: DailyGoalUpdate) -> Message:
     return Message(message="Цель обновлена")
 
 
+@app.get("/api/leaderboard", response_model=LeaderboardPage)
+def global_leaderboard(
+    offset: int = Query(default=0, ge=0), limit: int = Query(default=20, ge=1, le=100)
+) -> LeaderboardPage:
+    return LeaderboardPage(**leaderboard.top(offset=offset, limit=limit))
+
+
+@app.get("/api/leaderboard/topics/{topic_id}", response_model=LeaderboardPage)
+def topic_leaderboard(
+    topic_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100),
+) -> LeaderboardPage:
+    return LeaderboardPage(**leaderboard.top(offset=offset, limit=limit, topic_id=topic_id))
+
+
+@app.get("/api/leaderboard/cohorts/{cohort_id}", response_model=LeaderboardPage)
+def cohort_leaderboard(
+    cohort_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100),
+) -> LeaderboardPage:
+    return LeaderboardPage(**leaderboard.top(offset=offset, limit=limit, cohort_id=cohort_id))
+
+
+@app.get("/api/leaderboard/rank/{user_id}", response_model=RankInfo)
+def leaderboard_rank(
+    user_id: int, topic_id: str | None = None, cohort_id: str | None = None
+) -> RankInfo:
+    info = leaderboard.rank_of(user_id, topic_id=topic_id, cohort_id=cohort_id)
+    if not info:
+        raise HTTPException(status_code=404, detail="Пользователь не участвует в рейтинге")
+    return RankInfo(**info)
+
+
+@app.post(
+    "/api/cohorts/{cohort_id}/members", response_model=Message, dependencies=[Depends(require_admin)]
+)
+def join_cohort(cohort_id: str, payload: CohortMembership) -> Message:
+    try:
+        crud.add_cohort_member(cohort_id, payload.user_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail="Пользователь не найден") from exc
+    return Message(message="Пользователь добавлен в группу")
+
+
+@app.post("/api/admin/users", response_model=UserSummary, dependencies=[Depends(require_admin)])
+def create_user(payload: UserCreate) -> UserSummary:
+    user = crud.get_or_create_user(payload.email, payload.display_name)
+    return UserSummary(id=user.id, email=user.email, display_name=user.display_name)
+
+
+@app.get("/api/admin/admission", dependencies=[Depends(require_admin)])
+def admission_stats() -> dict[str, dict[str, int]]:
+    return {
+        "grading": admission.grading_gate.stats(),
+        "read": admission.read_gate.stats(),
+        "jobs": grading_jobs.stats(),
+        "events": progress_events.stats(),
+    }
+
+
+@app.post("/api/admin/catalog/reload", dependencies=[Depends(require_admin)])
+def reload_catalog() -> dict[str, list[str]]:
+    try:
+        return topics.reload()
+    except topics.CatalogError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@app.get("/api/admin/maintenance", dependencies=[Depends(require_admin)])
+def maintenance_status() -> dict[str, Any]:
+    return maintenance.status()
+
+
+@app.post("/api/admin/maintenance/backup", dependencies=[Depends(require_admin)], status_code=202)
+def start_backup() -> dict[str, Any]:
+    return _start_maintenance(maintenance.backup_in_background)
+
+
+@app.post("/api/admin/maintenance/vacuum", dependencies=[Depends(require_admin)], status_code=202)
+def start_vacuum(analyze_only: bool = False) -> dict[str, Any]:
+    return _start_maintenance(lambda: maintenance.vacuum_in_background(analyze_only=analyze_only))
+
+
+def _start_maintenance(start: Callable[[], None]) -> dict[str, Any]:
+    try:
+        start()
+    except maintenance.MaintenanceBusy as exc:
+        raise HTTPException(status_code=409, detail="Обслуживание базы уже идёт") from exc
+    return maintenance.status()
+
+
+@app.get("/api/admin/profiling", dependencies=[Depends(require_admin)])
+def profiling_state() -> dict[str, Any]:
+    return profiling.profiler.state()
+
+
+@app.post("/api/admin/profiling", dependencies=[Depends(require_admin)])
+def configure_profiling(payload: ProfilingSettings) -> dict[str, Any]:
+    profiling.profiler.configure(
+        enabled=payload.enabled,
+        sample_rate=payload.sample_rate,
+        endpoints=payload.endpoints,
+    )
+    return profiling.profiler.state()
+
+
+@app.delete("/api/admin/profiling", dependencies=[Depends(require_admin)])
+def reset_profiling() -> dict[str, Any]:
+    profiling.profiler.reset()
+    return profiling.profiler.state()
+
+
+@app.get("/api/admin/profiling/report", dependencies=[Depends(require_admin)])
+def profiling_report(
+    format: str = Query(default="json", pattern="^(json|collapsed)$"),
+    limit: int = Query(default=30, ge=1, le=500),
+    sort: str = Query(default="cumulative", pattern="^(cumulative|tottime)$"),
+) -> Any:
+    if format == "collapsed":
+        return PlainTextResponse(profiling.profiler.collapsed_stacks())
+    return {
+        **profiling.profiler.state(),
+        "functions": profiling.profiler.hot_functions(limit, sort),
+    }
+
+
+@app.post("/api/admin/tracemalloc/start", dependencies=[Depends(require_admin)])
+def start_tracemalloc(payload: TracemallocStart) -> dict[str, Any]:
+    profiling.allocations.start(payload.frames)
+    return profiling.allocations.state()
+
+
+@app.post("/api/admin/tracemalloc/stop", dependencies=[Depends(require_admin)])
+def stop_tracemalloc() -> dict[str, Any]:
+    profiling.allocations.stop()
+    return profiling.allocations.state()
+
+
+@app.get("/api/admin/tracemalloc/snapshot", dependencies=[Depends(require_admin)])
+def tracemalloc_snapshot(
+    limit: int = Query(default=20, ge=1, le=200),
+    group_by: str = Query(default="lineno", pattern="^(lineno|filename|traceback)$"),
+) -> dict[str, Any]:
+    try:
+        report = profiling.allocations.snapshot(limit, group_by)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail="Сначала запустите tracemalloc") from exc
+    return {**report, "task_bank_size": len(topics.TASK_BANK)}
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+@app.get("/api/admin/export", dependencies=[Depends(require_admin)])
+def export_progress(format: str = "ndjson", chunk_size: int = 500) -> StreamingResponse:
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Неизвестный формат выгрузки")
+    if format != "ndjson":
+        try:
+            progress_transfer.require_arrow()
+        except RuntimeError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return StreamingResponse(
+        progress_transfer.iter_export(format, chunk_size),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="progress.{format}"'},
+    )
+
+
+@app.post("/api/admin/import", dependencies=[Depends(require_admin)])
+async def import_progress(request: Request, email: str | None = None) -> dict[str, int]:
+    totals = {"users_created": 0, "users_updated": 0, "topics_merged": 0}
+    chunk: list[bytes] = []
+    tail = b""
+    first_line = 1
+
+    async def _apply(lines: list[bytes]) -> None:
+        nonlocal first_line
+        rows = progress_transfer.read_ndjson(lines, require_email=email is None, first_line=first_line)
+        first_line += len(lines)
+        stats = await run_in_threadpool(progress_transfer.import_rows, rows, email_override=email)
+        for key, value in stats.items():
+            totals[key] += value
+
+    try:
+        async for block in request.stream():
+            lines = (tail + block).split(b"\n")
+            tail = lines.pop()
+            chunk.extend(lines)
+            if len(chunk) >= progress_transfer.DEFAULT_CHUNK_SIZE:
+                await _apply(chunk)
+                chunk = []
+        chunk.append(tail)
+        await _apply(chunk)
+    except progress_transfer.MalformedRow as exc:
+        # Earlier chunks are already merged; merging is idempotent, so the
+        # corrected file can simply be imported again.
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        await run_in_threadpool(leaderboard.rebuild)
+        progress_cache.clear()
+    return totals
+
+
+@app.post("/api/sync/push", dependencies=[Depends(require_sync_token)])
+async def sync_push(request: Request) -> dict[str, Any]:
+    try:
+        batch = sync.decode_batch(await request.body(), request.headers.get("content-encoding"))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # Every install has the demo account; merging them would mix up students.
+    if crud.DEFAULT_USER_EMAIL in batch.accounts():
+        raise HTTPException(
+            status_code=400, detail="Укажите учётную запись: демо-пользователь не синхронизируется"
+        )
+    try:
+        return await run_in_threadpool(sync.apply_batch, batch)
+    except sync.SyncGap as exc:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Нужна полная синхронизация", "version": exc.version},
+        ) from exc
+
+
+@app.get("/api/admin/sync/receipts", dependencies=[Depends(require_admin)])
+def sync_receipts() -> list[dict[str, Any]]:
+    return sync.receipts()
+
+
 def _resolve_frontend_dir() -> Path | None:
     candidates = []
     if hasattr(sys, "_MEIPASS"):
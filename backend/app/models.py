@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime
 from typing import List, Optional
 
 from sqlmodel import Field, Relationship, SQLModel
@@ -27,3 +27,109 @@ class TopicProgress(SQLModel, table=True):
     xp_earned: int = Field(default=0)
 
     user: "User" = Relationship(back_populates="progress")
+
+
+class AnswerEvent(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    task_id: Optional[str] = None
+    topic_id: str = Field(index=True)
+    correct: bool
+    difficulty: int
+    duration_seconds: int
+    xp_gain: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class DailyXp(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    xp: int = Field(default=0)
+    answers: int = Field(default=0)
+    seconds: int = Field(default=0)
+
+
+class TopicAccuracy(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    topic_id: str = Field(primary_key=True)
+    attempts: int = Field(default=0)
+    correct: int = Field(default=0)
+
+
+class CohortMember(SQLModel, table=True):
+    cohort_id: str = Field(primary_key=True)
+    user_id: int = Field(foreign_key="user.id", primary_key=True, index=True)
+
+
+class ExamSession(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    status: str = Field(default="active")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    deadline: datetime
+    tasks_blob: bytes
+    results_blob: Optional[bytes] = None
+    score: int = Field(default=0)
+
+
+class ChangeLog(SQLModel, table=True):
+    """Users and topic rows changed locally since the last acknowledged sync.
+
+    The counters are increments; a ``full`` entry carries the whole value of
+    the row instead, as logged before a first sync or after a gap.
+    """
+
+    # Versions must never be reused after acknowledged entries are deleted.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    version: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    topic_id: Optional[str] = None
+    xp: int = Field(default=0)
+    mastery: float = Field(default=0.0)
+    completed_lessons: int = Field(default=0)
+    xp_earned: int = Field(default=0)
+    full: bool = Field(default=False)
+
+
+class SyncReceipt(SQLModel, table=True):
+    client_id: str = Field(primary_key=True)
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class SyncContribution(SQLModel, table=True):
+    """Counters one client has added for one of its local users; ``topic_id`` is "" for the user row."""
+
+    client_id: str = Field(primary_key=True)
+    email: str = Field(primary_key=True)
+    topic_id: str = Field(primary_key=True)
+    xp: int = Field(default=0)
+    mastery: float = Field(default=0.0)
+    completed_lessons: int = Field(default=0)
+    xp_earned: int = Field(default=0)
+
+
+class JobAnswer(SQLModel, table=True):
+    """An answer a grading job has recorded; a rerun of the job skips it."""
+
+    job_id: str = Field(primary_key=True)
+    item: str = Field(primary_key=True)
+
+
+class GradingJob(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    kind: str
+    priority: int = Field(index=True)
+    status: str = Field(default="queued", index=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    payload_blob: bytes
+    result_blob: Optional[bytes] = None
+    error: Optional[str] = None
+    attempts: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # The process running the job and until when it holds it; renewed while it runs.
+    owner: Optional[str] = None
+    lease_until: Optional[datetime] = Field(default=None, index=True)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime
 from typing import Any, Literal, Optional
 
 from pydantic import BaseModel, Field
@@ -18,6 +18,8 @@ class TaskPayload(BaseModel):
     type: Literal[
         "method-choice",
         "solve-ode",
+        "solve-system",
+        "laplace",
         "match",
         "numeric",
         "theory",
@@ -59,6 +61,13 @@ class TopicMiniTheory(BaseModel):
     recommended_path: list[str]
 
 
+class CourseSummary(BaseModel):
+    id: str
+    title: str
+    topics: list[str]
+    loaded: bool
+
+
 class TopicDetail(TopicMiniTheory):
     theory_points: list[str]
     examples: list[str]
@@ -72,6 +81,14 @@ class ProgressEntry(BaseModel):
     completed_lessons: int
     best_score: float
     xp_earned: int
+    attempts: int = 0
+    accuracy: float = 0.0
+
+
+class DailyXpEntry(BaseModel):
+    day: date
+    xp: int
+    answers: int
 
 
 class ProgressPayload(BaseModel):
@@ -81,6 +98,7 @@ class ProgressPayload(BaseModel):
     last_active: date
     daily_goal_minutes: int
     progress: list[ProgressEntry]
+    daily_xp: list[DailyXpEntry] = []
 
 
 class ProgressUpdate(BaseModel):
@@ -101,5 +119,106 @@ class DailyGoalUpdate(BaseModel):
     minutes: int
 
 
+class ExamStartRequest(BaseModel):
+    user_id: int
+    topic_ids: list[str] = []
+    course_id: Optional[str] = None
+    size: int = Field(default=6, ge=1, le=30)
+    duration_minutes: int = Field(default=45, ge=1, le=240)
+    target_difficulty: int = Field(default=3, ge=1, le=5)
+
+
+class ExamSessionPayload(BaseModel):
+    session_id: str
+    user_id: int
+    deadline: datetime
+    status: str
+    tasks: list[TaskPayload]
+
+
+class ExamSubmitRequest(BaseModel):
+    answers: dict[str, Any]
+
+
+class ExamTaskResult(BaseModel):
+    task_id: str
+    correct: bool
+    feedback: str
+    xp_awarded: int
+
+
+class ExamResult(BaseModel):
+    session_id: str
+    score: int
+    total: int
+    xp_awarded: int
+    results: list[ExamTaskResult]
+
+
+class GradingJobItem(BaseModel):
+    task_id: str
+    topic_id: str
+    user_answer: Any
+
+
+class GradingJobRequest(BaseModel):
+    user_id: int = 1
+    items: list[GradingJobItem] = Field(min_items=1, max_items=50)
+
+
+class GradingJobPayload(BaseModel):
+    job_id: str
+    kind: Literal["practice", "exam"]
+    status: Literal["queued", "running", "done", "failed"]
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    display_name: str
+    score: int
+
+
+class LeaderboardPage(BaseModel):
+    total: int
+    entries: list[LeaderboardEntry]
+
+
+class RankInfo(BaseModel):
+    user_id: int
+    rank: int
+    score: int
+    total: int
+
+
+class CohortMembership(BaseModel):
+    user_id: int
+
+
+class UserCreate(BaseModel):
+    email: str
+    display_name: str
+
+
+class UserSummary(BaseModel):
+    id: int
+    email: str
+    display_name: str
+
+
+class ProfilingSettings(BaseModel):
+    enabled: bool
+    sample_rate: float = Field(default=0.1, ge=0.0, le=1.0)
+    endpoints: Optional[list[str]] = None
+
+
+class TracemallocStart(BaseModel):
+    frames: int = Field(default=10, ge=1, le=100)
+
+
 class Message(BaseModel):
     message: str
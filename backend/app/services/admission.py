@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; carries a ``Retry-After`` hint."""
+
+    def __init__(self, gate: str, retry_after: int) -> None:
+        super().__init__(gate)
+        self.gate = gate
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """Concurrency limit with a bounded wait queue in front of it.
+
+    Runs on the event loop, so the counters need no locking. A request that
+    finds every slot busy and the queue full, or waits longer than
+    ``max_wait`` seconds, is rejected instead of piling up.
+    """
+
+    def __init__(self, name: str, *, limit: int, max_queue: int, max_wait: float, retry_after: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(self.name, self.retry_after) from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
+
+
+class RateLimiter:
+    """Token bucket per key: ``rate`` requests per second with bursts up to ``burst``."""
+
+    def __init__(self, *, rate: float, burst: int, idle_seconds: float = 600.0) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._buckets: dict[object, tuple[float, float]] = {}
+        self._last_prune = time.monotonic()
+
+    def acquire(self, key: object) -> float:
+        """Take a token for ``key``; returns 0 or the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens >= 1.0:
+                self._buckets[key] = (tokens - 1.0, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1.0 - tokens) / self.rate
+            if now - self._last_prune > self.idle_seconds:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now: float) -> None:
+        self._last_prune = now
+        stale = [key for key, (_, updated) in self._buckets.items() if now - updated > self.idle_seconds]
+        for key in stale:
+            del self._buckets[key]
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+_CPUS = os.cpu_count() or 1
+
+# Both gates feed the same AnyIO threadpool (40 threads by default) that runs the
+# sync endpoints, so the two limits together stay below its size: grading can
+# never take the threads that reads need.
+grading_gate = AdmissionGate(
+    "grading",
+    limit=_env_int("VISHMAT_GRADING_CONCURRENCY", min(_CPUS, 8)),
+    max_queue=_env_int("VISHMAT_GRADING_QUEUE", 4 * min(_CPUS, 8)),
+    max_wait=float(os.getenv("VISHMAT_GRADING_MAX_WAIT", "10")),
+    retry_after=_env_int("VISHMAT_GRADING_RETRY_AFTER", 2),
+)
+read_gate = AdmissionGate(
+    "read",
+    limit=_env_int("VISHMAT_READ_CONCURRENCY", 24),
+    max_queue=_env_int("VISHMAT_READ_QUEUE", 512),
+    max_wait=float(os.getenv("VISHMAT_READ_MAX_WAIT", "10")),
+    retry_after=_env_int("VISHMAT_READ_RETRY_AFTER", 1),
+)
+check_rate_limiter = RateLimiter(
+    rate=float(os.getenv("VISHMAT_CHECK_RATE", "1")),
+    burst=_env_int("VISHMAT_CHECK_BURST", 5),
+)
+# Shared by everyone behind one address, e.g. a classroom behind NAT, so it is
+# looser than the per-student bucket.
+address_rate_limiter = RateLimiter(
+    rate=float(os.getenv("VISHMAT_CHECK_ADDRESS_RATE", "10")),
+    burst=_env_int("VISHMAT_CHECK_ADDRESS_BURST", 30),
+)
+
+
+GRADING_PATHS = ("/api/practice/check",)
+# Endpoints that grade answers on the caller's behalf, limited per client.
+RATE_LIMITED_PATHS = ("/api/practice/check", "/api/jobs")
+
+
+def gate_for(method: str, path: str) -> AdmissionGate | None:
+    if not path.startswith("/api/") or path.startswith("/api/admin/"):
+        return None
+    # Long-polls on grading jobs sleep on the event loop and hold no thread, so
+    # they must not occupy read slots while they wait.
+    if method == "GET" and path.startswith("/api/jobs/"):
+        return None
+    if method == "POST" and (path in GRADING_PATHS or path.startswith("/api/exam/sessions/")):
+        return grading_gate
+    return read_gate
+
+
+def retry_after_seconds(wait: float) -> int:
+    return max(1, math.ceil(wait))
+
+
+def _host(client: Any) -> str:
+    return client[0] if client else ""
+
+
+def rate_key(client: Any, user_id: Any) -> tuple[str, Any]:
+    """Bucket of one student: the client address together with the claimed user id.
+
+    Students behind different addresses never share a bucket. The id is
+    whatever the client sends, so a client can get a fresh bucket by switching
+    ids; ``check_rate`` also charges the address bucket for that reason.
+    """
+    return _host(client), user_id
+
+
+def check_rate(client: Any, user_id: Any) -> float:
+    """Take a token from the address bucket and the student's; 0 or the seconds to wait."""
+    wait = address_rate_limiter.acquire(_host(client))
+    if wait:
+        return wait
+    return check_rate_limiter.acquire(rate_key(client, user_id))
+
+
+def _claimed_user(body: bytes) -> Any:
+    try:
+        document = json.loads(body)
+    except ValueError:
+        return None
+    return document.get("user_id") if isinstance(document, dict) else None
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    delivered = False
+
+    async def _receive() -> Message:
+        nonlocal delivered
+        if delivered:
+            return await receive()
+        delivered = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return _receive
+
+
+class AdmissionMiddleware:
+    """Rate-limits grading calls, then admits requests through their gate.
+
+    The rate check comes first, so a client over its limit is turned away at
+    once instead of after waiting for a grading slot. A plain ASGI middleware,
+    because it reads the request body and hands it on to the endpoint.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method, path = scope["method"], scope["path"]
+        if method == "POST" and path in RATE_LIMITED_PATHS:
+            body = await _read_body(receive)
+            wait = check_rate(scope.get("client"), _claimed_user(body))
+            if wait:
+                response = JSONResponse(
+                    {"detail": "Слишком много проверок подряд"},
+                    status_code=429,
+                    headers={"Retry-After": str(retry_after_seconds(wait))},
+                )
+                await response(scope, receive, send)
+                return
+            receive = _replay(body, receive)
+        gate = gate_for(method, path)
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            async with gate.admit():
+                await self.app(scope, receive, send)
+        except Overloaded as exc:
+            response = JSONResponse(
+                {"detail": "Сервер перегружен, повторите запрос позже"},
+                status_code=503,
+                headers={"Retry-After": str(exc.retry_after)},
+            )
+            await response(scope, receive, send)
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import uuid
+import zlib
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import update
+
+from .. import crud
+from ..data import snapshot, topics
+from ..data.topics import Task
+from ..database import get_session
+from ..models import ExamSession, User
+from . import sympy_checker
+
+logger = logging.getLogger(__name__)
+
+GRACE_PERIOD = timedelta(seconds=int(os.getenv("VISHMAT_EXAM_GRACE_SECONDS", "30")))
+GRADING_PROCESSES = int(os.getenv("VISHMAT_GRADING_PROCESSES", str(min(4, os.cpu_count() or 1))))
+MAX_GENERATION_ATTEMPTS = 5
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+class ExamSessionError(Exception):
+    """Raised when an exam session cannot be used for the requested action."""
+
+
+class ExamSessionNotFound(ExamSessionError):
+    pass
+
+
+class ExamSessionClosed(ExamSessionError):
+    pass
+
+
+def _grading_executor() -> Executor:
+    # SymPy grading is CPU-bound pure Python, so a process pool is what actually
+    # runs a ticket in parallel; VISHMAT_GRADING_PROCESSES=0 keeps it in threads
+    # (the desktop build, where spawning processes is not worth it). Workers are
+    # spawned, not forked: forking a server that already runs threads can copy
+    # a lock some other thread holds.
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if GRADING_PROCESSES > 0:
+                _executor = ProcessPoolExecutor(
+                    max_workers=GRADING_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _discard_executor(executor: Executor) -> None:
+    """Drop a broken pool, so the next ticket starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _pack_tasks(tasks: list[Task]) -> bytes:
+    records = [task.to_record() for task in tasks]
+    return zlib.compress(json.dumps(records, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack_tasks(blob: bytes) -> list[Task]:
+    return [Task(**record) for record in json.loads(zlib.decompress(blob))]
+
+
+def _generate_ticket(topic_ids: list[str], size: int, target_difficulty: int) -> list[Task]:
+    """Up to ``size`` distinct tasks; a topic with fewer static tasks than its share
+    contributes what it has instead of repeating one."""
+    tasks: list[Task] = []
+    seen: set[str] = set()
+    for index in range(size):
+        topic_id = topic_ids[index % len(topic_ids)]
+        for _ in range(MAX_GENERATION_ATTEMPTS):
+            try:
+                task = topics.generate_task(topic_id, target_difficulty)
+            except topics.TopicNotFound as exc:
+                raise ExamSessionError(f"Topic has no tasks: {topic_id}") from exc
+            if task.id not in seen:
+                break
+        else:
+            continue
+        seen.add(task.id)
+        sympy_checker.precompile(task)
+        tasks.append(task)
+    return tasks
+
+
+def create_session(
+    *,
+    user_id: int,
+    topic_ids: list[str],
+    course_id: str | None = None,
+    size: int,
+    duration_minutes: int,
+    target_difficulty: int,
+) -> tuple[ExamSession, list[Task]]:
+    known = {topic["id"] for topic in topics.list_topics(course_id)}
+    if not known:
+        raise ExamSessionError(f"Unknown course: {course_id}")
+    unknown = [topic_id for topic_id in topic_ids if topic_id not in known]
+    if unknown:
+        raise ExamSessionError(f"Unknown topics: {', '.join(unknown)}")
+    with get_session() as session:
+        if not session.get(User, user_id):
+            raise ExamSessionError("User not found")
+    tasks = _generate_ticket(topic_ids or sorted(known), size, target_difficulty)
+    now = datetime.utcnow()
+    session_row = ExamSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        created_at=now,
+        deadline=now + timedelta(minutes=duration_minutes),
+        tasks_blob=_pack_tasks(tasks),
+    )
+    with get_session() as session:
+        session.add(session_row)
+        session.commit()
+        session.refresh(session_row)
+    return session_row, tasks
+
+
+def load_session(session_id: str) -> tuple[ExamSession, list[Task]]:
+    with get_session() as session:
+        row = session.get(ExamSession, session_id)
+        if not row:
+            raise ExamSessionNotFound(session_id)
+        session.expunge(row)
+    return row, _unpack_tasks(row.tasks_blob)
+
+
+def _grade_one(task: Task, answer: Any) -> tuple[bool, str]:
+    try:
+        return sympy_checker.check_task_answer(task, answer)
+    except Exception:  # pragma: no cover - defensive, one bad answer must not sink the ticket
+        return False, "Не удалось проверить ответ"
+
+
+def _grade_with_artifacts(task: Task, answer: Any, artifacts: bytes) -> tuple[bool, str]:
+    """Runs in a grading process: check with the reference data parsed by the server."""
+    added = sympy_checker.install_artifacts(pickle.loads(artifacts))
+    try:
+        return _grade_one(task, answer)
+    finally:
+        # Generated tasks are one-off; do not let worker memory grow with them.
+        sympy_checker.remove_artifacts(added)
+
+
+def _submit_grading(executor: Executor, task: Task, answer: Any) -> Any:
+    if isinstance(executor, ProcessPoolExecutor):
+        artifacts = snapshot.dumps(sympy_checker.task_artifacts(task))
+        return executor.submit(_grade_with_artifacts, task, answer, artifacts)
+    return executor.submit(_grade_one, task, answer)
+
+
+def grade_ticket(tasks: list[Task], answers: dict[str, Any]) -> list[tuple[Task, bool, str] | None]:
+    """Grade every answered task in parallel; unanswered tasks yield ``None``.
+
+    A task the pool fails to grade (e.g. a grading process died and broke the
+    pool) is graded here in the calling thread instead: the session is already
+    closed, so the ticket must get a result.
+    """
+    executor = _grading_executor()
+    futures: dict[str, Future | None] = {}
+    for task in tasks:
+        if task.id not in answers:
+            continue
+        try:
+            futures[task.id] = _submit_grading(executor, task, answers[task.id])
+        except Exception:
+            logger.exception("Не удалось отправить задачу %s на проверку", task.id)
+            futures[task.id] = None
+    broken = False
+    results: list[tuple[Task, bool, str] | None] = []
+    for task in tasks:
+        if task.id not in futures:
+            results.append(None)
+            continue
+        future = futures[task.id]
+        try:
+            if future is None:
+                raise RuntimeError("the task was not submitted")
+            correct, feedback = future.result()
+        except Exception:
+            logger.exception("Проверка задачи %s в пуле не удалась, проверяем на месте", task.id)
+            broken = True
+            correct, feedback = _grade_one(task, answers[task.id])
+        results.append((task, correct, feedback))
+    if broken:
+        _discard_executor(executor)
+    return results
+
+
+def close_session(session_id: str, *, now: datetime) -> ExamSession:
+    """Atomically move an active, in-time session to ``submitted``."""
+    with get_session() as session:
+        row = session.get(ExamSession, session_id)
+        if not row:
+            raise ExamSessionNotFound(session_id)
+        if row.status == "active" and now > row.deadline + GRACE_PERIOD:
+            row.status = "expired"
+            session.add(row)
+            session.commit()
+        if row.status != "active":
+            raise ExamSessionClosed(row.status)
+        claimed = session.execute(
+            update(ExamSession)
+            .where(ExamSession.id == session_id, ExamSession.status == "active")
+            .values(status="submitted")
+        )
+        session.commit()
+        if claimed.rowcount != 1:
+            raise ExamSessionClosed("submitted")
+        session.refresh(row)
+        session.expunge(row)
+    return row
+
+
+def store_results(session_id: str, results: list[dict[str, Any]], score: int) -> None:
+    blob = zlib.compress(json.dumps(results, ensure_ascii=False).encode("utf-8"))
+    with get_session() as session:
+        row = session.get(ExamSession, session_id)
+        if row:
+            row.results_blob = blob
+            row.score = score
+            session.add(row)
+            session.commit()
+
+
+def submit(session_id: str, answers: dict[str, Any]) -> dict[str, Any]:
+    now = datetime.utcnow()
+    row = close_session(session_id, now=now)
+    return grade_submission(row, answers, submitted_at=now)
+
+
+def grade_submission(
+    row: ExamSession, answers: dict[str, Any], *, submitted_at: datetime, job_id: str | None = None
+) -> dict[str, Any]:
+    """Grade a closed session, record progress and store the results.
+
+    ``job_id`` is the grading job doing this; answers it already recorded
+    before an interruption are not counted twice.
+    """
+    session_id = row.id
+    tasks = _unpack_tasks(row.tasks_blob)
+    graded = grade_ticket(tasks, answers)
+
+    answered = sum(1 for outcome in graded if outcome is not None)
+    seconds_per_task = int((min(submitted_at, row.deadline) - row.created_at).total_seconds()) // max(1, answered)
+    results: list[dict[str, Any]] = []
+    score = 0
+    xp_total = 0
+    for task, outcome in zip(tasks, graded):
+        if outcome is None:
+            results.append(
+                {"task_id": task.id, "correct": False, "feedback": "Нет ответа", "xp_awarded": 0}
+            )
+            continue
+        _, correct, feedback = outcome
+        _, _, deltas = crud.upsert_progress(
+            user_id=row.user_id,
+            topic_id=task.topic_id,
+            correct=correct,
+            difficulty=task.difficulty,
+            time_spent_seconds=seconds_per_task,
+            task_id=task.id,
+            job_item=(job_id, task.id) if job_id else None,
+        )
+        xp_awarded = int(deltas["xp_gain"])
+        score += int(correct)
+        xp_total += xp_awarded
+        results.append(
+            {"task_id": task.id, "correct": correct, "feedback": feedback, "xp_awarded": xp_awarded}
+        )
+
+    store_results(session_id, results, score)
+    return {
+        "session_id": session_id,
+        "score": score,
+        "total": len(tasks),
+        "xp_awarded": xp_total,
+        "results": results,
+    }
@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlmodel import delete, func, select
+
+from ..database import get_session
+from ..models import GradingJob, JobAnswer
+from . import admission, exam_service, task_service
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: an exam submission waits on a deadline, practice does not.
+PRIORITIES = {"exam": 0, "practice": 1}
+WORKERS = int(os.getenv("VISHMAT_JOB_WORKERS", "2"))
+MAX_QUEUED = int(os.getenv("VISHMAT_JOB_QUEUE", "1000"))
+RETRY_AFTER_SECONDS = 5
+RETENTION = timedelta(hours=int(os.getenv("VISHMAT_JOB_RETENTION_HOURS", "24")))
+MAX_WAIT_SECONDS = 30.0
+# A job that keeps failing after this many starts (e.g. it crashes the worker
+# process on every restart) is marked failed instead of being requeued.
+MAX_ATTEMPTS = 3
+# A running job belongs to the process that claimed it for this long and the
+# process renews the lease while the job runs; only an expired lease means the
+# owner is gone, so several server processes can share the table.
+LEASE = timedelta(seconds=int(os.getenv("VISHMAT_JOB_LEASE_SECONDS", "60")))
+BOOT_ID = uuid.uuid4().hex
+
+_queue: queue.PriorityQueue[tuple[int, int, str]] = queue.PriorityQueue()
+_sequence = itertools.count()
+_workers: list[threading.Thread] = []
+_lock = threading.Lock()
+# Ids on the local queue and ids this process is running, guarded by ``_lock``.
+_enqueued: set[str] = set()
+_running: set[str] = set()
+_keeper_stop: threading.Event | None = None
+# Long-poll waiters per job: (event loop, event) pairs set when the job finishes.
+_waiters: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+
+class JobNotFound(Exception):
+    pass
+
+
+def _pack(data: Any) -> bytes:
+    return zlib.compress(json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _unpack(blob: bytes | None) -> Any:
+    return json.loads(zlib.decompress(blob)) if blob else None
+
+
+def _put(priority: int, job_id: str) -> None:
+    with _lock:
+        if job_id in _enqueued:
+            return
+        _enqueued.add(job_id)
+    _queue.put((priority, next(_sequence), job_id))
+
+
+def _ensure_capacity() -> None:
+    with get_session() as session:
+        queued = session.exec(select(func.count(GradingJob.id)).where(GradingJob.status == "queued")).one()
+    if queued >= MAX_QUEUED:
+        raise admission.Overloaded("jobs", RETRY_AFTER_SECONDS)
+
+
+def _enqueue(kind: str, user_id: int, payload: dict[str, Any]) -> dict[str, Any]:
+    with get_session() as session:
+        job = GradingJob(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            priority=PRIORITIES[kind],
+            user_id=user_id,
+            payload_blob=_pack(payload),
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        _put(job.priority, job.id)
+        return _describe(job)
+
+
+def submit_practice(user_id: int, items: list[dict[str, Any]]) -> dict[str, Any]:
+    _ensure_capacity()
+    return _enqueue("practice", user_id, {"items": items})
+
+
+def submit_exam(session_id: str, answers: dict[str, Any]) -> dict[str, Any]:
+    """Close the session now, so the deadline is checked at submission, and grade it later.
+
+    Capacity is checked first: a closed session can no longer be submitted, so
+    once it is closed its job is always created.
+    """
+    _ensure_capacity()
+    submitted_at = datetime.utcnow()
+    row = exam_service.close_session(session_id, now=submitted_at)
+    return _enqueue(
+        "exam",
+        row.user_id,
+        {"session_id": session_id, "answers": answers, "submitted_at": submitted_at.isoformat()},
+    )
+
+
+def _describe(job: GradingJob) -> dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at,
+        "result": _unpack(job.result_blob),
+        "error": job.error,
+    }
+
+
+def get(job_id: str) -> dict[str, Any]:
+    with get_session() as session:
+        job = session.get(GradingJob, job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return _describe(job)
+
+
+async def wait(job_id: str, timeout: float) -> dict[str, Any]:
+    """The job once it has finished, or as it is after ``timeout`` seconds."""
+    event = asyncio.Event()
+    entry = (asyncio.get_running_loop(), event)
+    with _lock:
+        _waiters.setdefault(job_id, []).append(entry)
+    try:
+        # Registered before the first read, so a job finishing in between still
+        # sets the event.
+        job = await run_in_threadpool(get, job_id)
+        if job["status"] in ("queued", "running"):
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(timeout, MAX_WAIT_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+            job = await run_in_threadpool(get, job_id)
+        return job
+    finally:
+        with _lock:
+            waiters = _waiters.get(job_id, [])
+            if entry in waiters:
+                waiters.remove(entry)
+            if not waiters:
+                _waiters.pop(job_id, None)
+
+
+def _notify(job_id: str) -> None:
+    with _lock:
+        waiters = _waiters.pop(job_id, [])
+    for loop, event in waiters:
+        loop.call_soon_threadsafe(event.set)
+
+
+def _claim(job_id: str) -> GradingJob | None:
+    now = datetime.utcnow()
+    with get_session() as session:
+        claimed = session.execute(
+            update(GradingJob)
+            .where(GradingJob.id == job_id, GradingJob.status == "queued")
+            .values(
+                status="running",
+                started_at=now,
+                attempts=GradingJob.attempts + 1,
+                owner=BOOT_ID,
+                lease_until=now + LEASE,
+            )
+        )
+        session.commit()
+        if claimed.rowcount != 1:
+            return None
+        job = session.get(GradingJob, job_id)
+        session.expunge(job)
+        return job
+
+
+def _run(job: GradingJob) -> Any:
+    payload = _unpack(job.payload_blob)
+    if job.kind == "exam":
+        row, _ = exam_service.load_session(payload["session_id"])
+        return exam_service.grade_submission(
+            row,
+            payload["answers"],
+            submitted_at=datetime.fromisoformat(payload["submitted_at"]),
+            job_id=job.id,
+        )
+    results = []
+    for index, item in enumerate(payload["items"]):
+        _, result = task_service.check_and_record(
+            job.user_id, item["task_id"], item["topic_id"], item["user_answer"], job_item=(job.id, str(index))
+        )
+        results.append({"task_id": item["task_id"], **result})
+    return results
+
+
+def _finish(job_id: str, *, result: Any = None, error: str | None = None) -> None:
+    with get_session() as session:
+        job = session.get(GradingJob, job_id)
+        job.status = "failed" if error else "done"
+        job.result_blob = None if error else _pack(result)
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        session.add(job)
+        # A finished job is never rerun, so its answer marks are no longer needed.
+        session.exec(delete(JobAnswer).where(JobAnswer.job_id == job_id))
+        session.commit()
+    _notify(job_id)
+
+
+def _process(job_id: str) -> None:
+    job = _claim(job_id)
+    if job is None:
+        return
+    with _lock:
+        _running.add(job_id)
+    try:
+        try:
+            result = _run(job)
+        except Exception as exc:
+            _finish(job_id, error=f"Не удалось проверить: {exc}")
+        else:
+            _finish(job_id, result=result)
+    finally:
+        with _lock:
+            _running.discard(job_id)
+
+
+def _worker() -> None:
+    while True:
+        _, _, job_id = _queue.get()
+        if not job_id:
+            return
+        with _lock:
+            _enqueued.discard(job_id)
+        try:
+            _process(job_id)
+        except Exception:
+            # The job stays running; its lease is no longer renewed, so recover()
+            # puts it back on the queue once the lease expires.
+            logger.exception("Не удалось завершить задание проверки %s", job_id)
+
+
+def _renew(now: datetime) -> None:
+    with _lock:
+        running = list(_running)
+    if not running:
+        return
+    with get_session() as session:
+        session.execute(
+            update(GradingJob)
+            .where(GradingJob.id.in_(running), GradingJob.owner == BOOT_ID, GradingJob.status == "running")
+            .values(lease_until=now + LEASE)
+        )
+        session.commit()
+
+
+def _keep_leases(stop: threading.Event) -> None:
+    """Renew the leases of this process's jobs and pick up jobs other processes dropped."""
+    while not stop.wait(LEASE.total_seconds() / 3):
+        try:
+            now = datetime.utcnow()
+            _renew(now)
+            recover(now=now)
+        except Exception:
+            logger.exception("Не удалось продлить задания проверки")
+
+
+def recover(now: datetime | None = None) -> int:
+    """Requeue jobs whose process stopped and queue every job waiting in the table.
+
+    Only running jobs with an expired lease are requeued: a job another live
+    process is running keeps its lease. A requeued job reruns from the start;
+    answers it recorded before the stop are skipped (see ``JobAnswer``), so
+    nothing is counted twice. Finished jobs past the retention period are
+    dropped. Returns how many queued jobs there are.
+    """
+    now = now or datetime.utcnow()
+    stale = (GradingJob.status == "running", GradingJob.lease_until < now)
+    with get_session() as session:
+        session.exec(delete(GradingJob).where(GradingJob.finished_at < now - RETENTION))
+        session.execute(
+            update(GradingJob)
+            .where(*stale, GradingJob.attempts >= MAX_ATTEMPTS)
+            .values(status="failed", error="Проверка прерывалась слишком много раз", finished_at=now)
+        )
+        session.execute(update(GradingJob).where(*stale).values(status="queued", owner=None, lease_until=None))
+        session.exec(
+            delete(JobAnswer)
+            .where(
+                JobAnswer.job_id.not_in(
+                    select(GradingJob.id).where(GradingJob.status.in_(("queued", "running")))
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        pending = session.exec(
+            select(GradingJob.id, GradingJob.priority)
+            .where(GradingJob.status == "queued")
+            .order_by(GradingJob.priority, GradingJob.created_at)
+        ).all()
+    for job_id, priority in pending:
+        _put(priority, job_id)
+    return len(pending)
+
+
+def start() -> None:
+    global _keeper_stop
+    with _lock:
+        if _workers:
+            return
+    recover()
+    with _lock:
+        if _workers:
+            return
+        for index in range(WORKERS):
+            worker = threading.Thread(target=_worker, name=f"grading-job-{index}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+        _keeper_stop = threading.Event()
+        threading.Thread(target=_keep_leases, args=(_keeper_stop,), name="grading-job-leases", daemon=True).start()
+
+
+def shutdown() -> None:
+    """Stop the workers after their current job; queued jobs stay in the database."""
+    global _keeper_stop
+    with _lock:
+        workers = list(_workers)
+        _workers.clear()
+        if _keeper_stop is not None:
+            _keeper_stop.set()
+            _keeper_stop = None
+    for _ in workers:
+        # Sorts ahead of every job; an empty id tells a worker to exit.
+        _queue.put((-1, next(_sequence), ""))
+    for worker in workers:
+        worker.join(timeout=5)
+
+
+def stats() -> dict[str, int]:
+    with get_session() as session:
+        counts = dict(
+            session.exec(select(GradingJob.status, func.count(GradingJob.id)).group_by(GradingJob.status)).all()
+        )
+    return {
+        "workers": len(_workers),
+        **{status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")},
+    }
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Callable
+
+import sympy as sp
+
+s, a, b, n = sp.symbols("s a b n")
+
+# One row per function family of the generator: how f(t) is shown, its image
+# F(s) in terms of the parameters and the abscissa of convergence (F is
+# compared right of it). A term is (family, coefficient, parameter, parameter).
+TABLE: dict[str, tuple[str, sp.Expr, sp.Expr]] = {
+    "power": ("t^{n}", sp.factorial(n) / s ** (n + 1), sp.Integer(0)),
+    "exp": ("e^{{{a}t}}", 1 / (s - a), a),
+    "sin": (r"\sin {b}t", b / (s**2 + b**2), sp.Integer(0)),
+    "cos": (r"\cos {b}t", s / (s**2 + b**2), sp.Integer(0)),
+    "texp": ("t e^{{{a}t}}", 1 / (s - a) ** 2, a),
+    "expsin": (r"e^{{{a}t}} \sin {b}t", b / ((s - a) ** 2 + b**2), a),
+    "expcos": (r"e^{{{a}t}} \cos {b}t", (s - a) / ((s - a) ** 2 + b**2), a),
+}
+
+Term = tuple[str, int, int, int]
+
+
+def _parameters(family: str, first: int, second: int) -> dict[sp.Symbol, int]:
+    if family == "power":
+        return {n: first}
+    if family in ("sin", "cos"):
+        return {b: first}
+    return {a: first, b: second}
+
+
+def _describe_term(family: str, first: int, second: int) -> str:
+    if family == "power" and first < 2:
+        return "1" if first == 0 else "t"
+    values = {str(symbol): value for symbol, value in _parameters(family, first, second).items()}
+    text = TABLE[family][0].format(**values)
+    # Unit rates read "e^{t}" and "\sin t" rather than "e^{1t}" and "\sin 1t".
+    return text.replace("{1t}", "{t}").replace("{-1t}", "{-t}").replace(" 1t", " t")
+
+
+def describe(terms: tuple[Term, ...]) -> str:
+    """f(t) as it appears in the prompt, e.g. ``2e^{3t} - \\sin 2t``."""
+    parts = []
+    for index, (family, coefficient, first, second) in enumerate(terms):
+        body = _describe_term(family, first, second)
+        magnitude = abs(coefficient)
+        text = body if magnitude == 1 else (str(magnitude) if body == "1" else f"{magnitude}{body}")
+        if index == 0:
+            parts.append(f"-{text}" if coefficient < 0 else text)
+        else:
+            parts.append(f"- {text}" if coefficient < 0 else f"+ {text}")
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def image(terms: tuple[Term, ...]) -> sp.Expr:
+    """F(s) of a combination of table functions, read off the table (linearity)."""
+    total = sp.Integer(0)
+    for family, coefficient, first, second in terms:
+        total += coefficient * TABLE[family][1].subs(_parameters(family, first, second))
+    return total
+
+
+def abscissa(terms: tuple[Term, ...]) -> float:
+    return max(
+        float(TABLE[family][2].subs(_parameters(family, first, second)))
+        for family, _, first, second in terms
+    )
+
+
+@lru_cache(maxsize=1024)
+def reference(terms: tuple[Term, ...]) -> tuple[Callable[[float], float], float]:
+    """F(s) compiled to a float function, and the abscissa of convergence."""
+    return sp.lambdify(s, image(terms), "math"), abscissa(terms)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import random
+import threading
+from collections import defaultdict
+
+from sqlmodel import select
+
+from ..database import get_session
+from ..models import CohortMember, TopicProgress, User
+
+
+_Key = tuple[int, int]
+
+
+class _Node:
+    __slots__ = ("key", "priority", "size", "left", "right")
+
+    def __init__(self, key: _Key) -> None:
+        self.key = key
+        self.priority = random.random()
+        self.size = 1
+        self.left: _Node | None = None
+        self.right: _Node | None = None
+
+
+def _size(node: _Node | None) -> int:
+    return node.size if node else 0
+
+
+def _split(node: _Node | None, key: _Key) -> tuple[_Node | None, _Node | None]:
+    """Keys below ``key`` and the rest."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        node.size = 1 + _size(node.left) + _size(node.right)
+        return node, right
+    left, node.left = _split(node.left, key)
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return left, node
+
+
+def _merge(left: _Node | None, right: _Node | None) -> _Node | None:
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.size = 1 + _size(left.left) + _size(left.right)
+        return left
+    right.left = _merge(left, right.left)
+    right.size = 1 + _size(right.left) + _size(right.right)
+    return right
+
+
+class RankIndex:
+    """Scores ordered as ``(-score, member)`` keys in a size-annotated treap.
+
+    Updates, ranks and seeking to a page offset all take O(log n).
+    """
+
+    def __init__(self) -> None:
+        self._scores: dict[int, int] = {}
+        self._root: _Node | None = None
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, member: int) -> bool:
+        return member in self._scores
+
+    def _insert(self, key: _Key) -> None:
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key)), right)
+
+    def _delete(self, key: _Key) -> None:
+        left, rest = _split(self._root, key)
+        _, right = _split(rest, (key[0], key[1] + 1))
+        self._root = _merge(left, right)
+
+    def _count_below(self, key: tuple[int, ...]) -> int:
+        node, count = self._root, 0
+        while node is not None:
+            if node.key < key:
+                count += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def _at(self, position: int) -> _Key:
+        node = self._root
+        while node is not None:
+            left = _size(node.left)
+            if position < left:
+                node = node.left
+            elif position == left:
+                return node.key
+            else:
+                position -= left + 1
+                node = node.right
+        raise IndexError(position)
+
+    def update(self, member: int, score: int) -> None:
+        previous = self._scores.get(member)
+        if previous == score:
+            return
+        if previous is not None:
+            self._delete((-previous, member))
+        self._insert((-score, member))
+        self._scores[member] = score
+
+    def remove(self, member: int) -> None:
+        previous = self._scores.pop(member, None)
+        if previous is not None:
+            self._delete((-previous, member))
+
+    def score(self, member: int) -> int | None:
+        return self._scores.get(member)
+
+    def rank(self, member: int) -> int | None:
+        """1-based competition rank: members with equal scores share a place."""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        return self._count_below((-score,)) + 1
+
+    def page(self, offset: int, limit: int) -> list[tuple[int, int, int]]:
+        rows: list[tuple[int, int, int]] = []
+        rank = 0
+        previous: int | None = None
+        for position in range(offset, min(offset + limit, len(self))):
+            negative_score, member = self._at(position)
+            if negative_score != previous:
+                rank = self._count_below((negative_score,)) + 1 if previous is None else position + 1
+                previous = negative_score
+            rows.append((rank, member, -negative_score))
+        return rows
+
+
+_lock = threading.Lock()
+_global = RankIndex()
+_topics: dict[str, RankIndex] = defaultdict(RankIndex)
+_cohorts: dict[str, RankIndex] = defaultdict(RankIndex)
+_user_cohorts: dict[int, set[str]] = defaultdict(set)
+_names: dict[int, str] = {}
+
+
+def rebuild() -> None:
+    """Reload every board from the database.
+
+    The lock is held from the read to the swap: an update committed after the
+    read waits and lands on the new boards instead of being overwritten.
+    """
+    global _global
+    with _lock:
+        with get_session() as session:
+            users = session.exec(select(User.id, User.display_name, User.xp)).all()
+            progress = session.exec(
+                select(TopicProgress.user_id, TopicProgress.topic_id, TopicProgress.xp_earned)
+            ).all()
+            memberships = session.exec(select(CohortMember.cohort_id, CohortMember.user_id)).all()
+        _global = RankIndex()
+        _topics.clear()
+        _cohorts.clear()
+        _user_cohorts.clear()
+        _names.clear()
+        for user_id, display_name, xp in users:
+            _names[user_id] = display_name
+            _global.update(user_id, xp)
+        for user_id, topic_id, xp_earned in progress:
+            _topics[topic_id].update(user_id, xp_earned)
+        for cohort_id, user_id in memberships:
+            _user_cohorts[user_id].add(cohort_id)
+            _cohorts[cohort_id].update(user_id, _global.score(user_id) or 0)
+
+
+def record_progress(user: User, progress: TopicProgress) -> None:
+    with _lock:
+        _names[user.id] = user.display_name
+        _global.update(user.id, user.xp)
+        _topics[progress.topic_id].update(user.id, progress.xp_earned)
+        for cohort_id in _user_cohorts.get(user.id, ()):
+            _cohorts[cohort_id].update(user.id, user.xp)
+
+
+def add_cohort_member(cohort_id: str, user: User) -> None:
+    with _lock:
+        _names[user.id] = user.display_name
+        _user_cohorts[user.id].add(cohort_id)
+        _cohorts[cohort_id].update(user.id, user.xp)
+
+
+def _board(topic_id: str | None, cohort_id: str | None) -> RankIndex | None:
+    if topic_id is not None:
+        return _topics.get(topic_id)
+    if cohort_id is not None:
+        return _cohorts.get(cohort_id)
+    return _global
+
+
+def top(
+    *, offset: int, limit: int, topic_id: str | None = None, cohort_id: str | None = None
+) -> dict:
+    with _lock:
+        board = _board(topic_id, cohort_id)
+        if board is None:
+            return {"total": 0, "entries": []}
+        return {
+            "total": len(board),
+            "entries": [
+                {"rank": rank, "user_id": member, "display_name": _names.get(member, ""), "score": score}
+                for rank, member, score in board.page(offset, limit)
+            ],
+        }
+
+
+def rank_of(user_id: int, *, topic_id: str | None = None, cohort_id: str | None = None) -> dict | None:
+    with _lock:
+        board = _board(topic_id, cohort_id)
+        if board is None or user_id not in board:
+            return None
+        return {
+            "user_id": user_id,
+            "rank": board.rank(user_id),
+            "score": board.score(user_id),
+            "total": len(board),
+        }
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np
+
+# Integer spectra offered by the generators; distinct eigenvalues keep the
+# eigenvectors (and the fundamental system) unique up to scaling.
+EIGENVALUES = [-3, -2, -1, 1, 2, 3]
+MAX_ENTRY = 9
+RELATIVE_TOLERANCE = 1e-6
+
+
+def _unimodular(size: int, rng: random.Random) -> np.ndarray:
+    """Integer matrix with determinant ±1, so its inverse is an integer matrix too."""
+    matrix = np.eye(size, dtype=int)
+    for _ in range(size * 2):
+        row, source = rng.sample(range(size), 2)
+        matrix[row] += rng.choice([-1, 1]) * matrix[source]
+    return matrix
+
+
+def matrix_with_spectrum(size: int, rng: random.Random) -> tuple[np.ndarray, list[int]]:
+    """Small integer matrix ``P D P^-1`` with distinct integer eigenvalues."""
+    while True:
+        eigenvalues = sorted(rng.sample(EIGENVALUES, size))
+        basis = _unimodular(size, rng)
+        inverse = np.rint(np.linalg.inv(basis)).astype(int)
+        matrix = basis @ np.diag(eigenvalues) @ inverse
+        if np.abs(matrix).max() <= MAX_ENTRY and np.count_nonzero(matrix - np.diag(np.diag(matrix))):
+            return matrix, eigenvalues
+
+
+def spectrum(matrix: np.ndarray) -> np.ndarray:
+    return np.sort_complex(np.linalg.eigvals(matrix))
+
+
+def same_spectrum(matrix: np.ndarray, values: np.ndarray) -> bool:
+    reference = spectrum(matrix)
+    if len(values) != len(reference):
+        return False
+    return bool(np.allclose(np.sort_complex(values.astype(complex)), reference, atol=1e-6, rtol=1e-6))
+
+
+def eigenpair_residuals(matrix: np.ndarray, values: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """``|A v - λ v| / |v|`` for every pair at once; ``vectors`` has one pair per row."""
+    residual = vectors @ matrix.T - values[:, None] * vectors
+    return np.linalg.norm(residual, axis=1) / np.linalg.norm(vectors, axis=1)
+
+
+def independent(vectors: np.ndarray) -> bool:
+    return bool(np.linalg.matrix_rank(vectors, tol=1e-8) == min(vectors.shape))
+
+
+def system_residual(matrix: np.ndarray, values: np.ndarray, derivatives: np.ndarray) -> float:
+    """Largest relative defect of ``Y' = A Y`` over a batch of samples.
+
+    ``values`` and ``derivatives`` have shape ``(n, samples)``: column ``k`` is
+    ``Y`` and ``Y'`` at one (time, constants) sample.
+    """
+    image = matrix @ values
+    scale = 1.0 + np.abs(image) + np.abs(derivatives)
+    return float(np.max(np.abs(derivatives - image) / scale))
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+from ..database import DATABASE_FILE
+
+BACKUP_DIR = Path(os.getenv("VISHMAT_BACKUP_DIR", str(DATABASE_FILE.parent / "backups")))
+BACKUP_KEEP = int(os.getenv("VISHMAT_BACKUP_KEEP", "7"))
+# Pages copied per step and the pause after each step; writers get the database
+# back between steps.
+BACKUP_PAGES = int(os.getenv("VISHMAT_BACKUP_PAGES", "256"))
+BACKUP_PAUSE_SECONDS = float(os.getenv("VISHMAT_BACKUP_PAUSE", "0.01"))
+# A write from another connection restarts the copy. After this many restarts
+# the rest is copied in one step, which holds a read lock only for that step.
+MAX_RESTARTS = 5
+BUSY_TIMEOUT_SECONDS = 30.0
+BACKUP_INTERVAL = timedelta(hours=float(os.getenv("VISHMAT_BACKUP_INTERVAL_HOURS", "0")))
+VACUUM_INTERVAL = timedelta(hours=float(os.getenv("VISHMAT_VACUUM_INTERVAL_HOURS", "0")))
+SCHEDULER_TICK_SECONDS = 60.0
+
+logger = logging.getLogger(__name__)
+
+Progress = Callable[[dict[str, Any]], None]
+
+_run_lock = threading.Lock()
+_status_lock = threading.Lock()
+_status: dict[str, Any] = {"state": "idle"}
+_last: dict[str, dict[str, Any]] = {}
+
+
+class MaintenanceBusy(Exception):
+    """Another backup or compaction is already running."""
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    return sqlite3.connect(str(path), timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+
+
+def _update(**fields: Any) -> dict[str, Any]:
+    with _status_lock:
+        _status.update(fields)
+        return dict(_status)
+
+
+def status() -> dict[str, Any]:
+    with _status_lock:
+        return {**_status, "last": {task: dict(result) for task, result in _last.items()}}
+
+
+def _begin(task: str) -> None:
+    """Take the maintenance lock for ``task``; ``_execute`` releases it."""
+    if not _run_lock.acquire(blocking=False):
+        raise MaintenanceBusy(_status.get("task", ""))
+    with _status_lock:
+        _status.clear()
+        _status.update(task=task, state="running", started_at=datetime.utcnow().isoformat())
+
+
+def _run(task: str, operation: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    _begin(task)
+    return _execute(task, operation)
+
+
+def _execute(task: str, operation: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    try:
+        try:
+            result = operation()
+        except Exception as exc:
+            snapshot = _update(state="failed", error=str(exc), finished_at=datetime.utcnow().isoformat())
+            with _status_lock:
+                _last[task] = snapshot
+            raise
+        snapshot = _update(state="done", finished_at=datetime.utcnow().isoformat(), **result)
+        with _status_lock:
+            _last[task] = snapshot
+        return snapshot
+    finally:
+        _run_lock.release()
+
+
+def backup(
+    target: Path | None = None,
+    *,
+    pages: int = BACKUP_PAGES,
+    pause: float = BACKUP_PAUSE_SECONDS,
+    progress: Progress | None = None,
+) -> dict[str, Any]:
+    """Copy the live database with SQLite's online backup API, ``pages`` at a time.
+
+    The copy is written next to ``target`` and renamed into place once it has
+    passed ``PRAGMA quick_check``, so a crash never leaves a half-written backup.
+    """
+    return _run("backup", lambda: _backup(target, pages, pause, progress))
+
+
+def _backup(target: Path | None, pages: int, pause: float, progress: Progress | None) -> dict[str, Any]:
+    if target is None:
+        BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+        target = BACKUP_DIR / f"app-{datetime.utcnow():%Y%m%d-%H%M%S}.db"
+    partial = target.with_name(target.name + ".partial")
+    partial.unlink(missing_ok=True)
+    counters = {"restarts": 0, "remaining": None}
+
+    def _step(status: int, remaining: int, total: int) -> None:
+        if counters["remaining"] is not None and remaining > counters["remaining"]:
+            counters["restarts"] += 1
+        counters["remaining"] = remaining
+        snapshot = _update(pages_total=total, pages_done=total - remaining, restarts=counters["restarts"])
+        if progress:
+            progress(snapshot)
+        if counters["restarts"] >= MAX_RESTARTS:
+            # Let the caller finish in one step instead of chasing the writers.
+            raise _TooManyRestarts
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = _connect(DATABASE_FILE)
+    destination = _connect(partial)
+    try:
+        try:
+            source.backup(destination, pages=pages, progress=_step)
+        except _TooManyRestarts:
+            source.backup(destination, pages=-1)
+        copied = destination.execute("PRAGMA page_count").fetchone()[0]
+        check = destination.execute("PRAGMA quick_check").fetchone()[0]
+        if check != "ok":
+            raise RuntimeError(f"Резервная копия повреждена: {check}")
+    except BaseException:
+        destination.close()
+        partial.unlink(missing_ok=True)
+        raise
+    finally:
+        source.close()
+    destination.close()
+    os.replace(partial, target)
+    removed = _prune(target.parent) if target.parent == BACKUP_DIR else []
+    return {
+        "path": str(target),
+        "bytes": target.stat().st_size,
+        "pages_total": copied,
+        "pages_done": copied,
+        "restarts": counters["restarts"],
+        "pruned": removed,
+    }
+
+
+def _prune(directory: Path) -> list[str]:
+    backups = sorted(directory.glob("app-*.db"))
+    stale = backups[:-BACKUP_KEEP] if BACKUP_KEEP > 0 else []
+    for path in stale:
+        path.unlink(missing_ok=True)
+    return [path.name for path in stale]
+
+
+def vacuum(*, analyze_only: bool = False, progress: Progress | None = None) -> dict[str, Any]:
+    """Rebuild the database file to drop free pages, then refresh planner statistics.
+
+    ``VACUUM`` holds a write lock for its duration, so it belongs in a quiet
+    hour; writers wait for it up to their busy timeout. ``analyze_only`` runs
+    just ``ANALYZE``, which is cheap.
+    """
+    return _run("vacuum", lambda: _vacuum(analyze_only, progress))
+
+
+def _vacuum(analyze_only: bool, progress: Progress | None) -> dict[str, Any]:
+    before = DATABASE_FILE.stat().st_size
+    connection = _connect(DATABASE_FILE)
+    try:
+        free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        if not analyze_only:
+            snapshot = _update(step="vacuum", free_pages=free_pages)
+            if progress:
+                progress(snapshot)
+            connection.execute("VACUUM")
+        snapshot = _update(step="analyze")
+        if progress:
+            progress(snapshot)
+        connection.execute("ANALYZE")
+        connection.execute("PRAGMA optimize")
+        connection.commit()
+    finally:
+        connection.close()
+    return {"bytes_before": before, "bytes_after": DATABASE_FILE.stat().st_size, "free_pages": free_pages}
+
+
+def _start_in_background(task: str, operation: Callable[[], dict[str, Any]]) -> None:
+    # The lock is taken here, so of two concurrent requests one gets
+    # MaintenanceBusy; the thread releases it when the work ends.
+    _begin(task)
+
+    def _target() -> None:
+        try:
+            _execute(task, operation)
+        except Exception:  # reported through status()
+            pass
+
+    try:
+        threading.Thread(target=_target, name="db-maintenance", daemon=True).start()
+    except BaseException:
+        _run_lock.release()
+        raise
+
+
+def backup_in_background() -> None:
+    """Start ``backup`` on a thread; failures end up in ``status()``."""
+    _start_in_background("backup", lambda: _backup(None, BACKUP_PAGES, BACKUP_PAUSE_SECONDS, None))
+
+
+def vacuum_in_background(*, analyze_only: bool = False) -> None:
+    """Start ``vacuum`` on a thread; failures end up in ``status()``."""
+    _start_in_background("vacuum", lambda: _vacuum(analyze_only, None))
+
+
+def _newest_backup() -> datetime | None:
+    backups = sorted(BACKUP_DIR.glob("app-*.db"))
+    return datetime.utcfromtimestamp(backups[-1].stat().st_mtime) if backups else None
+
+
+class _Schedule:
+    """What is due at each scheduler tick.
+
+    A failed backup is retried after one tick, then after twice as long each
+    time, up to the backup interval, instead of every tick forever.
+    """
+
+    def __init__(self, started: datetime) -> None:
+        self.last_vacuum = started
+        self.backup_failures = 0
+        self.backup_retry_at = datetime.min
+
+    def _backup_due(self, now: datetime) -> bool:
+        if not BACKUP_INTERVAL or now < self.backup_retry_at:
+            return False
+        return now - (_newest_backup() or datetime.min) >= BACKUP_INTERVAL
+
+    def tick(self, now: datetime) -> None:
+        if self._backup_due(now):
+            self._backup(now)
+        if VACUUM_INTERVAL and now - self.last_vacuum >= VACUUM_INTERVAL:
+            self.last_vacuum = now
+            try:
+                vacuum()
+            except MaintenanceBusy:
+                pass
+            except Exception:  # kept in status(); tried again after one interval
+                logger.exception("Сжатие базы не удалось")
+
+    def _backup(self, now: datetime) -> None:
+        try:
+            backup()
+        except MaintenanceBusy:
+            return
+        except Exception:  # kept in status()
+            self.backup_failures += 1
+            delay = min(
+                timedelta(seconds=SCHEDULER_TICK_SECONDS * 2 ** min(self.backup_failures - 1, 16)),
+                max(BACKUP_INTERVAL, timedelta(seconds=SCHEDULER_TICK_SECONDS)),
+            )
+            self.backup_retry_at = now + delay
+            logger.exception("Резервное копирование не удалось, следующая попытка через %s", delay)
+            return
+        self.backup_failures = 0
+
+
+def start_scheduler() -> threading.Event | None:
+    """Back up and compact on the configured intervals; ``None`` when both are off.
+
+    Run it in one server process only: a second process would find the lock of
+    its own copy free and start the same work again.
+    """
+    if not BACKUP_INTERVAL and not VACUUM_INTERVAL:
+        return None
+    stop = threading.Event()
+    schedule = _Schedule(datetime.utcnow())
+
+    def _loop() -> None:
+        while not stop.wait(SCHEDULER_TICK_SECONDS):
+            schedule.tick(datetime.utcnow())
+
+    threading.Thread(target=_loop, name="db-maintenance-scheduler", daemon=True).start()
+    return stop
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+
+
+SlopeFn = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+# Right-hand sides f(x, y) of y' = f(x, y) offered by the generators. Every
+# function works element-wise, so one call advances a whole batch of variants.
+SLOPES: dict[str, SlopeFn] = {
+    "x + y": lambda x, y: x + y,
+    "y - x": lambda x, y: y - x,
+    "x - y": lambda x, y: x - y,
+    "x*y": lambda x, y: x * y,
+    "2*x + y": lambda x, y: 2 * x + y,
+    "y - x**2": lambda x, y: y - x**2,
+}
+
+METHOD_ORDERS = {"euler": 1, "improved-euler": 2, "rk4": 4}
+
+
+def _step(method: str, f: SlopeFn, x: np.ndarray, y: np.ndarray, h: np.ndarray) -> np.ndarray:
+    if method == "euler":
+        return y + h * f(x, y)
+    if method == "improved-euler":
+        k1 = f(x, y)
+        k2 = f(x + h, y + h * k1)
+        return y + h / 2 * (k1 + k2)
+    if method == "rk4":
+        k1 = f(x, y)
+        k2 = f(x + h / 2, y + h / 2 * k1)
+        k3 = f(x + h / 2, y + h / 2 * k2)
+        k4 = f(x + h, y + h * k3)
+        return y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+    raise ValueError(f"Unknown method: {method}")
+
+
+def trajectories(
+    method: str,
+    slope: str,
+    x0: np.ndarray,
+    y0: np.ndarray,
+    h: np.ndarray,
+    steps: int,
+) -> np.ndarray:
+    """Integrate a batch of IVPs with a fixed-step method.
+
+    ``x0``, ``y0`` and ``h`` have shape ``(batch,)``; the result has shape
+    ``(batch, steps + 1)`` with the initial value in column 0.
+    """
+    f = SLOPES[slope]
+    x = np.asarray(x0, dtype=float)
+    y = np.asarray(y0, dtype=float)
+    h = np.asarray(h, dtype=float)
+    table = np.empty((y.shape[0], steps + 1))
+    table[:, 0] = y
+    for index in range(1, steps + 1):
+        y = _step(method, f, x, y, h)
+        x = x + h
+        table[:, index] = y
+    return table
+
+
+# Dormand–Prince 5(4) tableau.
+_DP_C = np.array([0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0])
+_DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+_DP_B5 = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0])
+_DP_B4 = np.array([5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+
+
+def rk45(
+    slope: str,
+    x0: np.ndarray,
+    y0: np.ndarray,
+    x_end: np.ndarray,
+    *,
+    rtol: float = 1e-10,
+    atol: float = 1e-12,
+    max_iterations: int = 10_000,
+) -> np.ndarray:
+    """Adaptive Dormand–Prince solution ``y(x_end)`` for a batch of IVPs.
+
+    Each lane keeps its own step size; lanes that reached ``x_end`` stop moving
+    while the rest of the batch continues.
+    """
+    f = SLOPES[slope]
+    x = np.asarray(x0, dtype=float).copy()
+    y = np.asarray(y0, dtype=float).copy()
+    x_end = np.asarray(x_end, dtype=float)
+    h = np.clip((x_end - x) / 100, 1e-6, None)
+    for _ in range(max_iterations):
+        active = x < x_end - 1e-14
+        if not active.any():
+            return y
+        h = np.where(active, np.minimum(h, x_end - x), 0.0)
+        stages = []
+        for c, row in zip(_DP_C, _DP_A):
+            increment = sum((a * k for a, k in zip(row, stages)), np.zeros_like(y))
+            stages.append(f(x + c * h, y + h * increment))
+        k = np.stack(stages)
+        y5 = y + h * np.tensordot(_DP_B5, k, axes=1)
+        y4 = y + h * np.tensordot(_DP_B4, k, axes=1)
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y5))
+        error = np.abs(y5 - y4) / scale
+        accepted = active & (error <= 1.0)
+        x = np.where(accepted, x + h, x)
+        y = np.where(accepted, y5, y)
+        factor = np.clip(0.9 * np.power(np.maximum(error, 1e-16), -0.2), 0.2, 5.0)
+        h = np.where(active, h * factor, h)
+    raise RuntimeError("rk45 did not converge")
+
+
+def runge_error_estimates(
+    method: str,
+    slope: str,
+    x0: np.ndarray,
+    y0: np.ndarray,
+    h: np.ndarray,
+    steps: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Values at ``x0 + steps*h`` with steps ``h`` and ``h/2`` plus Runge's estimate.
+
+    Runge's rule estimates the error of the ``h/2`` result as
+    ``(y_{h/2} - y_h) / (2^p - 1)`` for a method of order ``p``.
+    """
+    coarse = trajectories(method, slope, x0, y0, h, steps)[:, -1]
+    fine = trajectories(method, slope, x0, y0, np.asarray(h) / 2, steps * 2)[:, -1]
+    estimate = (fine - coarse) / (2 ** METHOD_ORDERS[method] - 1)
+    return coarse, fine, estimate
+
+
+def step_tolerances(steps: int, base: float) -> list[float]:
+    """Per-step tolerances: rounding each step lets the error grow along the table."""
+    return [round(base * index, 6) for index in range(1, steps + 1)]
+
+
+def compare_table(
+    expected: list[float], actual: list[float], tolerances: list[float]
+) -> int | None:
+    """Index of the first value outside its tolerance, or ``None`` when all match."""
+    values = np.asarray(actual, dtype=float)
+    misses = np.abs(values - np.asarray(expected, dtype=float)) > np.asarray(tolerances, dtype=float)
+    # NaN compares false with everything, so it would never count as a miss.
+    misses |= ~np.isfinite(values)
+    if not misses.any():
+        return None
+    return int(np.argmax(misses))
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, TypeVar
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from fastapi.websockets import WebSocket, WebSocketDisconnect, WebSocketState
+from pydantic import ValidationError
+
+from .. import crud
+from ..data import topics
+from ..schemas import CheckRequest, PracticeRequest
+from . import admission, profiling, task_service
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+STATUS_INTERVAL_SECONDS = float(os.getenv("VISHMAT_WS_STATUS_SECONDS", "0.5"))
+MAX_IN_FLIGHT = int(os.getenv("VISHMAT_WS_MAX_IN_FLIGHT", "4"))
+POLICY_VIOLATION = 1008
+
+
+class ChannelError(Exception):
+    """A message that cannot be served; reported to the client, the socket stays open."""
+
+    def __init__(self, detail: str, retry_after: int | None = None) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def _task_payload(task: Any) -> dict[str, Any]:
+    # Same shape as TaskPayload over HTTP: the expected answer stays on the server.
+    return {**task.to_record(), "expected": None}
+
+
+def _generate(request: PracticeRequest) -> dict[str, Any]:
+    with profiling.profiler.maybe_profile("generate_task"):
+        task = task_service.generate_task(request.topic_id, request.target_difficulty)
+        return _task_payload(task)
+
+
+def _check(request: CheckRequest) -> tuple[str, dict[str, Any]]:
+    with profiling.profiler.maybe_profile("check_task"):
+        task, result = task_service.check_and_record(
+            request.user_id, request.task_id, request.topic_id, request.user_answer
+        )
+        return task.topic_id, result
+
+
+def progress_delta(user_id: int, topic_id: str) -> dict[str, Any]:
+    """What one graded answer changed: user totals, the topic entry and today's XP."""
+    payload = crud.get_progress_payload(user_id)
+    today = date.today()
+    return {
+        "xp": payload["xp"],
+        "streak": payload["streak"],
+        "last_active": payload["last_active"],
+        "topic": next((entry for entry in payload["progress"] if entry["topic_id"] == topic_id), None),
+        "today": next((entry for entry in payload["daily_xp"] if entry["day"] == today), None),
+    }
+
+
+class PracticeChannel:
+    """One practice session multiplexed over a WebSocket.
+
+    Clients send JSON messages ``{"id": ..., "type": "generate" | "check" |
+    "progress", ...}`` and every reply echoes ``id``. Up to ``MAX_IN_FLIGHT``
+    messages are served concurrently, so replies may arrive out of order. A check
+    that runs longer than ``STATUS_INTERVAL_SECONDS`` streams ``status`` messages
+    until its ``result``, and every result is followed by a ``progress-delta``.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int) -> None:
+        self.websocket = websocket
+        self.user_id = user_id
+        self._send_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self._pending: set[asyncio.Task] = set()
+        self._handlers: dict[str, Callable[[Any, dict[str, Any]], Awaitable[None]]] = {
+            "generate": self._on_generate,
+            "check": self._on_check,
+            "progress": self._on_progress,
+        }
+
+    async def run(self) -> None:
+        try:
+            progress = await run_in_threadpool(crud.get_progress_payload, self.user_id)
+        except ValueError:
+            await self.websocket.close(code=POLICY_VIOLATION, reason="User not found")
+            return
+        await self.send({"id": None, "type": "progress", "progress": progress})
+        try:
+            while True:
+                raw = await self._receive()
+                # Stop reading while the session already has enough work queued.
+                await self._slots.acquire()
+                job = asyncio.create_task(self._dispatch(raw))
+                self._pending.add(job)
+                job.add_done_callback(self._finished)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            pending = list(self._pending)
+            for job in pending:
+                job.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _receive(self) -> str | bytes:
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        return message.get("text") or message.get("bytes") or b""
+
+    def _finished(self, job: asyncio.Task) -> None:
+        self._pending.discard(job)
+        self._slots.release()
+
+    async def send(self, message: dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_text(orjson.dumps(message).decode())
+
+    async def _dispatch(self, raw: str | bytes) -> None:
+        message_id = None
+        try:
+            try:
+                message = orjson.loads(raw)
+            except orjson.JSONDecodeError as exc:
+                raise ChannelError("Сообщение должно быть JSON-объектом") from exc
+            if not isinstance(message, dict):
+                raise ChannelError("Сообщение должно быть JSON-объектом")
+            message_id = message.get("id")
+            handler = self._handlers.get(message.get("type"))
+            if handler is None:
+                raise ChannelError("Неизвестный тип сообщения")
+            try:
+                await handler(message_id, message)
+            except ChannelError:
+                raise
+            except admission.Overloaded as exc:
+                raise ChannelError("Сервер перегружен, повторите запрос позже", exc.retry_after) from exc
+            except topics.TopicNotFound as exc:
+                raise ChannelError("Тема не найдена") from exc
+            except ValidationError as exc:
+                raise ChannelError(f"Некорректное сообщение: {exc.errors()[0]['msg']}") from exc
+            except ValueError as exc:
+                raise ChannelError(str(exc)) from exc
+        except ChannelError as exc:
+            await self._reply_error(message_id, exc.detail, exc.retry_after)
+        except Exception:
+            # Nobody awaits a dispatch, so nothing may escape it.
+            if self._connected():
+                logger.exception("Не удалось обработать сообщение практики")
+                await self._reply_error(message_id, "Внутренняя ошибка сервера")
+
+    def _connected(self) -> bool:
+        return (
+            self.websocket.application_state == WebSocketState.CONNECTED
+            and self.websocket.client_state == WebSocketState.CONNECTED
+        )
+
+    async def _reply_error(self, message_id: Any, detail: str, retry_after: int | None = None) -> None:
+        # The client may have gone away while the request was served; the
+        # receive loop notices that and ends the session.
+        with contextlib.suppress(WebSocketDisconnect, OSError, RuntimeError):
+            await self._send_error(message_id, detail, retry_after)
+
+    async def _send_error(self, message_id: Any, detail: str, retry_after: int | None = None) -> None:
+        message: dict[str, Any] = {"id": message_id, "type": "error", "detail": detail}
+        if retry_after is not None:
+            message["retry_after"] = retry_after
+        await self.send(message)
+
+    async def _on_generate(self, message_id: Any, message: dict[str, Any]) -> None:
+        request = PracticeRequest.parse_obj(message)
+        async with admission.read_gate.admit():
+            task = await run_in_threadpool(_generate, request)
+        await self.send({"id": message_id, "type": "task", "task": task})
+
+    async def _on_check(self, message_id: Any, message: dict[str, Any]) -> None:
+        request = CheckRequest.parse_obj({**message, "user_id": self.user_id})
+        wait = admission.check_rate(self.websocket.client, self.user_id)
+        if wait:
+            raise ChannelError("Слишком много проверок подряд", admission.retry_after_seconds(wait))
+        async with admission.grading_gate.admit():
+            topic_id, result = await self._with_status(message_id, run_in_threadpool(_check, request))
+        await self.send({"id": message_id, "type": "result", **result})
+        delta = await run_in_threadpool(progress_delta, self.user_id, topic_id)
+        await self.send({"id": message_id, "type": "progress-delta", **delta})
+
+    async def _on_progress(self, message_id: Any, message: dict[str, Any]) -> None:
+        async with admission.read_gate.admit():
+            progress = await run_in_threadpool(crud.get_progress_payload, self.user_id)
+        await self.send({"id": message_id, "type": "progress", "progress": progress})
+
+    async def _with_status(self, message_id: Any, job: Awaitable[T]) -> T:
+        future = asyncio.ensure_future(job)
+        started = time.monotonic()
+        try:
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=STATUS_INTERVAL_SECONDS)
+                if done:
+                    return future.result()
+                await self.send(
+                    {
+                        "id": message_id,
+                        "type": "status",
+                        "state": "grading",
+                        "elapsed": round(time.monotonic() - started, 1),
+                    }
+                )
+        finally:
+            if not future.done():
+                future.cancel()
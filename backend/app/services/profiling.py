@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import cProfile
+import linecache
+import os
+import pstats
+import random
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+PROFILED_ENDPOINTS = ("check_task", "generate_task")
+MAX_COLLAPSED_DEPTH = 64
+
+FuncKey = tuple[str, int, str]
+
+
+def _frame_name(func: FuncKey) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name.replace(";", ",")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+class RequestProfiler:
+    """Sampled cProfile of selected endpoints, aggregated until reset.
+
+    Only one request is profiled at a time: profilers of concurrent threads would
+    otherwise fight over the interpreter's profiling hook on newer Pythons.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_rate = 0.1
+        self.endpoints: set[str] = set(PROFILED_ENDPOINTS)
+        self.samples = 0
+        self._stats: pstats.Stats | None = None
+        self._stats_lock = threading.Lock()
+        self._active = threading.Lock()
+
+    def configure(self, *, enabled: bool, sample_rate: float, endpoints: list[str] | None) -> None:
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        if endpoints is not None:
+            self.endpoints = set(endpoints)
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "endpoints": sorted(self.endpoints),
+            "samples": self.samples,
+        }
+
+    def reset(self) -> None:
+        with self._stats_lock:
+            self._stats = None
+            self.samples = 0
+
+    @contextmanager
+    def maybe_profile(self, endpoint: str) -> Iterator[None]:
+        if (
+            not self.enabled
+            or endpoint not in self.endpoints
+            or random.random() >= self.sample_rate
+            or not self._active.acquire(blocking=False)
+        ):
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+        finally:
+            self._active.release()
+            self._record(profile)
+
+    def _record(self, profile: cProfile.Profile) -> None:
+        with self._stats_lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.samples += 1
+
+    def _raw_stats(self) -> dict[FuncKey, tuple]:
+        with self._stats_lock:
+            return dict(self._stats.stats) if self._stats is not None else {}  # type: ignore[attr-defined]
+
+    def hot_functions(self, limit: int, sort: str = "cumulative") -> list[dict[str, Any]]:
+        column = 3 if sort == "cumulative" else 2
+        rows = sorted(self._raw_stats().items(), key=lambda item: item[1][column], reverse=True)
+        return [
+            {
+                "function": name,
+                "file": filename,
+                "line": line,
+                "calls": calls,
+                "primitive_calls": primitive,
+                "tottime": round(tottime, 6),
+                "cumtime": round(cumtime, 6),
+            }
+            for (filename, line, name), (primitive, calls, tottime, cumtime, _) in rows[:limit]
+        ]
+
+    def collapsed_stacks(self, min_fraction: float = 0.001) -> str:
+        """Flamegraph-compatible ``frame;frame;frame weight`` lines (weights in µs).
+
+        cProfile keeps caller→callee edges rather than whole stacks, so stacks are
+        rebuilt from the roots down, splitting a function's time between paths in
+        proportion to the time each caller spent in it. Paths carrying less than
+        ``min_fraction`` of the total time are dropped; without that cut the number
+        of paths through a call graph like SymPy's explodes.
+        """
+        stats = self._raw_stats()
+        children: dict[FuncKey, list[tuple[FuncKey, float]]] = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller, edge in callers.items():
+                children.setdefault(caller, []).append((func, edge[3]))
+        roots = [func for func, entry in stats.items() if not entry[4]]
+        threshold = sum(stats[root][3] for root in roots) * min_fraction
+
+        weights: dict[str, float] = {}
+
+        def walk(func: FuncKey, stack: list[str], share: float) -> None:
+            stack = stack + [_frame_name(func)]
+            key = ";".join(stack)
+            weights[key] = weights.get(key, 0.0) + stats[func][2] * share
+            if len(stack) >= MAX_COLLAPSED_DEPTH:
+                return
+            for child, edge_time in children.get(func, ()):
+                if child not in stats or _frame_name(child) in stack:
+                    continue
+                child_total = stats[child][3]
+                child_share = share * min(1.0, edge_time / child_total) if child_total > 0 else 0.0
+                if child_share * child_total < threshold:
+                    continue
+                walk(child, stack, child_share)
+
+        for root in roots:
+            if stats[root][3] >= threshold:
+                walk(root, [], 1.0)
+        lines = [f"{stack} {round(weight * 1e6)}" for stack, weight in weights.items() if weight * 1e6 >= 1]
+        return "\n".join(sorted(lines)) + ("\n" if lines else "")
+
+
+class AllocationTracker:
+    """tracemalloc snapshots, each compared with the previous one."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._previous: tracemalloc.Snapshot | None = None
+
+    def start(self, frames: int) -> None:
+        with self._lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            tracemalloc.start(frames)
+            self._previous = None
+
+    def stop(self) -> None:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+
+    def state(self) -> dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+            "current_bytes": current,
+            "peak_bytes": peak,
+        }
+
+    def snapshot(self, limit: int, group_by: str = "lineno") -> dict[str, Any]:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not running")
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                ]
+            )
+            previous, self._previous = self._previous, snapshot
+        top = [_stat_to_dict(stat) for stat in snapshot.statistics(group_by)[:limit]]
+        growth = (
+            [_diff_to_dict(diff) for diff in snapshot.compare_to(previous, group_by)[:limit]]
+            if previous is not None
+            else []
+        )
+        return {**self.state(), "top": top, "growth": growth}
+
+
+def _trace_frames(traceback: tracemalloc.Traceback) -> list[dict[str, Any]]:
+    return [
+        {
+            "file": frame.filename,
+            "line": frame.lineno,
+            "code": linecache.getline(frame.filename, frame.lineno).strip(),
+        }
+        for frame in traceback
+    ]
+
+
+def _stat_to_dict(stat: tracemalloc.Statistic) -> dict[str, Any]:
+    return {"size_bytes": stat.size, "count": stat.count, "traceback": _trace_frames(stat.traceback)}
+
+
+def _diff_to_dict(diff: tracemalloc.StatisticDiff) -> dict[str, Any]:
+    return {
+        "size_bytes": diff.size,
+        "size_diff_bytes": diff.size_diff,
+        "count": diff.count,
+        "count_diff": diff.count_diff,
+        "traceback": _trace_frames(diff.traceback),
+    }
+
+
+profiler = RequestProfiler()
+allocations = AllocationTracker()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any
+
+from ..models import TopicProgress, User
+
+
+MAX_USERS = int(os.getenv("VISHMAT_PROGRESS_CACHE_SIZE", "1024"))
+
+_lock = threading.Lock()
+_snapshots: OrderedDict[int, dict[str, Any]] = OrderedDict()
+# Bumped by every write for the user (and ``_epoch`` by ``clear``): a snapshot
+# loaded before a write must not be cached after it. Bounded like the snapshots;
+# a user without an entry reads as ``_floor``, which is raised past every
+# forgotten generation, so forgetting one can only reject a ``put``, never let
+# a stale snapshot in.
+_generations: OrderedDict[int, int] = OrderedDict()
+_counter = itertools.count(1)
+_floor = 0
+_epoch = 0
+
+
+def get(user_id: int) -> dict[str, Any] | None:
+    with _lock:
+        snapshot = _snapshots.get(user_id)
+        if snapshot is not None:
+            _snapshots.move_to_end(user_id)
+        return snapshot
+
+
+def generation(user_id: int) -> tuple[int, int]:
+    """Token to take before loading a snapshot from the database and pass to ``put``."""
+    with _lock:
+        return _epoch, _generations.get(user_id, _floor)
+
+
+def _bump(user_id: int) -> None:
+    _generations[user_id] = next(_counter)
+    _generations.move_to_end(user_id)
+    while len(_generations) > max(MAX_USERS, 1):
+        _forget(next(iter(_generations)))
+
+
+def _forget(user_id: int) -> None:
+    global _floor
+    value = _generations.pop(user_id, None)
+    if value is not None:
+        _floor = max(_floor, value)
+
+
+def put(user_id: int, snapshot: dict[str, Any], token: tuple[int, int]) -> bool:
+    """Cache ``snapshot`` unless the user was written since ``token`` was taken."""
+    if MAX_USERS <= 0:
+        return False
+    with _lock:
+        if token != (_epoch, _generations.get(user_id, _floor)):
+            return False
+        _snapshots[user_id] = snapshot
+        _snapshots.move_to_end(user_id)
+        while len(_snapshots) > MAX_USERS:
+            evicted, _ = _snapshots.popitem(last=False)
+            _forget(evicted)
+        return True
+
+
+def invalidate(user_id: int) -> None:
+    with _lock:
+        _bump(user_id)
+        _snapshots.pop(user_id, None)
+
+
+def clear() -> None:
+    global _epoch, _floor
+    with _lock:
+        _epoch += 1
+        _floor = 0
+        _generations.clear()
+        _snapshots.clear()
+
+
+def size() -> int:
+    with _lock:
+        return len(_snapshots)
+
+
+# Snapshots handed out by ``get`` may be serialized concurrently, so writers never
+# mutate them: every update below builds a new dict and swaps it in. Only users
+# that are already cached are updated; the next read fills in everyone else.
+
+
+def apply_user(user: User) -> None:
+    with _lock:
+        _bump(user.id)
+        snapshot = _snapshots.get(user.id)
+        if snapshot is None or user.xp < snapshot["xp"]:
+            return
+        _snapshots[user.id] = {**snapshot, **_user_fields(user)}
+
+
+def apply_answer(
+    user: User,
+    progress: TopicProgress,
+    *,
+    correct: bool,
+    xp_gain: int,
+    window_start: date,
+) -> None:
+    with _lock:
+        _bump(user.id)
+        snapshot = _snapshots.get(user.id)
+        if snapshot is None:
+            return
+        updated = dict(snapshot)
+        # XP and completed lessons only grow, so a smaller value means a
+        # concurrent answer already wrote a newer state here.
+        if user.xp >= snapshot["xp"]:
+            updated.update(_user_fields(user))
+
+        entries = list(snapshot["progress"])
+        index = next(
+            (i for i, entry in enumerate(entries) if entry["topic_id"] == progress.topic_id),
+            None,
+        )
+        previous = entries[index] if index is not None else None
+        attempts = (previous["attempts"] if previous else 0) + 1
+        correct_count = (
+            round(previous["accuracy"] * previous["attempts"]) if previous else 0
+        ) + int(correct)
+        entry = {
+            "topic_id": progress.topic_id,
+            "mastery": progress.mastery,
+            "completed_lessons": progress.completed_lessons,
+            "best_score": progress.best_score,
+            "xp_earned": progress.xp_earned,
+        }
+        if previous and previous["completed_lessons"] > progress.completed_lessons:
+            entry = {key: previous[key] for key in entry}
+        entry["attempts"] = attempts
+        entry["accuracy"] = correct_count / attempts
+        if index is None:
+            entries.append(entry)
+        else:
+            entries[index] = entry
+        updated["progress"] = entries
+
+        today = date.today()
+        daily = [row for row in snapshot["daily_xp"] if row["day"] >= window_start]
+        if daily and daily[-1]["day"] == today:
+            last = daily[-1]
+            daily[-1] = {"day": today, "xp": last["xp"] + xp_gain, "answers": last["answers"] + 1}
+        else:
+            daily.append({"day": today, "xp": xp_gain, "answers": 1})
+        updated["daily_xp"] = daily
+
+        _snapshots[user.id] = updated
+
+
+def _user_fields(user: User) -> dict[str, Any]:
+    return {
+        "xp": user.xp,
+        "streak": user.streak,
+        "last_active": user.last_active,
+        "daily_goal_minutes": user.daily_goal_minutes,
+    }
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session
+
+from ..database import get_session
+from ..models import AnswerEvent, DailyXp, TopicAccuracy
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("VISHMAT_EVENT_BATCH_SIZE", "64"))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("VISHMAT_EVENT_FLUSH_SECONDS", "2.0"))
+# While the database keeps refusing writes the buffer would grow without end;
+# past this many events the oldest are dropped and counted.
+MAX_PENDING = int(os.getenv("VISHMAT_EVENT_MAX_PENDING", "10000"))
+
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_pending: list[dict[str, Any]] = []
+_dropped = 0
+_last_flush = time.monotonic()
+
+
+def record_answer(
+    *,
+    user_id: int,
+    task_id: str | None,
+    topic_id: str,
+    correct: bool,
+    difficulty: int,
+    duration_seconds: int,
+    xp_gain: int,
+) -> None:
+    """Append an answer event to the buffer; the buffer is written in batches."""
+    event = {
+        "user_id": user_id,
+        "task_id": task_id,
+        "topic_id": topic_id,
+        "correct": correct,
+        "difficulty": difficulty,
+        "duration_seconds": duration_seconds,
+        "xp_gain": xp_gain,
+        "created_at": datetime.utcnow(),
+        "day": date.today(),
+    }
+    with _buffer_lock:
+        _pending.append(event)
+        _trim()
+        due = (
+            len(_pending) >= BATCH_SIZE
+            or time.monotonic() - _last_flush >= FLUSH_INTERVAL_SECONDS
+        )
+    if due:
+        try:
+            flush()
+        except Exception:
+            # The answer itself is already committed; the batch stays buffered
+            # and goes out with the next flush.
+            logger.exception("Не удалось записать журнал ответов")
+
+
+def _trim() -> None:
+    """Drop the oldest events over ``MAX_PENDING``; the caller holds ``_buffer_lock``."""
+    global _dropped
+    excess = len(_pending) - MAX_PENDING
+    if excess > 0:
+        del _pending[:excess]
+        _dropped += excess
+        logger.warning("Буфер журнала ответов переполнен, отброшено событий: %d", excess)
+
+
+def pending_count() -> int:
+    with _buffer_lock:
+        return len(_pending)
+
+
+def stats() -> dict[str, int]:
+    with _buffer_lock:
+        return {"pending": len(_pending), "dropped": _dropped, "max_pending": MAX_PENDING}
+
+
+def flush() -> int:
+    """Write buffered events and fold them into the rollup tables.
+
+    Readers call this before touching the rollups, so holding ``_flush_lock``
+    for the whole write guarantees they never observe a half-applied batch.
+    """
+    global _last_flush
+    with _flush_lock:
+        with _buffer_lock:
+            batch = _pending[:]
+            _pending.clear()
+            _last_flush = time.monotonic()
+        if not batch:
+            return 0
+        try:
+            with get_session() as session:
+                session.bulk_insert_mappings(
+                    AnswerEvent,
+                    [{key: value for key, value in event.items() if key != "day"} for event in batch],
+                )
+                _apply_rollups(session, batch)
+                session.commit()
+        except BaseException:
+            with _buffer_lock:
+                _pending[:0] = batch
+                _trim()
+            raise
+        return len(batch)
+
+
+def start_flusher(interval: float = FLUSH_INTERVAL_SECONDS) -> threading.Event:
+    """Flush every ``interval`` seconds, so a quiet process does not sit on events."""
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while not stop.wait(interval):
+            try:
+                flush()
+            except Exception:
+                logger.exception("Не удалось записать журнал ответов")
+
+    threading.Thread(target=_loop, name="answer-events-flush", daemon=True).start()
+    return stop
+
+
+def _apply_rollups(session: Session, batch: list[dict[str, Any]]) -> None:
+    daily: dict[tuple[int, date], list[int]] = defaultdict(lambda: [0, 0, 0])
+    accuracy: dict[tuple[int, str], list[int]] = defaultdict(lambda: [0, 0])
+    for event in batch:
+        day_totals = daily[(event["user_id"], event["day"])]
+        day_totals[0] += event["xp_gain"]
+        day_totals[1] += 1
+        day_totals[2] += event["duration_seconds"]
+        topic_totals = accuracy[(event["user_id"], event["topic_id"])]
+        topic_totals[0] += 1
+        topic_totals[1] += int(event["correct"])
+
+    daily_table = DailyXp.__table__
+    daily_stmt = sqlite_insert(daily_table)
+    daily_stmt = daily_stmt.on_conflict_do_update(
+        index_elements=["user_id", "day"],
+        set_={
+            "xp": daily_table.c.xp + daily_stmt.excluded.xp,
+            "answers": daily_table.c.answers + daily_stmt.excluded.answers,
+            "seconds": daily_table.c.seconds + daily_stmt.excluded.seconds,
+        },
+    )
+    session.execute(
+        daily_stmt,
+        [
+            {"user_id": user_id, "day": day, "xp": xp, "answers": answers, "seconds": seconds}
+            for (user_id, day), (xp, answers, seconds) in daily.items()
+        ],
+    )
+
+    accuracy_table = TopicAccuracy.__table__
+    accuracy_stmt = sqlite_insert(accuracy_table)
+    accuracy_stmt = accuracy_stmt.on_conflict_do_update(
+        index_elements=["user_id", "topic_id"],
+        set_={
+            "attempts": accuracy_table.c.attempts + accuracy_stmt.excluded.attempts,
+            "correct": accuracy_table.c.correct + accuracy_stmt.excluded.correct,
+        },
+    )
+    session.execute(
+        accuracy_stmt,
+        [
+            {"user_id": user_id, "topic_id": topic_id, "attempts": attempts, "correct": correct}
+            for (user_id, topic_id), (attempts, correct) in accuracy.items()
+        ],
+    )
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import io
+import itertools
+import json
+from datetime import date
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator
+
+from sqlalchemy import create_engine, select as sa_select
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from ..database import engine as default_engine
+from ..models import TopicProgress, User
+
+
+EXPORT_FORMATS = ("ndjson", "arrow", "parquet")
+DEFAULT_CHUNK_SIZE = 500
+
+USER_FIELDS = (
+    "email",
+    "display_name",
+    "xp",
+    "streak",
+    "last_active",
+    "daily_goal_minutes",
+    "preferred_language",
+)
+PROGRESS_FIELDS = ("topic_id", "mastery", "completed_lessons", "best_score", "xp_earned")
+NUMERIC_FIELDS = ("xp", "streak", "daily_goal_minutes", "mastery", "completed_lessons", "best_score", "xp_earned")
+
+
+class MalformedRow(ValueError):
+    """An NDJSON line that is not an exported row; ``line`` counts from 1."""
+
+    def __init__(self, line: int, reason: str) -> None:
+        super().__init__(f"Строка {line}: {reason}")
+        self.line = line
+
+
+def iter_progress_rows(
+    source: Engine | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[list[dict[str, Any]]]:
+    """Stream flat (user, topic) rows ordered by user, ``chunk_size`` rows at a time.
+
+    Users without progress produce one row with empty topic columns.
+    """
+    user_table = User.__table__
+    progress_table = TopicProgress.__table__
+    statement = (
+        sa_select(
+            user_table.c.id.label("user_id"),
+            *(user_table.c[name] for name in USER_FIELDS),
+            *(progress_table.c[name] for name in PROGRESS_FIELDS),
+        )
+        .select_from(
+            user_table.outerjoin(progress_table, progress_table.c.user_id == user_table.c.id)
+        )
+        .order_by(user_table.c.id, progress_table.c.topic_id)
+    )
+    with (source or default_engine).connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(statement)
+        for partition in result.mappings().partitions(chunk_size):
+            yield [_normalize_row(row) for row in partition]
+
+
+def _normalize_row(row: Any) -> dict[str, Any]:
+    data = dict(row)
+    last_active = data.get("last_active")
+    if isinstance(last_active, str):
+        data["last_active"] = date.fromisoformat(last_active)
+    return data
+
+
+def iter_export(fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    chunks = iter_progress_rows(chunk_size=chunk_size)
+    if fmt == "ndjson":
+        for chunk in chunks:
+            yield "".join(_ndjson_line(row) for row in chunk).encode("utf-8")
+        return
+    if fmt in ("arrow", "parquet"):
+        yield from _iter_arrow(chunks, parquet=fmt == "parquet")
+        return
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def write_export(fmt: str, output: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    for block in iter_export(fmt, chunk_size):
+        output.write(block)
+
+
+def _ndjson_line(row: dict[str, Any]) -> str:
+    return json.dumps(row, ensure_ascii=False, default=str) + "\n"
+
+
+def require_arrow() -> Any:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError("Для форматов arrow/parquet установите пакет pyarrow") from exc
+    return pyarrow
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only sink that hands written bytes back to the generator."""
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._parts.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _arrow_schema(pa: Any) -> Any:
+    return pa.schema(
+        [
+            ("user_id", pa.int64()),
+            ("email", pa.string()),
+            ("display_name", pa.string()),
+            ("xp", pa.int64()),
+            ("streak", pa.int64()),
+            ("last_active", pa.date32()),
+            ("daily_goal_minutes", pa.int64()),
+            ("preferred_language", pa.string()),
+            ("topic_id", pa.string()),
+            ("mastery", pa.float64()),
+            ("completed_lessons", pa.int64()),
+            ("best_score", pa.float64()),
+            ("xp_earned", pa.int64()),
+        ]
+    )
+
+
+def _iter_arrow(chunks: Iterable[list[dict[str, Any]]], *, parquet: bool) -> Iterator[bytes]:
+    pa = require_arrow()
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    if parquet:
+        writer = pa.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for chunk in chunks:
+            writer.write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+            block = sink.drain()
+            if block:
+                yield block
+    finally:
+        writer.close()
+    block = sink.drain()
+    if block:
+        yield block
+
+
+def read_ndjson(
+    lines: Iterable[str | bytes], *, require_email: bool = True, first_line: int = 1
+) -> Iterator[dict[str, Any]]:
+    """Rows of an NDJSON export; raises ``MalformedRow`` at the first bad line.
+
+    ``require_email`` is off when the caller imports into one account anyway;
+    ``first_line`` is the number of the first line, for a stream read in parts.
+    """
+    for number, line in enumerate(lines, start=first_line):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            row = json.loads(line) if line.strip() else None
+        except ValueError:
+            raise MalformedRow(number, "некорректный JSON") from None
+        if row is None:
+            continue
+        yield validate_row(number, row, require_email=require_email)
+
+
+def validate_row(number: int, row: Any, *, require_email: bool = True) -> dict[str, Any]:
+    """``row`` with ``last_active`` as a date; ``MalformedRow`` if it is not an exported row."""
+    if not isinstance(row, dict):
+        raise MalformedRow(number, "ожидался JSON-объект")
+    email = row.get("email")
+    if require_email and not email:
+        raise MalformedRow(number, "нет поля email")
+    if email is not None and not isinstance(email, str):
+        raise MalformedRow(number, "поле email должно быть строкой")
+    if row.get("topic_id") is not None and not isinstance(row["topic_id"], str):
+        raise MalformedRow(number, "поле topic_id должно быть строкой")
+    for field in NUMERIC_FIELDS:
+        value = row.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise MalformedRow(number, f"поле {field} должно быть числом")
+    if row.get("last_active"):
+        try:
+            row["last_active"] = date.fromisoformat(row["last_active"])
+        except (TypeError, ValueError):
+            raise MalformedRow(number, "поле last_active должно быть датой ГГГГ-ММ-ДД") from None
+    return row
+
+
+def read_database(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict[str, Any]]:
+    source = create_engine(f"sqlite:///{Path(path).resolve()}")
+    try:
+        for chunk in iter_progress_rows(source, chunk_size):
+            yield from chunk
+    finally:
+        source.dispose()
+
+
+def import_rows(
+    rows: Iterable[dict[str, Any]],
+    *,
+    email_override: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict[str, int]:
+    """Merge exported rows into the local database.
+
+    Counters keep the larger of the stored and imported values, so importing the
+    same file twice leaves the database unchanged.
+    """
+    stats = {"users_created": 0, "users_updated": 0, "topics_merged": 0}
+    grouped = itertools.groupby(rows, key=lambda row: email_override or row["email"])
+    while True:
+        users = [(email, list(user_rows)) for email, user_rows in itertools.islice(grouped, chunk_size)]
+        if not users:
+            break
+        with Session(default_engine) as session:
+            merge_users(session, users, stats)
+            session.commit()
+    return stats
+
+
+def merge_users(
+    session: Session, users: list[tuple[str, list[dict[str, Any]]]], stats: dict[str, int]
+) -> list[tuple[User, list[TopicProgress]]]:
+    """Merge ``(email, rows)`` groups into ``session``; returns the touched rows."""
+    emails = {email for email, _ in users}
+    existing = {
+        user.email: user for user in session.exec(select(User).where(User.email.in_(emails)))
+    }
+    merged: list[tuple[User, list[dict[str, Any]]]] = []
+    for email, user_rows in users:
+        head = user_rows[0]
+        user = existing.get(email)
+        if user is None:
+            user = User(
+                email=email,
+                display_name=head.get("display_name") or email,
+                daily_goal_minutes=head.get("daily_goal_minutes") or 10,
+                preferred_language=head.get("preferred_language") or "ru",
+                last_active=head.get("last_active") or date.today(),
+            )
+            existing[email] = user
+            stats["users_created"] += 1
+        else:
+            stats["users_updated"] += 1
+
+        user.xp = max(user.xp or 0, head.get("xp") or 0)
+        incoming_active = head.get("last_active")
+        if incoming_active and incoming_active >= user.last_active:
+            user.streak = head.get("streak") or 0
+            user.last_active = incoming_active
+        session.add(user)
+        merged.append((user, user_rows))
+    session.flush()
+
+    topics = {
+        (entry.user_id, entry.topic_id): entry
+        for entry in session.exec(
+            select(TopicProgress).where(TopicProgress.user_id.in_([user.id for user, _ in merged]))
+        )
+    }
+    touched: list[tuple[User, list[TopicProgress]]] = []
+    for user, user_rows in merged:
+        entries: list[TopicProgress] = []
+        touched.append((user, entries))
+        for row in user_rows:
+            topic_id = row.get("topic_id")
+            if not topic_id:
+                continue
+            entry = topics.get((user.id, topic_id))
+            if entry is None:
+                entry = TopicProgress(user_id=user.id, topic_id=topic_id)
+                topics[(user.id, topic_id)] = entry
+            entry.mastery = max(entry.mastery or 0.0, row.get("mastery") or 0.0)
+            entry.completed_lessons = max(
+                entry.completed_lessons or 0, row.get("completed_lessons") or 0
+            )
+            entry.best_score = max(entry.best_score or 0.0, row.get("best_score") or 0.0)
+            entry.xp_earned = max(entry.xp_earned or 0, row.get("xp_earned") or 0)
+            session.add(entry)
+            entries.append(entry)
+            stats["topics_merged"] += 1
+    return touched
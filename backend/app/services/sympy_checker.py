@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from typing import Any
+import cmath
+import math
+import re
+from functools import lru_cache
+from typing import Any, Callable, Iterable
 
+import numpy as np
 import sympy as sp
 from sympy.parsing.sympy_parser import parse_expr
+from sympy.solvers.solveset import NonlinearError
 
+from ..data import topics
 from ..data.topics import Task
+from . import laplace_table, linear_systems, numeric_engine
 
 
 SYMBOLIC_LOCALS = {
@@ -22,11 +30,43 @@ SYMBOLIC_LOCALS = {
 
 CONSTANTS = {name: sp.symbols(name) for name in ["C", "C1", "C2", "C3", "k"]}
 
+# Initial conditions are written as in the prompt: "y(0)", "y'(0)", "y''(1)".
+INITIAL_CONDITION = re.compile(r"^y('*)\((.+)\)$")
+# Points right of the initial point where an IVP answer is compared with the
+# reference; points the answer is undefined at are skipped.
+IVP_SAMPLE_OFFSETS = (0.15, 0.4, 0.75, 1.1, 1.6)
+IVP_MIN_SAMPLES = 3
+IVP_RELATIVE_TOLERANCE = 1e-6
+# Laplace images are compared right of the abscissa of convergence.
+LAPLACE_SAMPLE_OFFSETS = (0.7, 1.3, 2.1, 3.4, 5.5)
+LAPLACE_LOCALS = {**SYMBOLIC_LOCALS, "s": laplace_table.s}
+
 
 class SympyValidationError(Exception):
     """Raised when answer cannot be parsed."""
 
 
+def _not_finite(expr: sp.Expr) -> bool:
+    return expr.has(sp.nan, sp.zoo, sp.oo, -sp.oo)
+
+
+def _parse_answer(text: str, local_dict: dict[str, Any]) -> sp.Expr:
+    try:
+        answer = parse_expr(text, dict(local_dict))
+    except Exception as exc:  # pragma: no cover - defensive
+        raise SympyValidationError(f"Не удалось разобрать выражение: {exc}") from exc
+    # Tuples, relations, booleans, strings and a bare function name such as
+    # ``y`` parse fine but are not expressions that can be substituted.
+    if not isinstance(answer, sp.Expr):
+        raise SympyValidationError("Не удалось разобрать выражение")
+    return answer
+
+
+# Reference data loaded from the catalog snapshot; looked up before compiling.
+_PRECOMPILED_EQUATIONS: dict[tuple[str, str], tuple] = {}
+_PRECOMPILED_IVP: dict[tuple, tuple] = {}
+
+
 def check_task_answer(task: Task, user_answer: Any) -> tuple[bool, str]:
     if task.type == "method-choice":
         return _check_method_choice(task, user_answer)
@@ -38,6 +78,10 @@ def check_task_answer(task: Task, user_answer: Any) -> tuple[bool, str]:
         return _check_numeric(task, user_answer)
     if task.type == "solve-ode":
         return _check_ode(task, user_answer)
+    if task.type == "solve-system":
+        return _check_system(task, user_answer)
+    if task.type == "laplace":
+        return _check_laplace(task, user_answer)
     raise NotImplementedError(f"Unknown task type: {task.type}")
 
 
@@ -66,10 +110,14 @@ def _check_match(task: Task, user_answer: Any) -> tuple[bool, str]:
 def _check_numeric(task: Task, user_answer: Any) -> tuple[bool, str]:
     if task.expected is None:
         return False, "Нет эталонного ответа"
+    if isinstance(task.expected, list):
+        return _check_numeric_table(task, user_answer)
     try:
         value = float(user_answer)
     except (TypeError, ValueError):
         return False, "Введите числовой ответ"
+    if not math.isfinite(value):
+        return False, "Введите конечное число"
     tolerance = task.validation.get("tolerance", 1e-3) if task.validation else 1e-3
     correct = abs(value - float(task.expected)) <= tolerance
     feedback = (
@@ -78,6 +126,233 @@ def _check_numeric(task: Task, user_answer: Any) -> tuple[bool, str]:
     return correct, feedback
 
 
+def _parse_numeric_table(user_answer: Any) -> list[float]:
+    if isinstance(user_answer, str):
+        parts = [part for part in re.split(r"[;\s]+", user_answer.strip()) if part]
+        return [float(part.replace(",", ".")) for part in parts]
+    if isinstance(user_answer, (list, tuple)):
+        return [float(value) for value in user_answer]
+    return [float(user_answer)]
+
+
+def _check_numeric_table(task: Task, user_answer: Any) -> tuple[bool, str]:
+    expected = list(task.expected)
+    try:
+        values = _parse_numeric_table(user_answer)
+    except (TypeError, ValueError):
+        return False, "Введите числа через точку с запятой"
+    if len(values) != len(expected):
+        return False, f"Нужно {len(expected)} значений, получено {len(values)}"
+    validation = task.validation or {}
+    tolerances = validation.get("tolerances") or [validation.get("tolerance", 1e-3)] * len(expected)
+    labels = validation.get("labels") or [str(index) for index in range(1, len(expected) + 1)]
+    miss = numeric_engine.compare_table(expected, values, tolerances)
+    if miss is None:
+        return True, "Все значения таблицы верны"
+    return False, f"Ошибка в {labels[miss]}: ожидалось ≈ {expected[miss]}"
+
+
+SYSTEM_SAMPLE_TIMES = np.array([0.0, 0.3, 0.7, 1.1])
+SYSTEM_RANDOM_CONSTANTS = 2
+
+
+def _parse_scalar(text: str, local_dict: dict[str, Any] | None = None) -> complex:
+    try:
+        value: complex = float(text)
+    except ValueError:
+        try:
+            value = complex(parse_expr(text, dict(local_dict or SYMBOLIC_LOCALS)))
+        except Exception as exc:
+            raise SympyValidationError(f"Не удалось разобрать число {text}") from exc
+    if not cmath.isfinite(value):
+        raise SympyValidationError(f"Введите конечное число вместо {text}")
+    return value
+
+
+def _parse_eigenpairs(user_answer: Any) -> tuple[np.ndarray, np.ndarray]:
+    """``"2: 1, 1; -1: 1, -2"`` or ``[[2, [1, 1]], ...]`` as values and row vectors."""
+    if isinstance(user_answer, str):
+        pairs = []
+        for part in re.split(r"[;\n]+", user_answer):
+            if not part.strip():
+                continue
+            value, _, vector = part.partition(":")
+            components = [item for item in re.split(r"[,\s()\[\]]+", vector) if item]
+            if not components:
+                raise SympyValidationError("Запишите пары как «λ: v1, v2; …»")
+            pairs.append((value.strip(), components))
+    elif isinstance(user_answer, list):
+        pairs = []
+        for pair in user_answer:
+            if not (isinstance(pair, (list, tuple)) and len(pair) == 2 and isinstance(pair[1], (list, tuple))):
+                raise SympyValidationError("Запишите пары как [λ, [v1, v2, …]]")
+            value, vector = pair
+            if not vector:
+                raise SympyValidationError("Запишите пары как [λ, [v1, v2, …]]")
+            pairs.append((str(value), [str(item) for item in vector]))
+    else:
+        raise SympyValidationError("Запишите пары как «λ: v1, v2; …»")
+    if not pairs:
+        raise SympyValidationError("Запишите пары как «λ: v1, v2; …»")
+    if len({len(vector) for _, vector in pairs}) != 1:
+        raise SympyValidationError("Векторы должны быть одной длины")
+    values = np.array([_parse_scalar(value) for value, _ in pairs])
+    vectors = np.array([[_parse_scalar(item) for item in vector] for _, vector in pairs])
+    return values, vectors
+
+
+def _check_eigenpairs(matrix: np.ndarray, user_answer: Any) -> tuple[bool, str]:
+    values, vectors = _parse_eigenpairs(user_answer)
+    size = matrix.shape[0]
+    if vectors.shape != (size, size):
+        return False, f"Нужно {size} пары «собственное значение: вектор» длины {size}"
+    scale = np.abs(vectors).max(axis=1)
+    if np.any(scale == 0):
+        return False, "Собственный вектор не может быть нулевым"
+    # Eigenvectors are defined up to a factor; rescaling keeps huge entries from overflowing.
+    vectors = vectors / scale[:, None]
+    if not linear_systems.same_spectrum(matrix, values):
+        return False, "Собственные значения найдены неверно"
+    residuals = linear_systems.eigenpair_residuals(matrix, values, vectors)
+    wrong = np.flatnonzero(residuals > linear_systems.RELATIVE_TOLERANCE)
+    if wrong.size:
+        return False, f"Вектор для λ = {values[wrong[0]].real:g} не является собственным"
+    if not linear_systems.independent(vectors):
+        return False, "Собственные векторы должны быть линейно независимы"
+    return True, "Собственные пары найдены верно"
+
+
+def _system_components(user_answer: Any, size: int) -> list[str]:
+    if isinstance(user_answer, list):
+        parts = [str(part) for part in user_answer]
+    elif isinstance(user_answer, str):
+        parts = [part for part in re.split(r"[;\n]+", user_answer) if part.strip()]
+    else:
+        raise SympyValidationError("Запишите компоненты решения через точку с запятой")
+    # "y1 = ..." is accepted as well as the bare expression.
+    parts = [part.split("=", 1)[-1].strip() for part in parts]
+    if len(parts) != size:
+        raise SympyValidationError(f"Нужно {size} компонент решения, получено {len(parts)}")
+    return parts
+
+
+def _fundamental_numeric(
+    matrix: np.ndarray, t: Any, constants: list[Any], components: list[Any]
+) -> tuple[float, bool] | None:
+    """Residual of ``Y' = AY`` and whether the constants span every solution.
+
+    One lambdified call evaluates ``Y`` and ``Y'`` for all sample times and
+    constant vectors (zero, unit and random ones) at once. Returns ``None``
+    when the expressions cannot be evaluated numerically.
+    """
+    size = len(components)
+    draws = np.vstack(
+        [
+            np.zeros((1, size)),
+            np.eye(size),
+            np.random.default_rng(0).uniform(-2, 2, (SYSTEM_RANDOM_CONSTANTS, size)),
+        ]
+    )
+    times = np.repeat(SYSTEM_SAMPLE_TIMES, len(draws))
+    samples = np.tile(draws, (len(SYSTEM_SAMPLE_TIMES), 1))
+    derivatives = [sp.diff(component, t) for component in components]
+    try:
+        evaluate = sp.lambdify((t, *constants), components + derivatives, "numpy")
+        with np.errstate(all="ignore"):
+            columns = evaluate(times, *samples.T)
+        table = np.array([np.broadcast_to(np.asarray(column, dtype=float), times.shape) for column in columns])
+    except Exception:
+        return None
+    if not np.all(np.isfinite(table)):
+        return None
+    values, slopes = table[:size], table[size:]
+    residual = linear_systems.system_residual(matrix, values, slopes)
+    # The first samples are t = 0 with zero constants and then each unit vector;
+    # the answer is general when the unit vectors move Y(0) independently.
+    at_start = values[:, 1 : size + 1] - values[:, :1]
+    return residual, linear_systems.independent(at_start.T)
+
+
+def _fundamental_symbolic(
+    matrix: np.ndarray, t: Any, constants: list[Any], components: list[Any]
+) -> tuple[float, bool]:
+    exact = sp.Matrix(matrix.tolist()).applyfunc(sp.nsimplify)
+    column = sp.Matrix(components)
+    defect = (column.diff(t) - exact * column).applyfunc(sp.simplify)
+    jacobian = column.subs(t, 0).jacobian(constants)
+    return (0.0 if defect.is_zero_matrix else 1.0), sp.simplify(jacobian.det()) != 0
+
+
+def _check_fundamental(matrix: np.ndarray, symbol_name: str, user_answer: Any) -> tuple[bool, str]:
+    size = matrix.shape[0]
+    t = sp.symbols(symbol_name)
+    constants = sp.symbols(f"C1:{size + 1}")
+    local_dict = {**SYMBOLIC_LOCALS, symbol_name: t, **{str(constant): constant for constant in constants}}
+    components = [_parse_answer(part, local_dict) for part in _system_components(user_answer, size)]
+    if any(_not_finite(component) for component in components):
+        return False, "Решение не может содержать nan или бесконечность"
+    extra = set().union(*(component.free_symbols for component in components)) - {t, *constants}
+    if extra:
+        names = ", ".join(sorted(str(symbol) for symbol in extra))
+        return False, f"Используйте только {symbol_name} и постоянные C1…C{size}, лишнее: {names}"
+    outcome = _fundamental_numeric(matrix, t, list(constants), components)
+    if outcome is None:
+        outcome = _fundamental_symbolic(matrix, t, list(constants), components)
+    residual, general = outcome
+    if residual > linear_systems.RELATIVE_TOLERANCE:
+        return False, "Подстановка в систему Y' = AY не даёт тождества"
+    if not general:
+        return False, f"Это частное решение: общее должно содержать все постоянные C1…C{size}"
+    return True, "Общее решение системы верное"
+
+
+def _check_system(task: Task, user_answer: Any) -> tuple[bool, str]:
+    validation = task.validation or {}
+    if not validation.get("matrix"):
+        return False, "Не задана матрица системы"
+    matrix = np.array(validation["matrix"], dtype=float)
+    try:
+        if validation.get("mode") == "eigen":
+            return _check_eigenpairs(matrix, user_answer)
+        return _check_fundamental(matrix, validation.get("symbol", "t"), user_answer)
+    except SympyValidationError as exc:
+        return False, str(exc)
+
+
+@lru_cache(maxsize=1024)
+def _compile_image(text: str) -> Callable[[float], float] | str | None:
+    """Answer F(s) as a float function; a string is the reason it was rejected."""
+    try:
+        answer = parse_expr(text, dict(LAPLACE_LOCALS))
+    except Exception:
+        return None
+    if not isinstance(answer, sp.Expr) or answer.free_symbols - {laplace_table.s}:
+        return "Изображение должно зависеть только от s"
+    if _not_finite(answer):
+        return "Изображение не может содержать nan или бесконечность"
+    return sp.lambdify(laplace_table.s, answer, "math")
+
+
+def _check_laplace(task: Task, user_answer: Any) -> tuple[bool, str]:
+    terms = (task.validation or {}).get("terms")
+    if not terms:
+        return False, "Нет данных для проверки"
+    if not isinstance(user_answer, str) or not user_answer.strip():
+        return False, "Введите изображение F(s)"
+    key = tuple(tuple(term) for term in terms)
+    # Table lookup plus a few float evaluations: no laplace_transform per check.
+    reference, start = laplace_table.reference(key)
+    answer = _compile_image(user_answer.strip())
+    if answer is None:
+        return False, "Не удалось разобрать выражение"
+    if isinstance(answer, str):
+        return False, answer
+    points = [start + offset for offset in LAPLACE_SAMPLE_OFFSETS]
+    if _same_function(answer, reference, points):
+        return True, "Изображение найдено верно"
+    return False, "Изображение не совпадает с табличным"
+
+
 def _check_ode(task: Task, user_answer: Any) -> tuple[bool, str]:
     if task.validation is None:
         return False, "Нет данных для проверки"
@@ -89,7 +364,10 @@ def _check_ode(task: Task, user_answer: Any) -> tuple[bool, str]:
     if not equation_str:
         return False, "Не задано уравнение"
 
+    conditions = task.validation.get("initial_conditions")
     try:
+        if conditions:
+            return _check_ivp(task, equation_str, symbol_name, conditions, user_answer)
         result = _validate_solution(equation_str, symbol_name, user_answer)
     except SympyValidationError as exc:
         return False, str(exc)
@@ -99,23 +377,223 @@ def _check_ode(task: Task, user_answer: Any) -> tuple[bool, str]:
     return False, "Подстановка в уравнение не обнуляет левую часть"
 
 
-def _validate_solution(equation_str: str, symbol_name: str, user_answer: str) -> bool:
+def _parse_equation(equation_str: str, symbol_name: str) -> tuple[Any, Any, Any, Any, dict[str, Any]]:
+    precompiled = _PRECOMPILED_EQUATIONS.get((equation_str, symbol_name))
+    if precompiled is not None:
+        return precompiled
+    return _compile_equation(equation_str, symbol_name)
+
+
+@lru_cache(maxsize=512)
+def _compile_equation(equation_str: str, symbol_name: str) -> tuple[Any, Any, Any, Any, dict[str, Any]]:
     x = sp.symbols(symbol_name)
     y = sp.Function("y")
-
     local_dict = {**SYMBOLIC_LOCALS, symbol_name: x, "y": y, **CONSTANTS}
     try:
         equation = parse_expr(equation_str, local_dict)
-        solution_expr = parse_expr(user_answer, local_dict)
     except Exception as exc:  # pragma: no cover - defensive
         raise SympyValidationError(f"Не удалось разобрать выражение: {exc}") from exc
 
     if isinstance(equation, sp.Equality):
-        lhs = equation.lhs
-        rhs = equation.rhs
+        return x, y, equation.lhs, equation.rhs, local_dict
+    return x, y, equation, sp.Integer(0), local_dict
+
+
+def _reference_keys(task: Task) -> tuple[tuple[str, str] | None, tuple | None]:
+    """Cache keys of the parsed equation and of the fitted IVP solution of ``task``."""
+    if task.type != "solve-ode" or not task.validation or not task.validation.get("equation"):
+        return None, None
+    equation = (task.validation["equation"], task.validation.get("symbol", "x"))
+    conditions = task.validation.get("initial_conditions")
+    if not conditions:
+        return equation, None
+    return equation, (*equation, task.expected, _condition_key(conditions))
+
+
+def precompile(task: Task) -> None:
+    """Parse the reference data of ``task`` ahead of the first check."""
+    equation, ivp = _reference_keys(task)
+    if equation:
+        _parse_equation(*equation)
+    if ivp:
+        _ivp_reference(*ivp)
+
+
+def compile_artifacts(tasks: Iterable[Task]) -> dict[str, dict]:
+    """Parsed equations and fitted IVP solutions of ``tasks``, for the catalog snapshot."""
+    equations: dict[tuple[str, str], tuple] = {}
+    ivps: dict[tuple, tuple] = {}
+    for task in tasks:
+        equation, ivp = _reference_keys(task)
+        if equation:
+            equations[equation] = _compile_equation(*equation)
+        if ivp:
+            ivps[ivp] = _fit_ivp(*ivp)
+    return {"equations": equations, "ivp": ivps}
+
+
+def task_artifacts(task: Task) -> dict[str, dict]:
+    """The reference data of ``task`` as ``compile_artifacts`` lays it out.
+
+    Served from this process's caches, which ``precompile`` warmed when the
+    task was created, so another process can check answers without parsing.
+    """
+    equation, ivp = _reference_keys(task)
+    return {
+        "equations": {equation: _parse_equation(*equation)} if equation else {},
+        "ivp": {ivp: _fitted_ivp(*ivp)} if ivp else {},
+    }
+
+
+def install_artifacts(artifacts: dict[str, dict]) -> dict[str, dict]:
+    """Add precompiled reference data; returns the entries that were new."""
+    added: dict[str, dict] = {"equations": {}, "ivp": {}}
+    for name, store in (("equations", _PRECOMPILED_EQUATIONS), ("ivp", _PRECOMPILED_IVP)):
+        for key, value in artifacts.get(name, {}).items():
+            if key not in store:
+                store[key] = added[name][key] = value
+    return added
+
+
+def remove_artifacts(artifacts: dict[str, dict]) -> None:
+    for key in artifacts.get("equations", {}):
+        _PRECOMPILED_EQUATIONS.pop(key, None)
+    for key in artifacts.get("ivp", {}):
+        _PRECOMPILED_IVP.pop(key, None)
+
+
+def _condition_key(conditions: dict[str, Any]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((label.replace(" ", ""), str(value)) for label, value in conditions.items()))
+
+
+def _parse_condition(label: str, local_dict: dict[str, Any]) -> tuple[int, Any]:
+    match = INITIAL_CONDITION.match(label)
+    if not match:
+        raise SympyValidationError(f"Не удалось разобрать начальное условие {label}")
+    return len(match.group(1)), parse_expr(match.group(2), dict(local_dict))
+
+
+def _fit_constants(equations: list[Any], constants: list[Any]) -> dict[Any, Any]:
+    """Values of the free constants; for linear ODEs the system is linear in them."""
+    if len(equations) != len(constants):
+        raise SympyValidationError("Число начальных условий не совпадает с числом постоянных")
+    try:
+        matrix, vector = sp.linear_eq_to_matrix(equations, constants)
+        values = matrix.LUsolve(vector)
+    except (NonlinearError, ValueError):
+        solutions = sp.solve(equations, constants, dict=True)
+        if len(solutions) != 1:
+            raise SympyValidationError("Начальные условия не определяют единственное решение") from None
+        return solutions[0]
+    return dict(zip(constants, values))
+
+
+def _fitted_ivp(
+    equation_str: str,
+    symbol_name: str,
+    general_solution: str | None,
+    conditions: tuple[tuple[str, str], ...],
+) -> tuple[Any, Any, float]:
+    key = (equation_str, symbol_name, general_solution, conditions)
+    return _PRECOMPILED_IVP.get(key) or _fit_ivp_cached(*key)
+
+
+@lru_cache(maxsize=512)
+def _ivp_reference(
+    equation_str: str,
+    symbol_name: str,
+    general_solution: str | None,
+    conditions: tuple[tuple[str, str], ...],
+) -> tuple[Any, Callable[[float], float], float]:
+    """Particular solution of the Cauchy problem compiled to a float function, once per task."""
+    x, particular, start = _fitted_ivp(equation_str, symbol_name, general_solution, conditions)
+    return x, sp.lambdify(x, particular, "math"), start
+
+
+@lru_cache(maxsize=512)
+def _fit_ivp_cached(
+    equation_str: str,
+    symbol_name: str,
+    general_solution: str | None,
+    conditions: tuple[tuple[str, str], ...],
+) -> tuple[Any, Any, float]:
+    return _fit_ivp(equation_str, symbol_name, general_solution, conditions)
+
+
+def _fit_ivp(
+    equation_str: str,
+    symbol_name: str,
+    general_solution: str | None,
+    conditions: tuple[tuple[str, str], ...],
+) -> tuple[Any, Any, float]:
+    """Symbol, particular solution and initial point of a Cauchy problem.
+
+    The general solution comes from the task (``expected``) or, failing that,
+    from ``dsolve``; only its constants are solved for, never the ODE itself.
+    """
+    x, y, lhs, rhs, local_dict = _parse_equation(equation_str, symbol_name)
+    if general_solution:
+        general = parse_expr(general_solution, dict(local_dict))
     else:
-        lhs = equation
-        rhs = 0
+        general = sp.dsolve(sp.Eq(lhs, rhs), y(x)).rhs
+    constants = sorted(general.free_symbols - {x}, key=str)
+    equations = []
+    points = []
+    for label, value in conditions:
+        order, point = _parse_condition(label, local_dict)
+        equations.append(general.diff(x, order).subs(x, point) - parse_expr(value, dict(local_dict)))
+        points.append(point)
+    particular = general.subs(_fit_constants(equations, constants))
+    return x, particular, float(points[0])
+
+
+def _same_function(
+    answer: Callable[[float], float], reference: Callable[[float], float], points: Iterable[float]
+) -> bool:
+    compared = 0
+    for point in points:
+        try:
+            expected = float(reference(point))
+            actual = float(answer(point))
+        except (ArithmeticError, ValueError, TypeError, NameError):
+            continue
+        if not math.isfinite(expected):
+            continue
+        # nan compares false with everything, so it would pass the check below.
+        if not math.isfinite(actual):
+            return False
+        if abs(actual - expected) > IVP_RELATIVE_TOLERANCE * max(1.0, abs(expected)):
+            return False
+        compared += 1
+    return compared >= IVP_MIN_SAMPLES
+
+
+def _check_ivp(
+    task: Task, equation_str: str, symbol_name: str, conditions: dict[str, Any], user_answer: str
+) -> tuple[bool, str]:
+    # The solution of a Cauchy problem is unique, so comparing values with the
+    # fitted reference replaces substituting into the ODE and simplifying.
+    x, reference, start = _ivp_reference(equation_str, symbol_name, task.expected, _condition_key(conditions))
+    _, _, _, _, local_dict = _parse_equation(equation_str, symbol_name)
+    answer = _parse_answer(user_answer, local_dict)
+    if answer.free_symbols - {x}:
+        return False, "Найдите значения постоянных из начальных условий"
+    if _not_finite(answer):
+        return False, "Решение не может содержать nan или бесконечность"
+    points = [start + offset for offset in IVP_SAMPLE_OFFSETS]
+    if _same_function(sp.lambdify(x, answer, "math"), reference, points):
+        return True, "Решение задачи Коши верное"
+    if _validate_solution(equation_str, symbol_name, user_answer):
+        return False, "Решение удовлетворяет уравнению, но не начальным условиям"
+    return False, "Подстановка в уравнение не обнуляет левую часть"
+
+
+def _validate_solution(equation_str: str, symbol_name: str, user_answer: str) -> bool:
+    x, y, lhs, rhs, local_dict = _parse_equation(equation_str, symbol_name)
+    solution_expr = _parse_answer(user_answer, local_dict)
+    # nan and zoo absorb the whole difference, which then never compares nonzero.
+    if _not_finite(solution_expr):
+        raise SympyValidationError("Решение не может содержать nan или бесконечность")
 
     substituted = lhs.subs(y(x), solution_expr)
     rhs_substituted = rhs.subs(y(x), solution_expr)
@@ -137,3 +615,6 @@ def _validate_solution(equation_str: str, symbol_name: str, user_answer: str) ->
         if numeric != 0:
             return False
     return True
+
+
+topics.on_artifacts(install_artifacts)
@@ -0,0 +1,353 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any
+
+from sqlmodel import Session, delete, func, select
+
+from ..database import engine
+from ..models import ChangeLog, SyncContribution, SyncReceipt, TopicProgress, User
+from . import leaderboard, progress_cache, progress_transfer
+
+# Desktop builds turn the change log on; the server only applies pushed batches.
+LOG_ENABLED = os.getenv("VISHMAT_SYNC_LOG") == "1"
+BATCH_SIZE = int(os.getenv("VISHMAT_SYNC_BATCH", "500"))
+# Upper bound for a decompressed batch, so a small gzip body cannot blow up memory.
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+# Counters that grow with every answer; batches carry what was added to them
+# locally, so progress made on the server in the meantime is kept.
+TOPIC_COUNTERS = ("mastery", "completed_lessons", "xp_earned")
+
+
+class SyncGap(Exception):
+    """The server has not seen changes the client already dropped from its log."""
+
+    def __init__(self, version: int) -> None:
+        super().__init__(f"server acknowledged version {version}")
+        self.version = version
+
+
+@dataclass
+class Batch:
+    client_id: str
+    since: int
+    until: int
+    rows: list[dict[str, Any]]
+    email: str | None = None
+
+    def accounts(self) -> set[str]:
+        """Server accounts the rows are merged into."""
+        return {self.email} if self.email else {row.get("email") for row in self.rows}
+
+
+def record(
+    session: Session,
+    user_id: int,
+    topic_id: str | None = None,
+    *,
+    xp: int = 0,
+    mastery: float = 0.0,
+    completed_lessons: int = 0,
+    xp_earned: int = 0,
+) -> None:
+    """Note a change to ``user_id`` (and its ``topic_id`` row) in the same transaction.
+
+    The counters are what the change added; settings changes log none.
+    """
+    if LOG_ENABLED:
+        session.add(
+            ChangeLog(
+                user_id=user_id,
+                topic_id=topic_id,
+                xp=xp,
+                mastery=mastery,
+                completed_lessons=completed_lessons,
+                xp_earned=xp_earned,
+            )
+        )
+
+
+# --- client side: reading the local log -------------------------------------
+
+
+def seed_log() -> int:
+    """Replace the log with the whole state of every local row, e.g. before the first sync.
+
+    The server subtracts what this client already added, so the whole state
+    can be sent again after a gap without counting anything twice.
+    """
+    with Session(engine) as session:
+        session.exec(delete(ChangeLog))
+        users = session.exec(select(User.id, User.xp)).all()
+        topics = session.exec(select(TopicProgress)).all()
+        session.add_all(ChangeLog(user_id=user_id, xp=xp, full=True) for user_id, xp in users)
+        session.add_all(
+            ChangeLog(
+                user_id=row.user_id,
+                topic_id=row.topic_id,
+                full=True,
+                **{name: getattr(row, name) for name in TOPIC_COUNTERS},
+            )
+            for row in topics
+        )
+        session.commit()
+    return len(users) + len(topics)
+
+
+def pending_batch(client_id: str, since: int, *, email: str | None = None, limit: int = BATCH_SIZE) -> Batch | None:
+    """The rows behind the oldest ``limit`` log entries.
+
+    Entries for the same row collapse into one row with their counters added
+    up; ``user_total``/``topic_total`` mark counters that are whole values
+    (a ``full`` entry was among them). Other fields carry the current values.
+    """
+    with Session(engine) as session:
+        entries = session.exec(select(ChangeLog).order_by(ChangeLog.version).limit(limit)).all()
+        if not entries:
+            return None
+        user_counters: dict[int, dict[str, Any]] = {}
+        topic_counters: dict[int, dict[str, dict[str, Any]]] = {}
+        for entry in entries:
+            totals = user_counters.setdefault(entry.user_id, {"xp": 0, "user_total": False})
+            totals["xp"] += entry.xp
+            if entry.topic_id is None:
+                totals["user_total"] = totals["user_total"] or entry.full
+                continue
+            totals = topic_counters.setdefault(entry.user_id, {}).setdefault(
+                entry.topic_id, {**dict.fromkeys(TOPIC_COUNTERS, 0), "topic_total": False}
+            )
+            for name in TOPIC_COUNTERS:
+                totals[name] += getattr(entry, name)
+            totals["topic_total"] = totals["topic_total"] or entry.full
+        users = session.exec(select(User).where(User.id.in_(user_counters))).all()
+        best = {
+            (row.user_id, row.topic_id): row.best_score
+            for row in session.exec(select(TopicProgress).where(TopicProgress.user_id.in_(user_counters)))
+        }
+        rows: list[dict[str, Any]] = []
+        for user in sorted(users, key=lambda user: user.email):
+            head = {
+                **{name: getattr(user, name) for name in progress_transfer.USER_FIELDS},
+                **user_counters[user.id],
+            }
+            topics = topic_counters.get(user.id, {})
+            if not topics:
+                rows.append({**head, **dict.fromkeys(progress_transfer.PROGRESS_FIELDS), "topic_total": False})
+            for topic_id in sorted(topics):
+                rows.append(
+                    {**head, "topic_id": topic_id, "best_score": best.get((user.id, topic_id)), **topics[topic_id]}
+                )
+        return Batch(client_id=client_id, since=since, until=entries[-1].version, rows=rows, email=email)
+
+
+def acknowledge(version: int) -> None:
+    """Drop log entries the server has confirmed."""
+    with Session(engine) as session:
+        session.exec(delete(ChangeLog).where(ChangeLog.version <= version))
+        session.commit()
+
+
+def pending_count() -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count(ChangeLog.version))).one()
+
+
+# --- wire format ---------------------------------------------------------------
+
+
+def encode_batch(batch: Batch) -> bytes:
+    document = {
+        "client_id": batch.client_id,
+        "since": batch.since,
+        "until": batch.until,
+        "email": batch.email,
+        "rows": batch.rows,
+    }
+    return gzip.compress(json.dumps(document, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def decode_batch(body: bytes, content_encoding: str | None = "gzip") -> Batch:
+    if content_encoding == "gzip":
+        inflater = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        try:
+            body = inflater.decompress(body, MAX_BATCH_BYTES)
+        except zlib.error as exc:
+            raise ValueError("Повреждённый пакет синхронизации") from exc
+        if inflater.unconsumed_tail:
+            raise ValueError("Пакет синхронизации слишком большой")
+    try:
+        document = json.loads(body)
+        batch = Batch(
+            client_id=str(document["client_id"]),
+            since=int(document["since"]),
+            until=int(document["until"]),
+            rows=document["rows"],
+            email=document.get("email"),
+        )
+        if not isinstance(batch.rows, list) or not (batch.email is None or isinstance(batch.email, str)):
+            raise TypeError("rows")
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError("Неверный формат пакета синхронизации") from exc
+    for number, row in enumerate(batch.rows, start=1):
+        _validate_row(number, row)
+    return batch
+
+
+def _validate_row(number: int, row: Any) -> None:
+    # The local email keys what this client has contributed, so it is required
+    # even when the batch names the server account.
+    try:
+        progress_transfer.validate_row(number, row)
+    except progress_transfer.MalformedRow as exc:
+        raise ValueError(f"Неверный формат пакета синхронизации. {exc}") from exc
+    for flag in ("user_total", "topic_total"):
+        if not isinstance(row.get(flag, False), bool):
+            raise ValueError(
+                f"Неверный формат пакета синхронизации. Строка {number}: поле {flag} должно быть true/false"
+            )
+
+
+# --- server side: applying pushed batches ---------------------------------------
+
+
+def _account(
+    session: Session, email: str, head: dict[str, Any], accounts: dict[str, User], stats: dict[str, int]
+) -> User:
+    user = accounts.get(email) or session.exec(select(User).where(User.email == email)).first()
+    if user is None:
+        user = User(
+            email=email,
+            display_name=head.get("display_name") or email,
+            daily_goal_minutes=head.get("daily_goal_minutes") or 10,
+            preferred_language=head.get("preferred_language") or "ru",
+            last_active=head.get("last_active") or date.today(),
+        )
+        session.add(user)
+        session.flush()
+        stats["users_created"] += 1
+    elif email not in accounts:
+        stats["users_updated"] += 1
+    accounts[email] = user
+    return user
+
+
+def _added(
+    contributions: dict[tuple[str, str], SyncContribution],
+    client_id: str,
+    key: tuple[str, str],
+    row: dict[str, Any],
+    names: tuple[str, ...],
+    total: bool,
+) -> dict[str, Any]:
+    """What ``row`` adds to the counters ``names``, updating the client's contribution.
+
+    A whole value adds only what exceeds the contribution already counted.
+    """
+    contribution = contributions.get(key)
+    if contribution is None:
+        contribution = contributions[key] = SyncContribution(client_id=client_id, email=key[0], topic_id=key[1])
+    added = {}
+    for name in names:
+        value = row.get(name) or 0
+        before = getattr(contribution, name)
+        added[name] = max(0, value - before) if total else value
+        setattr(contribution, name, value if total else before + value)
+    return added
+
+
+def apply_batch(batch: Batch) -> dict[str, Any]:
+    """Add a pushed batch in one transaction and advance the client's receipt.
+
+    Counters are added to the account, so progress made on the server since
+    the last sync is kept. A batch the receipt already covers is acknowledged
+    without touching the data, so a retried batch is not counted twice.
+    """
+    stats = {"users_created": 0, "users_updated": 0, "topics_merged": 0}
+    with Session(engine) as session:
+        receipt = session.get(SyncReceipt, batch.client_id)
+        acknowledged = receipt.version if receipt else 0
+        if batch.until <= acknowledged:
+            return {"client_id": batch.client_id, "version": acknowledged, "duplicate": True, **stats}
+        if batch.since > acknowledged:
+            raise SyncGap(acknowledged)
+
+        local_users: dict[str, list[dict[str, Any]]] = {}
+        for row in batch.rows:
+            local_users.setdefault(row["email"], []).append(row)
+        contributions = {
+            (row.email, row.topic_id): row
+            for row in session.exec(
+                select(SyncContribution).where(
+                    SyncContribution.client_id == batch.client_id, SyncContribution.email.in_(local_users)
+                )
+            )
+        }
+        accounts: dict[str, User] = {}
+        progress: dict[int, dict[str, TopicProgress]] = {}
+        touched: dict[int, tuple[User, list[TopicProgress]]] = {}
+        for local_email, rows in sorted(local_users.items()):
+            head = rows[0]
+            user = _account(session, batch.email or local_email, head, accounts, stats)
+            added = _added(
+                contributions, batch.client_id, (local_email, ""), head, ("xp",), head.get("user_total", False)
+            )
+            user.xp += added["xp"]
+            incoming_active = head.get("last_active")
+            if incoming_active and incoming_active >= user.last_active:
+                user.streak = head.get("streak") or 0
+                user.last_active = incoming_active
+            session.add(user)
+            entries = touched.setdefault(user.id, (user, []))[1]
+            if user.id not in progress:
+                progress[user.id] = {
+                    row.topic_id: row
+                    for row in session.exec(select(TopicProgress).where(TopicProgress.user_id == user.id))
+                }
+            topics = progress[user.id]
+            for row in rows:
+                topic_id = row.get("topic_id")
+                if not topic_id:
+                    continue
+                entry = topics.get(topic_id)
+                if entry is None:
+                    entry = topics[topic_id] = TopicProgress(user_id=user.id, topic_id=topic_id)
+                added = _added(
+                    contributions,
+                    batch.client_id,
+                    (local_email, topic_id),
+                    row,
+                    TOPIC_COUNTERS,
+                    row.get("topic_total", False),
+                )
+                entry.mastery = min(1.0, (entry.mastery or 0.0) + added["mastery"])
+                entry.completed_lessons = (entry.completed_lessons or 0) + added["completed_lessons"]
+                entry.xp_earned = (entry.xp_earned or 0) + added["xp_earned"]
+                entry.best_score = max(entry.best_score or 0.0, row.get("best_score") or 0.0)
+                session.add(entry)
+                entries.append(entry)
+                stats["topics_merged"] += 1
+        session.add_all(contributions.values())
+        receipt = receipt or SyncReceipt(client_id=batch.client_id)
+        receipt.version = batch.until
+        receipt.updated_at = datetime.utcnow()
+        session.add(receipt)
+        session.commit()
+
+        for user, entries in touched.values():
+            for entry in entries:
+                leaderboard.record_progress(user, entry)
+            progress_cache.invalidate(user.id)
+    return {"client_id": batch.client_id, "version": batch.until, "duplicate": False, **stats}
+
+
+def receipts() -> list[dict[str, Any]]:
+    with Session(engine) as session:
+        return [
+            {"client_id": row.client_id, "version": row.version, "updated_at": row.updated_at.isoformat()}
+            for row in session.exec(select(SyncReceipt).order_by(SyncReceipt.updated_at.desc()))
+        ]
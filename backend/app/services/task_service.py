@@ -1,14 +1,68 @@
 from __future__ import annotations
 
-from typing import Any
+import json
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, TypeVar
 
+from .. import crud
 from ..data import topics
 from ..data.topics import Task
 from . import sympy_checker
 
 
-def list_topics() -> list[dict[str, Any]]:
-    return topics.TOPICS
+T = TypeVar("T")
+
+
+class Singleflight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller runs ``fn``; callers arriving while it is in flight wait for
+    and share its result (or exception). Nothing is cached once the call ends.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+_grading_flight = Singleflight()
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _canonical_answer(task: Task, user_answer: Any) -> str:
+    # Only formulas are insensitive to the amount of whitespace; option strings
+    # are compared verbatim by the checker, so they stay verbatim in the key.
+    # A space is kept where there was one: "x y" and "xy" parse differently.
+    if task.type in ("solve-ode", "laplace") and isinstance(user_answer, str):
+        return _WHITESPACE.sub(" ", user_answer.strip())
+    return json.dumps(user_answer, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def list_topics(course_id: str | None = None) -> list[dict[str, Any]]:
+    return topics.list_topics(course_id)
 
 
 def get_topic_detail(topic_id: str) -> dict[str, Any] | None:
@@ -20,8 +74,37 @@ def generate_task(topic_id: str, target_difficulty: int) -> Task:
 
 
 def grade_answer(task_id: str, topic_id: str, user_answer: Any) -> tuple[Task, bool, str]:
-    task = topics.TASK_BANK.get(task_id)
+    task = topics.find_task(task_id, topic_id)
     if not task:
         task = topics.sample_task(topic_id, target_difficulty=3)
-    correct, feedback = sympy_checker.check_task_answer(task, user_answer)
+    correct, feedback = _grading_flight.do(
+        (task.id, _canonical_answer(task, user_answer)),
+        lambda: sympy_checker.check_task_answer(task, user_answer),
+    )
     return task, correct, feedback
+
+
+def check_and_record(
+    user_id: int,
+    task_id: str,
+    topic_id: str,
+    user_answer: Any,
+    job_item: tuple[str, str] | None = None,
+) -> tuple[Task, dict[str, Any]]:
+    """Grade an answer and record it; returns the task and the check result."""
+    task, correct, feedback = grade_answer(task_id, topic_id, user_answer)
+    _, _, deltas = crud.upsert_progress(
+        user_id=user_id,
+        topic_id=task.topic_id,
+        correct=correct,
+        difficulty=task.difficulty,
+        time_spent_seconds=60,
+        task_id=task.id,
+        job_item=job_item,
+    )
+    return task, {
+        "correct": correct,
+        "feedback": feedback,
+        "xp_awarded": int(deltas["xp_gain"]),
+        "mastery_delta": float(deltas["mastery_gain"]),
+    }
@@ -0,0 +1,380 @@
+"""Replay exam-style practice sessions against the API and report per-endpoint latency.
+
+Every simulated student loops generate → think → check → progress, like the
+practice page does. Right and wrong answers are derived from each task's answer
+key, so ``--correct-rate`` is the mix the server actually sees. By default the app
+runs in-process through an ASGI transport; pass ``--base-url`` (and an admin token
+to create the students) to load a running server instead.
+
+    cd backend
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.loadtest --cohort group-a:40:ode-first-order,numerical-methods \\
+        --cohort group-b:20:ode-second-order --tasks 10 --think-time 2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import httpx
+import numpy as np
+import sympy as sp
+from sympy.parsing.sympy_parser import parse_expr
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+# Importing ``app`` loads the whole application, database included: point it at
+# a scratch directory before that happens. A remote run never writes to it.
+os.environ.setdefault("VISHMAT_DATA_DIR", tempfile.mkdtemp(prefix="vishmat-load-"))
+
+from app.data import topics  # noqa: E402
+from app.services import laplace_table  # noqa: E402
+
+ALL_TOPICS = [
+    "ode-first-order",
+    "ode-second-order",
+    "euler-cauchy",
+    "systems",
+    "laplace-transform",
+    "numerical-methods",
+]
+
+@dataclass
+class Cohort:
+    name: str
+    students: int
+    topics: list[str]
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[int, int] = field(default_factory=lambda: defaultdict(int))
+
+
+def parse_cohort(value: str) -> Cohort:
+    try:
+        name, students, *rest = value.split(":")
+        topics = rest[0].split(",") if rest and rest[0] else ALL_TOPICS
+        return Cohort(name=name, students=int(students), topics=topics)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(
+            "Формат группы: имя:число_студентов[:тема1,тема2]"
+        ) from exc
+
+
+def _answer_key(task: dict[str, Any]) -> Any | None:
+    """The stored answer for ``task``.
+
+    In-process every task is found; against a remote server only the static
+    course tasks are, since generated ones live on the server.
+    """
+    stored = topics.find_task(task["id"], task["topic_id"])
+    return stored.expected if stored is not None and stored.id == task["id"] else None
+
+
+@lru_cache(maxsize=256)
+def _ode_solution(equation: str, symbol: str, conditions: tuple[tuple[str, Any], ...]) -> str:
+    x = sp.Symbol(symbol)
+    y = sp.Function("y")
+    parsed = parse_expr(equation, {"y": y, symbol: x, "Eq": sp.Eq, "Derivative": sp.Derivative, "exp": sp.exp})
+    ics = {}
+    for label, value in conditions:
+        order = label.count("'")
+        point = sp.sympify(label[label.index("(") + 1 : -1])
+        target = y(x).diff(x, order).subs(x, point) if order else y(point)
+        ics[target] = sp.sympify(value)
+    solution = sp.dsolve(parsed, y(x), ics=ics or None)
+    return str(solution.rhs)
+
+
+def _eigenpairs(matrix: list[list[float]]) -> tuple[np.ndarray, np.ndarray]:
+    values, vectors = np.linalg.eig(np.array(matrix, dtype=float))
+    return values.real, vectors.real.T
+
+
+def _number(value: float) -> str:
+    return repr(float(value))
+
+
+def _system_answer(validation: dict[str, Any], correct: bool) -> str:
+    values, vectors = _eigenpairs(validation["matrix"])
+    if validation.get("mode") == "eigen":
+        shift = 0.0 if correct else 1.0
+        return "; ".join(
+            f"{_number(value + shift)}: " + ", ".join(_number(item) for item in vector)
+            for value, vector in zip(values, vectors)
+        )
+    t = validation.get("symbol", "t")
+    # Dropping the last constant leaves a particular solution, which is wrong.
+    terms = len(values) if correct else len(values) - 1
+    return "; ".join(
+        " + ".join(
+            f"C{index + 1}*({_number(vectors[index][row])})*exp(({_number(values[index])})*{t})"
+            for index in range(terms)
+        )
+        or "0"
+        for row in range(len(values))
+    )
+
+
+def _answer(task: dict[str, Any], key: Any, correct: bool, rng: random.Random) -> Any | None:
+    """A right (``correct``) or wrong answer to ``task``; ``None`` without a key."""
+    task_type = task["type"]
+    validation = task.get("validation") or {}
+    if task_type == "solve-ode":
+        conditions = tuple(sorted((validation.get("initial_conditions") or {}).items()))
+        solution = _ode_solution(validation["equation"], validation.get("symbol", "x"), conditions)
+        return solution if correct else f"{solution} + {validation.get('symbol', 'x')}"
+    if task_type == "laplace":
+        image = laplace_table.image(tuple(tuple(term) for term in validation["terms"]))
+        return str(image) if correct else f"{image} + 1/s"
+    if task_type == "solve-system":
+        return _system_answer(validation, correct)
+    if key is None:
+        return None
+    if task_type == "method-choice":
+        wrong = [option for option in task.get("options") or [] if option != key]
+        return key if correct or not wrong else rng.choice(wrong)
+    if task_type == "match":
+        order = list(key)
+        return order if correct or len(order) < 2 else order[1:] + order[:1]
+    if task_type == "numeric":
+        if isinstance(key, list):
+            values = list(key) if correct else [key[0] + 1.0, *key[1:]]
+            return "; ".join(str(value) for value in values)
+        return key if correct else round(float(key) + 1.0, 3)
+    return bool(key) == correct
+
+
+class LoadTest:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        *,
+        tasks_per_student: int,
+        think_time: float,
+        correct_rate: float,
+        seed: int,
+    ) -> None:
+        self.client = client
+        self.tasks_per_student = tasks_per_student
+        self.think_time = think_time
+        self.correct_rate = correct_rate
+        self.seed = seed
+        self.stats: dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.answers: Counter[str] = Counter()
+
+    async def _call(self, label: str, method: str, url: str, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats[label].errors += 1
+            return None
+        finally:
+            self.stats[label].latencies.append(time.perf_counter() - started)
+        self.stats[label].statuses[response.status_code] += 1
+        if response.status_code >= 400:
+            self.stats[label].errors += 1
+            return None
+        return response.json()
+
+    async def _think(self, rng: random.Random) -> None:
+        if self.think_time > 0:
+            await asyncio.sleep(rng.expovariate(1 / self.think_time))
+
+    async def student(self, user_id: int, cohort: Cohort, start_delay: float) -> None:
+        rng = random.Random(self.seed * 100_003 + user_id)
+        await asyncio.sleep(start_delay)
+        for _ in range(self.tasks_per_student):
+            topic_id = rng.choice(cohort.topics)
+            task = await self._call(
+                "generate",
+                "POST",
+                "/api/practice/generate",
+                json={"topic_id": topic_id, "target_difficulty": rng.randint(1, 3)},
+            )
+            if task is None:
+                continue
+            await self._think(rng)
+            wants_correct = rng.random() < self.correct_rate
+            # Solving an ODE for the key is slow the first time; keep it off the loop.
+            answer = await asyncio.to_thread(_answer, task, _answer_key(task), wants_correct, rng)
+            if answer is None:
+                # A generated task of a remote server: no key, so any option will do
+                # and the answer stays out of the configured mix.
+                self.answers["without_key"] += 1
+                answer = rng.choice(task.get("options") or [""])
+            else:
+                self.answers["sent_correct" if wants_correct else "sent_wrong"] += 1
+            result = await self._call(
+                "check",
+                "POST",
+                "/api/practice/check",
+                json={
+                    "task_id": task["id"],
+                    "topic_id": task["topic_id"],
+                    "user_answer": answer,
+                    "user_id": user_id,
+                },
+            )
+            if result is not None:
+                self.answers["graded_correct" if result["correct"] else "graded_wrong"] += 1
+            await self._call("progress", "GET", f"/api/progress/{user_id}")
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(stats: dict[str, EndpointStats], elapsed: float, answers: Counter[str]) -> dict[str, Any]:
+    report: dict[str, Any] = {
+        "elapsed_seconds": round(elapsed, 3),
+        "answers": {
+            name: answers[name]
+            for name in ("sent_correct", "sent_wrong", "without_key", "graded_correct", "graded_wrong")
+        },
+        "endpoints": {},
+    }
+    for label, entry in sorted(stats.items()):
+        latencies = sorted(entry.latencies)
+        count = len(latencies)
+        report["endpoints"][label] = {
+            "requests": count,
+            "errors": entry.errors,
+            "error_rate": round(entry.errors / count, 4) if count else 0.0,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round((latencies[-1] if latencies else 0.0) * 1000, 1),
+            "statuses": dict(entry.statuses),
+        }
+    return report
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(f"Длительность: {report['elapsed_seconds']} с")
+    answers = report["answers"]
+    print(
+        f"Ответы: отправлено верных {answers['sent_correct']}, неверных {answers['sent_wrong']}, "
+        f"без ключа {answers['without_key']}; засчитано {answers['graded_correct']} из "
+        f"{answers['graded_correct'] + answers['graded_wrong']}"
+    )
+    header = f"{'endpoint':<10}{'req':>8}{'err%':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    for label, row in report["endpoints"].items():
+        print(
+            f"{label:<10}{row['requests']:>8}{row['error_rate'] * 100:>7.2f}%{row['throughput_rps']:>9}"
+            f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}"
+        )
+
+
+def _prepare_in_process_app(students: int) -> tuple[Any, list[int]]:
+    from app import crud, main
+
+    main.startup()
+    user_ids = [
+        crud.get_or_create_user(f"load-{index}@example.com", f"Load Student {index}").id
+        for index in range(students)
+    ]
+    return main.app, user_ids
+
+
+async def _prepare_remote_users(args: argparse.Namespace, students: int) -> list[int]:
+    """Create (or find) the load-test students on the server and return their ids."""
+    if not args.admin_token:
+        raise SystemExit("Для --base-url нужен --admin-token (или VISHMAT_ADMIN_TOKEN)")
+    user_ids = []
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        for index in range(students):
+            response = await client.post(
+                "/api/admin/users",
+                json={"email": f"load-{index}@example.com", "display_name": f"Load Student {index}"},
+                headers={"X-Admin-Token": args.admin_token},
+            )
+            response.raise_for_status()
+            user_ids.append(response.json()["id"])
+    return user_ids
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    cohorts: list[Cohort] = args.cohort or [Cohort("default", 20, ALL_TOPICS)]
+    total_students = sum(cohort.students for cohort in cohorts)
+    if args.base_url:
+        user_ids = await _prepare_remote_users(args, total_students)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+    else:
+        app, user_ids = _prepare_in_process_app(total_students)
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=args.timeout
+        )
+
+    test = LoadTest(
+        client,
+        tasks_per_student=args.tasks,
+        think_time=args.think_time,
+        correct_rate=args.correct_rate,
+        seed=args.seed,
+    )
+    assignments = iter(user_ids)
+    ramp = random.Random(args.seed)
+    jobs = []
+    for cohort in cohorts:
+        for _ in range(cohort.students):
+            delay = ramp.uniform(0, args.ramp_up) if args.ramp_up else 0.0
+            jobs.append(test.student(next(assignments), cohort, delay))
+
+    started = time.perf_counter()
+    async with client:
+        await asyncio.gather(*jobs)
+    return summarize(test.stats, time.perf_counter() - started, test.answers)
+
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--cohort",
+        action="append",
+        type=parse_cohort,
+        help="Группа студентов: имя:число[:тема1,тема2], можно указать несколько раз",
+    )
+    parser.add_argument("--tasks", type=int, default=10, help="Задач на студента")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Среднее время на ответ, с")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Время подключения всех студентов, с")
+    parser.add_argument("--correct-rate", type=float, default=0.7)
+    parser.add_argument("--base-url", help="Адрес запущенного сервера, например http://127.0.0.1:8000")
+    parser.add_argument(
+        "--admin-token",
+        default=os.getenv("VISHMAT_ADMIN_TOKEN"),
+        help="Токен администратора сервера: нужен с --base-url, чтобы создать студентов",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Вывести отчёт в JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,115 @@
+"""Microbenchmark of response encoding for the progress and generate endpoints.
+
+Compares the default path (build the Pydantic model, let FastAPI validate it again
+against ``response_model`` and encode with the standard library) with the
+``VISHMAT_FAST_JSON`` path (encode the prepared dict once with orjson).
+
+    cd backend
+    python -m benchmarks.serialization --topics 6 --repeat 2000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from datetime import date
+from pathlib import Path
+
+os.environ.setdefault("VISHMAT_DATA_DIR", tempfile.mkdtemp(prefix="vishmat-bench-"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+
+from app import main  # noqa: E402
+from app.services import task_service  # noqa: E402
+
+
+def _progress_data(topics: int) -> dict:
+    return {
+        "user_id": 1,
+        "xp": 1200,
+        "streak": 4,
+        "last_active": date.today(),
+        "daily_goal_minutes": 10,
+        "progress": [
+            {
+                "topic_id": f"topic-{index}",
+                "mastery": 0.35,
+                "completed_lessons": 12,
+                "best_score": 2.0,
+                "xp_earned": 240,
+                "attempts": 14,
+                "accuracy": 0.71,
+            }
+            for index in range(topics)
+        ],
+        "daily_xp": [{"day": date.today(), "xp": 80, "answers": 5} for _ in range(7)],
+    }
+
+
+def _route(path: str) -> APIRoute:
+    return next(route for route in main.app.routes if isinstance(route, APIRoute) and route.path == path)
+
+
+def _run_sync(coroutine):
+    # With the default ``is_coroutine=True`` serialize_response validates inline and
+    # never suspends, so drive it by hand instead of paying for an event loop. The
+    # real ``def`` endpoints also hop to the threadpool here, so this understates
+    # the default path's cost.
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("serialize_response unexpectedly suspended")
+
+
+def _default_path(route: APIRoute, model: type, data: dict) -> bytes:
+    content = _run_sync(
+        serialize_response(field=route.response_field, response_content=model(**data))
+    )
+    return JSONResponse(content).body
+
+
+def _fast_path(data: dict) -> bytes:
+    return ORJSONResponse(data).body
+
+
+def _measure(label: str, repeat: int, default, fast) -> None:
+    default_time = timeit.timeit(default, number=repeat) / repeat * 1e6
+    fast_time = timeit.timeit(fast, number=repeat) / repeat * 1e6
+    print(
+        f"{label:<10} default {default_time:8.1f} µs   fast {fast_time:8.1f} µs   "
+        f"x{default_time / fast_time:.1f}"
+    )
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    progress = _progress_data(args.topics)
+    progress_route = _route("/api/progress/{user_id}")
+    _measure(
+        "progress",
+        args.repeat,
+        lambda: _default_path(progress_route, main.ProgressPayload, progress),
+        lambda: _fast_path(progress),
+    )
+
+    task = main._task_to_dict(task_service.generate_task("ode-first-order", 2))
+    generate_route = _route("/api/practice/generate")
+    _measure(
+        "generate",
+        args.repeat,
+        lambda: _default_path(generate_route, main.TaskPayload, task),
+        lambda: _fast_path(task),
+    )
+
+
+if __name__ == "__main__":
+    main_cli()
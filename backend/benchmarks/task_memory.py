@@ -0,0 +1,95 @@
+"""Retained heap per generated task: compact ``Task`` records versus plain ones.
+
+Both sides run the same templates. The plain side keeps what the generator used
+to keep: a ``__dict__`` dataclass with a rendered prompt string and fresh hint
+dicts and option lists per task. The compact side builds ``topics.Task``.
+
+    cd backend
+    python -m benchmarks.task_memory --tasks 5000
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+os.environ.setdefault("VISHMAT_DATA_DIR", tempfile.mkdtemp(prefix="vishmat-bench-"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.data import templates, topics  # noqa: E402
+
+GENERATED_TOPICS = ["ode-first-order", "numerical-methods"]
+
+
+@dataclass
+class PlainTask:
+    id: str
+    topic_id: str
+    title: str
+    type: str
+    prompt: str
+    difficulty: int
+    hints: list[dict[str, Any]]
+    options: list[str] | None = None
+    pairs: list[dict[str, str]] | None = None
+    expected: Any | None = None
+    validation: dict[str, Any] | None = None
+
+
+def _plain(payload: dict[str, Any]) -> PlainTask:
+    options = payload.get("options")
+    return PlainTask(
+        **{
+            **payload,
+            "prompt": str(payload["prompt"]),
+            "hints": [dict(hint) for hint in payload["hints"]],
+            "options": list(options) if options is not None else None,
+        }
+    )
+
+
+def _compact(payload: dict[str, Any]) -> topics.Task:
+    return topics.Task(**payload)
+
+
+def _retained_bytes(build: Callable[[dict[str, Any]], Any], count: int, seed: int) -> int:
+    rules = [topics.course_for_topic(topic_id).templates[topic_id] for topic_id in GENERATED_TOPICS]
+    random.seed(seed)
+    gc.collect()
+    tracemalloc.start()
+    # Each payload dict is dropped as soon as its task exists, so the total only
+    # counts what the tasks keep alive, shared hint and option tuples included.
+    tasks = [
+        build(templates.choose_template(rules[index % 2], 5)())
+        for index in range(count)
+    ]
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tasks
+    return retained
+
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=5000, help="Сколько задач сгенерировать")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    plain = _retained_bytes(_plain, args.tasks, args.seed)
+    compact = _retained_bytes(_compact, args.tasks, args.seed)
+    print(f"{'representation':<16}{'bytes/task':>12}")
+    print(f"{'plain':<16}{plain / args.tasks:>12.0f}")
+    print(f"{'compact':<16}{compact / args.tasks:>12.0f}")
+    print(f"Экономия: {1 - compact / plain:.0%}")
+
+
+if __name__ == "__main__":
+    main_cli()
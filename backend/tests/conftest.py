@@ -0,0 +1,40 @@
+"""Shared setup: every test run gets its own data directory and database.
+
+Run from the repository root or from ``backend/``::
+
+    python -m pytest backend/tests
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+import pytest
+
+_DATA_DIR = tempfile.mkdtemp(prefix="vishmat-tests-")
+os.environ["VISHMAT_DATA_DIR"] = _DATA_DIR
+os.environ["VISHMAT_CATALOG_SNAPSHOTS"] = str(Path(_DATA_DIR) / "snapshots")
+os.environ["VISHMAT_BACKUP_DIR"] = str(Path(_DATA_DIR) / "backups")
+os.environ.setdefault("VISHMAT_SYNC_LOG", "1")
+os.environ.setdefault("VISHMAT_GRADING_PROCESSES", "1")
+# Every test client comes from the same address; tests that need the address
+# limit install their own.
+os.environ.setdefault("VISHMAT_CHECK_ADDRESS_RATE", "0")
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app import crud  # noqa: E402
+from backend.app.database import init_db  # noqa: E402
+
+init_db()
+
+
+@pytest.fixture
+def user():
+    """A fresh user, so tests never share progress rows."""
+    return crud.get_or_create_user(f"{uuid.uuid4().hex[:12]}@example.com", "Test Student")
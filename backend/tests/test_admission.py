@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.app.services import admission
+from backend.app.services.admission import AdmissionGate, AdmissionMiddleware, RateLimiter
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware)
+
+    @app.post("/api/practice/check")
+    async def check(request: Request) -> dict:
+        return {"echo": (await request.body()).decode()}
+
+    @app.get("/api/topics")
+    def topics() -> list:
+        return []
+
+    return TestClient(app)
+
+
+class _UnusableGate:
+    @asynccontextmanager
+    async def admit(self):
+        raise AssertionError("the request entered the gate")
+        yield
+
+
+def test_rate_limiter_keys_on_client_and_user():
+    limiter = RateLimiter(rate=1.0, burst=1)
+    assert limiter.acquire(admission.rate_key(("10.0.0.1", 1), 7)) == 0
+    assert limiter.acquire(admission.rate_key(("10.0.0.1", 2), 7)) > 0
+    assert limiter.acquire(admission.rate_key(("10.0.0.2", 1), 7)) == 0
+    assert limiter.acquire(admission.rate_key(("10.0.0.1", 1), 8)) == 0
+
+
+def test_rotating_user_ids_does_not_escape_the_limit(monkeypatch):
+    monkeypatch.setattr(admission, "check_rate_limiter", RateLimiter(rate=0.01, burst=5))
+    monkeypatch.setattr(admission, "address_rate_limiter", RateLimiter(rate=0.01, burst=8))
+    client = _client()
+    statuses = [client.post("/api/practice/check", json={"user_id": number}).status_code for number in range(20)]
+    assert statuses == [200] * 8 + [429] * 12
+    # The same student is still held to the per-user bucket.
+    monkeypatch.setattr(admission, "address_rate_limiter", RateLimiter(rate=0.01, burst=100))
+    statuses = [client.post("/api/practice/check", json={"user_id": 99}).status_code for _ in range(7)]
+    assert statuses == [200] * 5 + [429] * 2
+
+
+def test_body_reaches_the_endpoint(monkeypatch):
+    monkeypatch.setattr(admission, "check_rate_limiter", RateLimiter(rate=1.0, burst=5))
+    response = _client().post("/api/practice/check", json={"user_id": 3, "answer": "y"})
+    assert response.status_code == 200
+    assert response.json() == {"echo": '{"user_id": 3, "answer": "y"}'}
+
+
+def test_rate_limit_is_checked_before_the_gate(monkeypatch):
+    monkeypatch.setattr(admission, "check_rate_limiter", RateLimiter(rate=0.5, burst=1))
+    client = _client()
+    assert client.post("/api/practice/check", json={"user_id": 3}).status_code == 200
+    monkeypatch.setattr(admission, "gate_for", lambda method, path: _UnusableGate())
+    response = client.post("/api/practice/check", json={"user_id": 3})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_full_gate_sheds_load(monkeypatch):
+    gate = AdmissionGate("read", limit=1, max_queue=0, max_wait=1.0, retry_after=3)
+    monkeypatch.setattr(admission, "gate_for", lambda method, path: gate)
+    gate._semaphore = asyncio.Semaphore(0)
+    response = _client().get("/api/topics")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert gate.stats()["rejected"] == 1
+
+
+@pytest.mark.parametrize("body", [b"", b"not json", b"[1, 2]"])
+def test_unparsable_bodies_are_passed_on(monkeypatch, body):
+    monkeypatch.setattr(admission, "check_rate_limiter", RateLimiter(rate=1.0, burst=5))
+    response = _client().post("/api/practice/check", content=body)
+    assert response.status_code == 200
+    assert response.json() == {"echo": body.decode()}
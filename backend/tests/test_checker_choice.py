@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.app.data import templates, topics
+from backend.app.data.topics import Task
+from backend.app.services.sympy_checker import check_task_answer
+
+
+def _task(task_id: str, topic_id: str) -> Task:
+    return topics.find_task(task_id, topic_id)
+
+
+def test_method_choice():
+    task = _task("fo-linear-1", "ode-first-order")
+    assert check_task_answer(task, "Метод интегрирующего множителя") == (True, "Отлично!")
+    assert check_task_answer(task, "Разделение переменных") == (
+        False,
+        "Правильный ответ: Метод интегрирующего множителя",
+    )
+
+
+@pytest.mark.parametrize("answer", [None, 1, ["Метод интегрирующего множителя"], {"option": 0}])
+def test_method_choice_rejects_malformed(answer):
+    assert check_task_answer(_task("fo-linear-1", "ode-first-order"), answer) == (False, "Ответ должен быть строкой")
+
+
+def test_generated_method_choice():
+    task = Task(**templates.GENERATORS["method-choice"](3))
+    assert task.expected in task.options
+    assert check_task_answer(task, task.expected)[0]
+    wrong = next(option for option in task.options if option != task.expected)
+    assert not check_task_answer(task, wrong)[0]
+
+
+def test_theory():
+    task = _task("fo-exact-1", "ode-first-order")
+    assert check_task_answer(task, True) == (True, "Верно")
+    assert check_task_answer(task, False) == (False, "Уточните критерии точности")
+
+
+def test_match():
+    task = _task("laplace-1", "laplace-transform")
+    assert check_task_answer(task, [0, 1, 2]) == (True, "Совпадение найдено")
+    assert check_task_answer(task, [2, 1, 0]) == (False, "Проверьте соответствия")
+    assert check_task_answer(task, [0, 1]) == (False, "Проверьте соответствия")
+
+
+@pytest.mark.parametrize("answer", [None, "0,1,2", 3, {"0": 0}])
+def test_match_rejects_malformed(answer):
+    assert check_task_answer(_task("laplace-1", "laplace-transform"), answer) == (False, "Выберите соответствия")
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.app.data import templates
+from backend.app.data.topics import Task
+from backend.app.services.sympy_checker import check_task_answer
+
+
+@pytest.fixture(params=[2, 3])
+def task(request) -> Task:
+    return Task(**templates.GENERATORS["laplace-image"](request.param))
+
+
+def test_table_image_is_accepted(task):
+    assert check_task_answer(task, task.expected) == (True, "Изображение найдено верно")
+    assert check_task_answer(task, f" ({task.expected}) * (s + 1)/(s + 1) ")[0]
+
+
+def test_wrong_image_is_rejected(task):
+    assert check_task_answer(task, f"{task.expected} + 1/s**7") == (
+        False,
+        "Изображение не совпадает с табличным",
+    )
+
+
+@pytest.mark.parametrize("answer", ["nan", "zoo", "oo", "-oo", "1/s + nan", "zoo*s"])
+def test_non_finite_image_is_rejected(task, answer):
+    assert check_task_answer(task, answer) == (False, "Изображение не может содержать nan или бесконечность")
+
+
+@pytest.mark.parametrize("answer", ["", "   ", "s(", None, 1, ["1/s"]])
+def test_malformed_image_is_rejected(task, answer):
+    assert not check_task_answer(task, answer)[0]
+
+
+def test_image_must_depend_on_s_only(task):
+    assert check_task_answer(task, "1/(s - t)") == (False, "Изображение должно зависеть только от s")
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.app.data import templates, topics
+from backend.app.data.topics import Task
+from backend.app.services import numeric_engine
+from backend.app.services.sympy_checker import check_task_answer
+
+
+def _table_task() -> Task:
+    for _ in range(50):
+        task = Task(**templates.GENERATORS["numeric"](3))
+        if isinstance(task.expected, list):
+            return task
+    raise AssertionError("the numeric generator produced no table task")
+
+
+def _single_task() -> Task:
+    return topics.find_task("numeric-euler-1", "numerical-methods")
+
+
+def test_single_value():
+    task = _single_task()
+    assert check_task_answer(task, 1.1)[0]
+    assert check_task_answer(task, "1.105")[0]
+    assert not check_task_answer(task, 1.3)[0]
+
+
+@pytest.mark.parametrize("answer", ["nan", "inf", "-inf", float("nan")])
+def test_single_value_rejects_non_finite(answer):
+    assert check_task_answer(_single_task(), answer) == (False, "Введите конечное число")
+
+
+@pytest.mark.parametrize("answer", [None, "", "один", [1.1], {"value": 1.1}])
+def test_single_value_rejects_malformed(answer):
+    assert not check_task_answer(_single_task(), answer)[0]
+
+
+def test_table():
+    task = _table_task()
+    assert check_task_answer(task, "; ".join(str(value) for value in task.expected)) == (
+        True,
+        "Все значения таблицы верны",
+    )
+    assert check_task_answer(task, list(task.expected))[0]
+    wrong = [*task.expected[:-1], task.expected[-1] + 1]
+    correct, feedback = check_task_answer(task, wrong)
+    assert not correct
+    assert task.validation["labels"][-1] in feedback
+
+
+@pytest.mark.parametrize("filler", ["nan", "inf", "-inf"])
+def test_table_rejects_non_finite(filler):
+    task = _table_task()
+    correct, feedback = check_task_answer(task, "; ".join([filler] * len(task.expected)))
+    assert not correct
+    assert task.validation["labels"][0] in feedback
+
+
+@pytest.mark.parametrize("answer", ["1; два; 3", [None], {"y_1": 1.0}, "1"])
+def test_table_rejects_malformed(answer):
+    assert not check_task_answer(_table_task(), answer)[0]
+
+
+def test_compare_table_flags_non_finite_values():
+    assert numeric_engine.compare_table([1.0, 2.0], [1.0, 2.0], [0.1, 0.1]) is None
+    assert numeric_engine.compare_table([1.0, 2.0], [1.0, float("nan")], [0.1, 0.1]) == 1
+    assert numeric_engine.compare_table([1.0, 2.0], [float("inf"), 2.0], [0.1, 0.1]) == 0
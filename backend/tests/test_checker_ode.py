@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import math
+
+import pytest
+import sympy as sp
+
+from backend.app.data import templates, topics
+from backend.app.data.topics import Task
+from backend.app.services import sympy_checker
+from backend.app.services.sympy_checker import check_task_answer
+
+NON_FINITE = ["nan", "zoo", "oo", "-oo", "exp(x)*nan", "1/0"]
+
+IVP_TASKS = {
+    ("fo-ivp-1", "ode-first-order"): "exp(-x)/2 + exp(x)/2",
+    ("so-ivp-1", "ode-second-order"): "(exp(2*x) + exp(-2*x))/2",
+    ("numeric-euler-exact-1", "numerical-methods"): "2*exp(x) - x - 1",
+}
+GENERAL_TASKS = {
+    ("fo-linear-2", "ode-first-order"): "C*exp(-x) + exp(x)/2",
+    ("so-solve-1", "ode-second-order"): "C1*exp(2*x) + C2*exp(-2*x)",
+}
+
+
+def _generated_ivp() -> tuple[Task, str]:
+    task = Task(**templates.GENERATORS["ode-ivp"](3))
+    x, constant = sp.symbols("x C")
+    general = sp.sympify(task.expected)
+    start = task.validation["initial_conditions"]["y(0)"]
+    value = sp.solve(general.subs(x, 0) - start, constant)[0]
+    return task, str(general.subs(constant, value))
+
+
+@pytest.mark.parametrize("key, answer", IVP_TASKS.items())
+def test_ivp(key, answer):
+    task = topics.find_task(*key)
+    assert check_task_answer(task, answer) == (True, "Решение задачи Коши верное")
+    assert check_task_answer(task, "exp(x)")[0] is False
+
+
+@pytest.mark.parametrize("key", [*IVP_TASKS, *GENERAL_TASKS])
+@pytest.mark.parametrize("answer", NON_FINITE)
+def test_non_finite_answers_fail(key, answer):
+    correct, feedback = check_task_answer(topics.find_task(*key), answer)
+    assert not correct
+    assert "nan или бесконечность" in feedback
+
+
+@pytest.mark.parametrize("key", [*IVP_TASKS, *GENERAL_TASKS])
+@pytest.mark.parametrize("answer", ["", "y(", None, 3, ["exp(x)"]])
+def test_malformed_answers_fail(key, answer):
+    assert not check_task_answer(topics.find_task(*key), answer)[0]
+
+
+@pytest.mark.parametrize("key", [*IVP_TASKS, *GENERAL_TASKS])
+@pytest.mark.parametrize("answer", ["1,2", "(1,2)", "x>1", "True", "'a'", "Eq(y(x),1)", "y"])
+def test_answers_that_are_not_expressions_fail(key, answer):
+    assert check_task_answer(topics.find_task(*key), answer) == (False, "Не удалось разобрать выражение")
+
+
+def test_ivp_keeps_constants_out():
+    task = topics.find_task("fo-ivp-1", "ode-first-order")
+    assert check_task_answer(task, "C*exp(-x) + exp(x)/2") == (
+        False,
+        "Найдите значения постоянных из начальных условий",
+    )
+
+
+def test_generated_ivp():
+    task, answer = _generated_ivp()
+    assert check_task_answer(task, answer)[0]
+    assert not check_task_answer(task, "nan")[0]
+    assert not check_task_answer(task, f"{answer} + 1")[0]
+
+
+@pytest.mark.parametrize("key, answer", GENERAL_TASKS.items())
+def test_general_solution(key, answer):
+    task = topics.find_task(*key)
+    assert check_task_answer(task, answer) == (True, "Решение удовлетворяет уравнению")
+    assert not check_task_answer(task, "x")[0]
+
+
+def test_same_function_rejects_non_finite_values():
+    reference = math.exp
+    points = [0.1, 0.2, 0.3, 0.4]
+    assert sympy_checker._same_function(math.exp, reference, points)
+    assert not sympy_checker._same_function(lambda x: math.nan, reference, points)
+    assert not sympy_checker._same_function(lambda x: math.inf, reference, points)
+    # Points the reference is undefined at are still skipped.
+    assert sympy_checker._same_function(math.exp, lambda x: math.nan if x < 0.2 else math.exp(x), points)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.app.data import templates
+from backend.app.data.topics import Task
+from backend.app.services.sympy_checker import check_task_answer
+
+MATRIX = [[1, 2], [2, 1]]
+
+
+def _task(mode: str, matrix: list[list[int]] = MATRIX) -> Task:
+    return Task(
+        id=f"systems-{mode}-test",
+        topic_id="systems",
+        title="Система",
+        type="solve-system",
+        prompt="…",
+        difficulty=3,
+        hints=[],
+        validation={"type": "system", "mode": mode, "matrix": matrix, "symbol": "t"},
+    )
+
+
+def _generated(mode: str) -> Task:
+    for _ in range(100):
+        task = Task(**templates.GENERATORS["linear-system"](5))
+        if task.validation["mode"] == mode:
+            return task
+    raise AssertionError(f"the generator produced no {mode} task")
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [
+        "3: 1, 1; -1: 1, -1",
+        "-1: (2, -2)\n3: [-1, -1]",
+        [[3, [1, 1]], [-1, [1, -1]]],
+        [["3", ["1e300", "1e300"]], ["-1", ["1e-300", "-1e-300"]]],
+    ],
+)
+def test_eigenpairs(answer):
+    assert check_task_answer(_task("eigen"), answer) == (True, "Собственные пары найдены верно")
+
+
+def test_generated_eigenpairs():
+    task = _generated("eigen")
+    values, vectors = np.linalg.eig(np.array(task.validation["matrix"], dtype=float))
+    answer = [[float(value), [float(item) for item in vector]] for value, vector in zip(values, vectors.T)]
+    assert check_task_answer(task, answer)[0]
+
+
+@pytest.mark.parametrize(
+    "answer, feedback",
+    [
+        ("3: 1, 1; 1: 1, -1", "Собственные значения найдены неверно"),
+        ("3: 1, 1; -1: 1, 1", "Вектор для λ = -1 не является собственным"),
+        ("3: 0, 0; -1: 1, -1", "Собственный вектор не может быть нулевым"),
+        ("3: 1, 1", "Нужно 2 пары «собственное значение: вектор» длины 2"),
+    ],
+)
+def test_wrong_eigenpairs(answer, feedback):
+    assert check_task_answer(_task("eigen"), answer) == (False, feedback)
+
+
+@pytest.mark.parametrize(
+    "answer",
+    ["3: nan, 1; -1: 1, -1", "nan: 1, 1; -1: 1, -1", "3: inf, 1; -1: 1, -1", "3: 1, zoo; -1: 1, -1", "oo: 1, 1"],
+)
+def test_non_finite_eigenpairs_are_rejected(answer):
+    correct, feedback = check_task_answer(_task("eigen"), answer)
+    assert not correct
+    assert feedback.startswith("Введите конечное число")
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [[1, 2], [[3, 1, 1]], [[3, 1]], [[3, []], [-1, [1]]], [None], {"3": [1, 1]}, "", "3:", "x: 1, 1", "3: 1; -1: 1, -1"],
+)
+def test_malformed_eigenpairs_are_rejected(answer):
+    assert not check_task_answer(_task("eigen"), answer)[0]
+
+
+@pytest.mark.parametrize(
+    "answer",
+    [
+        "y1 = C1*exp(3*t) + C2*exp(-t); y2 = C1*exp(3*t) - C2*exp(-t)",
+        ["2*C2*exp(3*t) + C1*exp(-t)", "2*C2*exp(3*t) - C1*exp(-t)"],
+    ],
+)
+def test_fundamental_system(answer):
+    assert check_task_answer(_task("fundamental"), answer) == (True, "Общее решение системы верное")
+
+
+@pytest.mark.parametrize(
+    "answer, feedback",
+    [
+        ("C1*exp(3*t); C1*exp(3*t)", "Это частное решение: общее должно содержать все постоянные C1…C2"),
+        ("C1*exp(3*t); C2*exp(-t)", "Подстановка в систему Y' = AY не даёт тождества"),
+        ("C*exp(3*t); C*exp(3*t)", "Используйте только t и постоянные C1…C2, лишнее: C"),
+    ],
+)
+def test_wrong_fundamental_system(answer, feedback):
+    assert check_task_answer(_task("fundamental"), answer) == (False, feedback)
+
+
+@pytest.mark.parametrize("answer", ["nan; nan", "C1*zoo; C2", "oo*exp(t); C2*exp(-t)"])
+def test_non_finite_fundamental_system_is_rejected(answer):
+    assert check_task_answer(_task("fundamental"), answer) == (
+        False,
+        "Решение не может содержать nan или бесконечность",
+    )
+
+
+@pytest.mark.parametrize("answer", ["", "C1*exp(3*t)", ["a", "b", "c"], None, 5, "exp(; 1"])
+def test_malformed_fundamental_system_is_rejected(answer):
+    assert not check_task_answer(_task("fundamental"), answer)[0]
+
+
+@pytest.mark.parametrize("answer", ["True; False", "'a'; 'b'", "(1,2); C2", "C1*exp(3*t); t > 1"])
+def test_fundamental_components_must_be_expressions(answer):
+    assert check_task_answer(_task("fundamental"), answer) == (False, "Не удалось разобрать выражение")
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import pickle
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from backend.app.data import snapshot, templates
+from backend.app.data.topics import Task
+from backend.app.services import exam_service, sympy_checker
+
+
+def _ivp_task() -> Task:
+    task = Task(**templates.GENERATORS["ode-ivp"](3))
+    sympy_checker.precompile(task)
+    return task
+
+
+def _ivp_answer(task: Task) -> str:
+    # expected is "C*exp(-k*x) + r*exp(x)/(k+1)"; the particular solution fixes C.
+    start = task.validation["initial_conditions"]["y(0)"]
+    general = task.expected
+    rhs = general.split(" + ", 1)[1]
+    return general.replace("C*", f"({start} - ({rhs.replace('exp(x)', '1')}))*", 1)
+
+
+def test_workers_grade_with_shipped_reference_data(monkeypatch):
+    task = _ivp_task()
+    artifacts = snapshot.dumps(sympy_checker.task_artifacts(task))
+    assert pickle.loads(artifacts)["ivp"]
+
+    def _no_parsing(*args):
+        raise AssertionError("the worker parsed the reference itself")
+
+    sympy_checker._ivp_reference.cache_clear()
+    monkeypatch.setattr(sympy_checker, "_compile_equation", _no_parsing)
+    monkeypatch.setattr(sympy_checker, "_fit_ivp_cached", _no_parsing)
+    correct, feedback = exam_service._grade_with_artifacts(task, _ivp_answer(task), artifacts)
+    assert correct, feedback
+    equation, ivp = sympy_checker._reference_keys(task)
+    assert ivp not in sympy_checker._PRECOMPILED_IVP
+    assert equation not in sympy_checker._PRECOMPILED_EQUATIONS
+
+
+def test_process_pool_is_spawned():
+    executor = exam_service._grading_executor()
+    if exam_service.GRADING_PROCESSES <= 0:
+        pytest.skip("grading runs in threads")
+    assert executor._mp_context.get_start_method() == "spawn"
+
+
+def test_ticket_has_no_repeated_tasks(user):
+    # euler-cauchy has a single static task and no generator.
+    _, tasks = exam_service.create_session(
+        user_id=user.id, topic_ids=["euler-cauchy"], size=3, duration_minutes=10, target_difficulty=3
+    )
+    assert [task.id for task in tasks] == ["euler-cauchy-1"]
+
+
+def test_submit_grades_the_ticket_in_the_pool(user):
+    session, tasks = exam_service.create_session(
+        user_id=user.id,
+        topic_ids=["ode-first-order", "laplace-transform"],
+        size=4,
+        duration_minutes=10,
+        target_difficulty=3,
+    )
+    answers = {task.id: task.expected for task in tasks if task.type in ("method-choice", "laplace")}
+    result = exam_service.submit(session.id, answers)
+    graded = {row["task_id"]: row for row in result["results"]}
+    assert result["total"] == len(tasks)
+    for task in tasks:
+        assert graded[task.id]["correct"] == (task.id in answers), graded[task.id]
+    with pytest.raises(exam_service.ExamSessionClosed):
+        exam_service.submit(session.id, answers)
+
+
+class _BrokenPool:
+    """A pool whose grading process died: the first future fails, later submits raise."""
+
+    def __init__(self) -> None:
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        if self.submitted > 1:
+            raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+        future = Future()
+        future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_broken_pool_falls_back_to_grading_in_place(user, monkeypatch):
+    session, tasks = exam_service.create_session(
+        user_id=user.id, topic_ids=["ode-first-order"], size=3, duration_minutes=10, target_difficulty=3
+    )
+    answers = {task.id: task.expected if task.type != "solve-ode" else "nan" for task in tasks}
+    pool = _BrokenPool()
+    monkeypatch.setattr(exam_service, "_executor", pool)
+    result = exam_service.submit(session.id, answers)
+    graded = {row["task_id"]: row["correct"] for row in result["results"]}
+    assert graded == {task.id: task.type != "solve-ode" for task in tasks}
+    assert exam_service._executor is not pool
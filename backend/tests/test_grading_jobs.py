@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+
+from backend.app import crud
+from backend.app.services import admission, exam_service, grading_jobs
+
+ITEMS = [
+    {"task_id": "fo-linear-1", "topic_id": "ode-first-order", "user_answer": "Метод интегрирующего множителя"},
+    {"task_id": "numeric-euler-1", "topic_id": "numerical-methods", "user_answer": "1.1"},
+]
+
+
+def _xp(user_id: int) -> int:
+    return crud.get_progress_payload(user_id)["xp"]
+
+
+def _interrupt(job_id: str) -> None:
+    """Run a job as far as its side effects and stop before marking it finished."""
+    job = grading_jobs._claim(job_id)
+    grading_jobs._run(job)
+
+
+def _after_the_lease() -> datetime:
+    return datetime.utcnow() + 2 * grading_jobs.LEASE
+
+
+def test_practice_job(user):
+    job = grading_jobs.submit_practice(user.id, ITEMS)
+    grading_jobs._process(job["job_id"])
+    done = grading_jobs.get(job["job_id"])
+    assert done["status"] == "done"
+    assert [item["correct"] for item in done["result"]] == [True, True]
+    assert _xp(user.id) == sum(item["xp_awarded"] for item in done["result"])
+
+
+def test_recovered_practice_job_does_not_count_answers_twice(user):
+    job_id = grading_jobs.submit_practice(user.id, ITEMS)["job_id"]
+    _interrupt(job_id)
+    xp = _xp(user.id)
+    assert grading_jobs.recover(now=_after_the_lease()) >= 1
+    grading_jobs._process(job_id)
+    assert grading_jobs.get(job_id)["status"] == "done"
+    assert _xp(user.id) == xp
+    assert crud.get_progress_payload(user.id)["progress"][0]["attempts"] == 1
+
+
+def test_recovered_exam_job_does_not_count_answers_twice(user):
+    session, tasks = exam_service.create_session(
+        user_id=user.id, topic_ids=["euler-cauchy"], size=1, duration_minutes=10, target_difficulty=3
+    )
+    job_id = grading_jobs.submit_exam(session.id, {tasks[0].id: True})["job_id"]
+    _interrupt(job_id)
+    xp = _xp(user.id)
+    assert xp > 0
+    grading_jobs.recover(now=_after_the_lease())
+    grading_jobs._process(job_id)
+    result = grading_jobs.get(job_id)["result"]
+    assert result["score"] == 1
+    assert _xp(user.id) == xp
+
+
+def test_recover_leaves_jobs_of_live_processes_alone(user):
+    job_id = grading_jobs.submit_practice(user.id, ITEMS[:1])["job_id"]
+    # Claimed by another server process that is still renewing its lease.
+    assert grading_jobs._claim(job_id) is not None
+    grading_jobs.recover()
+    assert grading_jobs.get(job_id)["status"] == "running"
+    grading_jobs._process(job_id)
+    assert grading_jobs.get(job_id)["status"] == "running"
+    grading_jobs.recover(now=_after_the_lease())
+    assert grading_jobs.get(job_id)["status"] == "queued"
+
+
+def test_renew_extends_only_the_jobs_this_process_runs(user, monkeypatch):
+    running = grading_jobs.submit_practice(user.id, ITEMS[:1])["job_id"]
+    dropped = grading_jobs.submit_practice(user.id, ITEMS[1:])["job_id"]
+    grading_jobs._claim(running)
+    grading_jobs._claim(dropped)
+    monkeypatch.setattr(grading_jobs, "_running", {running})
+    later = _after_the_lease()
+    grading_jobs._renew(later)
+    grading_jobs.recover(now=later)
+    assert grading_jobs.get(running)["status"] == "running"
+    assert grading_jobs.get(dropped)["status"] == "queued"
+
+
+def test_full_queue_keeps_the_exam_open(user, monkeypatch):
+    session, tasks = exam_service.create_session(
+        user_id=user.id, topic_ids=["euler-cauchy"], size=1, duration_minutes=10, target_difficulty=3
+    )
+    monkeypatch.setattr(grading_jobs, "MAX_QUEUED", 0)
+    with pytest.raises(admission.Overloaded):
+        grading_jobs.submit_exam(session.id, {tasks[0].id: True})
+    assert exam_service.load_session(session.id)[0].status == "active"
+    monkeypatch.setattr(grading_jobs, "MAX_QUEUED", 1000)
+    job_id = grading_jobs.submit_exam(session.id, {tasks[0].id: True})["job_id"]
+    grading_jobs._process(job_id)
+    assert grading_jobs.get(job_id)["result"]["score"] == 1
+
+
+def test_wait_reads_the_job_off_the_event_loop(user, monkeypatch):
+    job_id = grading_jobs.submit_practice(user.id, ITEMS[:1])["job_id"]
+    read = grading_jobs.get
+    threads = []
+
+    def _get(job_id: str) -> dict:
+        threads.append(threading.current_thread())
+        return read(job_id)
+
+    monkeypatch.setattr(grading_jobs, "get", _get)
+
+    async def _wait_while_graded() -> dict:
+        waiting = asyncio.create_task(grading_jobs.wait(job_id, 5))
+        await asyncio.sleep(0.05)
+        await asyncio.to_thread(grading_jobs._process, job_id)
+        return await waiting
+
+    assert asyncio.run(_wait_while_graded())["status"] == "done"
+    assert threads and threading.main_thread() not in threads
+
+
+def test_worker_survives_a_failing_finish(user, monkeypatch, caplog):
+    broken = grading_jobs.submit_practice(user.id, ITEMS[:1])["job_id"]
+    healthy = grading_jobs.submit_practice(user.id, ITEMS[1:])["job_id"]
+    finish = grading_jobs._finish
+
+    def _finish_once(job_id: str, **outcome) -> None:
+        if job_id == broken:
+            raise RuntimeError("database is locked")
+        finish(job_id, **outcome)
+
+    monkeypatch.setattr(grading_jobs, "_finish", _finish_once)
+    worker = threading.Thread(target=grading_jobs._worker)
+    worker.start()
+    # Queued after both jobs: an empty id stops the worker.
+    grading_jobs._queue.put((99, next(grading_jobs._sequence), ""))
+    worker.join(timeout=30)
+    assert not worker.is_alive()
+    assert grading_jobs.get(broken)["status"] == "running"
+    assert grading_jobs.get(healthy)["status"] == "done"
+    assert f"Не удалось завершить задание проверки {broken}" in caplog.text
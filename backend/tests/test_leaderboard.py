@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import random
+import threading
+
+from fastapi.testclient import TestClient
+
+from backend.app import crud
+from backend.app.main import app
+from backend.app.services import leaderboard
+from backend.app.services.leaderboard import RankIndex
+
+
+def _reference(scores: dict[int, int]) -> list[tuple[int, int, int]]:
+    ordered = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    rows = []
+    for position, (member, score) in enumerate(ordered):
+        rank = 1 + sum(1 for other in scores.values() if other > score)
+        rows.append((rank, member, score))
+    return rows
+
+
+def test_rank_index_matches_a_sorted_reference():
+    generator = random.Random(7)
+    index = RankIndex()
+    scores: dict[int, int] = {}
+    for _ in range(3000):
+        member = generator.randrange(200)
+        if generator.random() < 0.1:
+            index.remove(member)
+            scores.pop(member, None)
+        else:
+            score = generator.randrange(50)
+            index.update(member, score)
+            scores[member] = score
+    expected = _reference(scores)
+    assert len(index) == len(scores)
+    assert index.page(0, len(scores)) == expected
+    assert index.page(37, 20) == expected[37:57]
+    assert index.page(len(scores), 10) == []
+    for rank, member, score in expected:
+        assert index.rank(member) == rank
+        assert index.score(member) == score
+    assert index.rank(10_000) is None
+
+
+def test_equal_scores_share_a_rank():
+    index = RankIndex()
+    for member, score in [(1, 10), (2, 30), (3, 10), (4, 5)]:
+        index.update(member, score)
+    assert index.page(0, 10) == [(1, 2, 30), (2, 1, 10), (2, 3, 10), (4, 4, 5)]
+    assert index.page(2, 2) == [(2, 3, 10), (4, 4, 5)]
+
+
+def test_rebuild_does_not_lose_concurrent_updates(user):
+    crud.upsert_progress(
+        user_id=user.id, topic_id="first-order", correct=True, difficulty=1, time_spent_seconds=1
+    )
+    stop = threading.Event()
+
+    def _rebuild_repeatedly() -> None:
+        while not stop.is_set():
+            leaderboard.rebuild()
+
+    thread = threading.Thread(target=_rebuild_repeatedly)
+    thread.start()
+    try:
+        for _ in range(20):
+            crud.upsert_progress(
+                user_id=user.id, topic_id="first-order", correct=True, difficulty=1, time_spent_seconds=1
+            )
+    finally:
+        stop.set()
+        thread.join()
+    assert leaderboard.rank_of(user.id)["score"] == 21 * 20
+
+
+def test_cohort_membership_requires_admin(user, monkeypatch):
+    client = TestClient(app)
+    monkeypatch.delenv("VISHMAT_ADMIN_TOKEN", raising=False)
+    response = client.post("/api/cohorts/group-a/members", json={"user_id": user.id})
+    assert response.status_code == 403
+
+    monkeypatch.setenv("VISHMAT_ADMIN_TOKEN", "secret")
+    response = client.post(
+        "/api/cohorts/group-a/members", json={"user_id": user.id}, headers={"X-Admin-Token": "wrong"}
+    )
+    assert response.status_code == 403
+    response = client.post(
+        "/api/cohorts/group-a/members", json={"user_id": user.id}, headers={"X-Admin-Token": "secret"}
+    )
+    assert response.status_code == 200
+    assert leaderboard.rank_of(user.id, cohort_id="group-a") is not None
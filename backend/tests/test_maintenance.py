@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+from backend.app.services import maintenance
+
+ADMIN = {"X-Admin-Token": "admin-secret"}
+
+
+@pytest.fixture
+def blocked_backup(monkeypatch):
+    """Make backups wait until the returned event is set."""
+    release = threading.Event()
+
+    def _slow(*args):
+        release.wait(10)
+        return {}
+
+    monkeypatch.setattr(maintenance, "_backup", _slow)
+    yield release
+    release.set()
+    with maintenance._run_lock:
+        pass
+
+
+def test_backup_copies_the_database(tmp_path):
+    target = tmp_path / "copy.db"
+    result = maintenance.backup(target, pages=4, pause=0)
+    assert result["state"] == "done" and result["path"] == str(target)
+    connection = sqlite3.connect(target)
+    try:
+        assert connection.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+    finally:
+        connection.close()
+    assert maintenance.status()["last"]["backup"]["state"] == "done"
+
+
+def test_only_one_background_start_wins(blocked_backup):
+    outcomes = []
+    barrier = threading.Barrier(8)
+
+    def _start() -> None:
+        barrier.wait()
+        try:
+            maintenance.backup_in_background()
+            outcomes.append("started")
+        except maintenance.MaintenanceBusy:
+            outcomes.append("busy")
+
+    threads = [threading.Thread(target=_start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(outcomes) == ["busy"] * 7 + ["started"]
+    assert maintenance.status()["state"] == "running"
+
+
+def test_second_api_start_is_a_conflict(blocked_backup, monkeypatch):
+    monkeypatch.setenv("VISHMAT_ADMIN_TOKEN", ADMIN["X-Admin-Token"])
+    client = TestClient(app)
+    first = client.post("/api/admin/maintenance/backup", headers=ADMIN)
+    assert first.status_code == 202 and first.json()["task"] == "backup"
+    assert client.post("/api/admin/maintenance/vacuum", headers=ADMIN).status_code == 409
+    blocked_backup.set()
+    with maintenance._run_lock:
+        pass
+    assert maintenance.status()["state"] == "done"
+
+
+def test_failed_backups_back_off(monkeypatch):
+    attempts: list[datetime] = []
+
+    def _failing_backup() -> dict:
+        attempts.append(now)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(maintenance, "BACKUP_INTERVAL", timedelta(hours=1))
+    monkeypatch.setattr(maintenance, "VACUUM_INTERVAL", timedelta(0))
+    monkeypatch.setattr(maintenance, "_newest_backup", lambda: None)
+    monkeypatch.setattr(maintenance, "backup", _failing_backup)
+    start = datetime(2026, 1, 1)
+    schedule = maintenance._Schedule(start)
+    for minute in range(0, 300):
+        now = start + timedelta(minutes=minute)
+        schedule.tick(now)
+    minutes = [int((attempt - start).total_seconds() // 60) for attempt in attempts]
+    assert minutes == [0, 1, 3, 7, 15, 31, 63, 123, 183, 243]
+
+    monkeypatch.setattr(maintenance, "backup", lambda: {})
+    now = start + timedelta(minutes=303)
+    schedule.tick(now)
+    assert schedule.backup_failures == 0
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from fastapi.websockets import WebSocketDisconnect, WebSocketState
+
+from backend.app.main import app
+from backend.app.services import admission, practice_channel
+from backend.app.services.admission import RateLimiter
+from backend.app.services.practice_channel import PracticeChannel
+
+
+@pytest.fixture(autouse=True)
+def _fresh_rate_limiter(monkeypatch):
+    monkeypatch.setattr(admission, "check_rate_limiter", RateLimiter(rate=1.0, burst=5))
+
+
+def _connect(client: TestClient, user_id: int):
+    return client.websocket_connect(f"/api/practice/ws?user_id={user_id}")
+
+
+def test_generate_check_and_progress(user):
+    with _connect(TestClient(app), user.id) as socket:
+        assert socket.receive_json()["type"] == "progress"
+        socket.send_json(
+            {
+                "id": 1,
+                "type": "check",
+                "task_id": "numeric-euler-1",
+                "topic_id": "numerical-methods",
+                "user_answer": "1.1",
+            }
+        )
+        result = socket.receive_json()
+        assert (result["id"], result["type"], result["correct"]) == (1, "result", True)
+        delta = socket.receive_json()
+        assert delta["type"] == "progress-delta" and delta["xp"] > 0
+        socket.send_json({"id": 2, "type": "generate", "topic_id": "numerical-methods"})
+        reply = socket.receive_json()
+        assert reply["type"] == "task" and reply["task"]["expected"] is None
+
+
+@pytest.mark.parametrize(
+    "raw, detail",
+    [
+        ("not json", "Сообщение должно быть JSON-объектом"),
+        ("[1]", "Сообщение должно быть JSON-объектом"),
+        ('{"id": 5, "type": "dance"}', "Неизвестный тип сообщения"),
+    ],
+)
+def test_bad_messages_get_an_error_frame(user, raw, detail):
+    with _connect(TestClient(app), user.id) as socket:
+        socket.receive_json()
+        socket.send_text(raw)
+        assert socket.receive_json()["detail"] == detail
+
+
+def test_unexpected_error_is_reported_and_the_socket_stays_open(user, monkeypatch, caplog):
+    def _broken(request):
+        raise KeyError("template")
+
+    monkeypatch.setattr(practice_channel, "_generate", _broken)
+    with _connect(TestClient(app), user.id) as socket:
+        socket.receive_json()
+        socket.send_json({"id": 7, "type": "generate", "topic_id": "numerical-methods"})
+        assert socket.receive_json() == {"id": 7, "type": "error", "detail": "Внутренняя ошибка сервера"}
+        socket.send_json({"id": 8, "type": "progress"})
+        assert socket.receive_json()["id"] == 8
+    assert "Не удалось обработать сообщение практики" in caplog.text
+
+
+class _GoneSocket:
+    """A socket whose client has disconnected: every send fails."""
+
+    client = ("10.0.0.1", 1)
+    application_state = WebSocketState.CONNECTED
+    client_state = WebSocketState.DISCONNECTED
+
+    def __init__(self, messages: list[dict]) -> None:
+        self.messages = messages
+
+    async def receive(self) -> dict:
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.sleep(0.05)
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def send_text(self, text: str) -> None:
+        raise WebSocketDisconnect(1006)
+
+
+def test_dispatch_swallows_a_failed_reply(user):
+    channel = PracticeChannel(_GoneSocket([]), user.id)
+    asyncio.run(channel._dispatch('{"id": 1, "type": "dance"}'))
+    asyncio.run(channel._dispatch('{"id": 2, "type": "progress"}'))
+
+
+def test_closing_cancels_and_awaits_in_flight_messages(user):
+    socket = _GoneSocket([{"type": "websocket.receive", "text": '{"id": 1, "type": "progress"}'}])
+    socket.client_state = WebSocketState.CONNECTED
+    channel = PracticeChannel(socket, user.id)
+    jobs: list[asyncio.Task] = []
+
+    async def _send(message: dict) -> None:
+        pass
+
+    async def _hang(message_id, message) -> None:
+        jobs.append(asyncio.current_task())
+        await asyncio.sleep(60)
+
+    channel.send = _send
+    channel._handlers["progress"] = _hang
+    asyncio.run(asyncio.wait_for(channel.run(), timeout=5))
+    assert len(jobs) == 1 and jobs[0].cancelled()
+    assert not channel._pending
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from backend.app import crud
+from backend.app.services import progress_cache
+
+
+def _answer(user_id: int) -> None:
+    crud.upsert_progress(
+        user_id=user_id, topic_id="first-order", correct=True, difficulty=1, time_spent_seconds=5
+    )
+
+
+def test_answers_update_a_cached_snapshot(user):
+    assert crud.get_progress_payload(user.id)["xp"] == 0
+    _answer(user.id)
+    cached = progress_cache.get(user.id)
+    assert cached is not None and cached["xp"] == 20
+    assert crud.get_progress_payload(user.id)["progress"][0]["attempts"] == 1
+
+
+def test_answer_during_a_cache_miss_is_not_overwritten(user, monkeypatch):
+    progress_cache.invalidate(user.id)
+    load = crud._load_progress_payload
+
+    def _load_then_answer(user_id: int) -> dict:
+        payload = load(user_id)
+        # The answer commits after the reader loaded its payload but before it
+        # caches it; apply_answer finds no snapshot to update.
+        _answer(user_id)
+        return payload
+
+    monkeypatch.setattr(crud, "_load_progress_payload", _load_then_answer)
+    stale = crud.get_progress_payload(user.id)
+    monkeypatch.undo()
+
+    assert stale["xp"] == 0
+    assert progress_cache.get(user.id) is None
+    assert crud.get_progress_payload(user.id)["xp"] == 20
+
+
+def test_put_drops_snapshots_older_than_a_write(user):
+    token = progress_cache.generation(user.id)
+    progress_cache.invalidate(user.id)
+    assert not progress_cache.put(user.id, {"xp": -1}, token)
+    token = progress_cache.generation(user.id)
+    progress_cache.clear()
+    assert not progress_cache.put(user.id, {"xp": -1}, token)
+    assert progress_cache.get(user.id) is None
+
+
+def test_generations_are_bounded(monkeypatch):
+    monkeypatch.setattr(progress_cache, "MAX_USERS", 4)
+    for user_id in range(10_000, 10_020):
+        progress_cache.invalidate(user_id)
+        token = progress_cache.generation(user_id)
+        progress_cache.put(user_id, {"xp": user_id}, token)
+    assert len(progress_cache._generations) <= 4
+    assert progress_cache.size() <= 4
+
+
+def test_forgotten_generation_still_rejects_a_stale_put(monkeypatch):
+    monkeypatch.setattr(progress_cache, "MAX_USERS", 2)
+    token = progress_cache.generation(20_000)
+    # A write for the user, then enough writes for others to forget it.
+    progress_cache.invalidate(20_000)
+    for user_id in range(20_001, 20_005):
+        progress_cache.invalidate(user_id)
+    assert 20_000 not in progress_cache._generations
+    assert not progress_cache.put(20_000, {"xp": -1}, token)
+    token = progress_cache.generation(20_000)
+    assert progress_cache.put(20_000, {"xp": 1}, token)
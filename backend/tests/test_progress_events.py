@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import pytest
+from sqlmodel import select
+
+from backend.app import crud
+from backend.app.database import get_session
+from backend.app.models import AnswerEvent, TopicAccuracy
+from backend.app.services import progress_events
+
+
+def _answer(user_id: int, correct: bool = True) -> None:
+    progress_events.record_answer(
+        user_id=user_id,
+        task_id="t-1",
+        topic_id="first-order",
+        correct=correct,
+        difficulty=1,
+        duration_seconds=10,
+        xp_gain=20 if correct else 5,
+    )
+
+
+def _events(user_id: int) -> int:
+    with get_session() as session:
+        return len(session.exec(select(AnswerEvent).where(AnswerEvent.user_id == user_id)).all())
+
+
+def test_flush_writes_events_and_rollups(user):
+    progress_events.flush()
+    _answer(user.id, correct=True)
+    _answer(user.id, correct=False)
+    progress_events.flush()
+    assert progress_events.pending_count() == 0
+    assert _events(user.id) == 2
+    with get_session() as session:
+        accuracy = session.get(TopicAccuracy, (user.id, "first-order"))
+    assert (accuracy.attempts, accuracy.correct) == (2, 1)
+
+
+def test_failed_flush_keeps_the_batch(user, monkeypatch):
+    progress_events.flush()
+    monkeypatch.setattr(progress_events, "FLUSH_INTERVAL_SECONDS", 3600.0)
+    _answer(user.id)
+
+    def _broken(session, batch):
+        raise RuntimeError("disk I/O error")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(progress_events, "_apply_rollups", _broken)
+        with pytest.raises(RuntimeError):
+            progress_events.flush()
+    assert progress_events.pending_count() == 1
+    assert progress_events.flush() == 1
+    assert _events(user.id) == 1
+
+
+def test_flush_error_does_not_fail_the_answer(user, monkeypatch):
+    progress_events.flush()
+    monkeypatch.setattr(progress_events, "BATCH_SIZE", 1)
+    monkeypatch.setattr(progress_events, "_apply_rollups", lambda session, batch: 1 / 0)
+    _, progress, gains = crud.upsert_progress(
+        user_id=user.id, topic_id="first-order", correct=True, difficulty=1, time_spent_seconds=5
+    )
+    assert progress.completed_lessons == 1
+    assert gains["xp_gain"] == 20
+    assert progress_events.pending_count() == 1
+    monkeypatch.undo()
+    progress_events.flush()
+    assert _events(user.id) == 1
+
+
+def test_progress_is_read_while_the_flush_fails(user, monkeypatch):
+    progress_events.flush()
+    monkeypatch.setattr(progress_events, "FLUSH_INTERVAL_SECONDS", 3600.0)
+    crud.upsert_progress(user_id=user.id, topic_id="first-order", correct=True, difficulty=1, time_spent_seconds=5)
+    with monkeypatch.context() as patched:
+        patched.setattr(progress_events, "_apply_rollups", lambda session, batch: 1 / 0)
+        payload = crud.get_progress_payload(user.id)
+    assert payload["xp"] == 20
+    assert progress_events.pending_count() == 1
+    # The snapshot without the rollups was not cached.
+    assert crud.get_progress_payload(user.id)["daily_xp"][0]["answers"] == 1
+
+
+def test_buffer_drops_the_oldest_events_past_the_cap(user, monkeypatch):
+    progress_events.flush()
+    monkeypatch.setattr(progress_events, "FLUSH_INTERVAL_SECONDS", 3600.0)
+    monkeypatch.setattr(progress_events, "MAX_PENDING", 2)
+    dropped = progress_events.stats()["dropped"]
+    _answer(user.id, correct=False)
+    _answer(user.id)
+    _answer(user.id)
+    assert progress_events.stats()["dropped"] == dropped + 1
+    assert [event["correct"] for event in progress_events._pending] == [True, True]
+    with monkeypatch.context() as patched:
+        patched.setattr(progress_events, "_apply_rollups", lambda session, batch: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            progress_events.flush()
+        _answer(user.id)
+    assert progress_events.pending_count() == 2
+    assert progress_events.stats()["dropped"] == dropped + 2
+    assert progress_events.flush() == 2
+
+
+def test_background_flusher_drains_a_quiet_buffer(user, monkeypatch):
+    progress_events.flush()
+    monkeypatch.setattr(progress_events, "FLUSH_INTERVAL_SECONDS", 3600.0)
+    _answer(user.id)
+    stop = progress_events.start_flusher(interval=0.05)
+    try:
+        for _ in range(100):
+            if _events(user.id):
+                break
+            stop.wait(0.05)
+    finally:
+        stop.set()
+    assert _events(user.id) == 1
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app import crud
+from backend.app.main import app
+from backend.app.services import progress_transfer
+
+TOKEN = "admin-secret"
+
+
+@pytest.fixture
+def admin(monkeypatch) -> TestClient:
+    monkeypatch.setenv("VISHMAT_ADMIN_TOKEN", TOKEN)
+    return TestClient(app)
+
+
+def _row(email: str, **fields) -> str:
+    return json.dumps({"email": email, "xp": 30, "topic_id": "first-order", "completed_lessons": 2, **fields})
+
+
+def _import(client: TestClient, lines: list[str], **params):
+    return client.post(
+        "/api/admin/import",
+        content="\n".join(lines).encode("utf-8"),
+        headers={"X-Admin-Token": TOKEN},
+        params=params,
+    )
+
+
+def test_import_merges_rows(admin):
+    email = f"{uuid.uuid4().hex[:8]}@university.ru"
+    response = _import(admin, [_row(email), "", _row(email, topic_id="second-order")])
+    assert response.status_code == 200
+    assert response.json() == {"users_created": 1, "users_updated": 0, "topics_merged": 2}
+    user = crud.get_or_create_user(email, email)
+    assert crud.get_progress_payload(user.id)["xp"] == 30
+
+
+@pytest.mark.parametrize(
+    "line, detail",
+    [
+        ("{not json", "Строка 3: некорректный JSON"),
+        ("[1, 2]", "Строка 3: ожидался JSON-объект"),
+        ('{"xp": 10}', "Строка 3: нет поля email"),
+        ('{"email": "a@b.ru", "xp": "много"}', "Строка 3: поле xp должно быть числом"),
+        ('{"email": "a@b.ru", "last_active": "вчера"}', "Строка 3: поле last_active должно быть датой ГГГГ-ММ-ДД"),
+    ],
+)
+def test_malformed_line_is_a_400_with_its_number(admin, line, detail):
+    email = f"{uuid.uuid4().hex[:8]}@university.ru"
+    response = _import(admin, [_row(email), "", line])
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
+
+
+def test_rows_without_email_go_to_the_given_account(admin, user):
+    response = _import(admin, ['{"xp": 50, "topic_id": "first-order"}'], email=user.email)
+    assert response.status_code == 200
+    assert crud.get_progress_payload(user.id)["xp"] == 50
+
+
+def test_line_numbers_continue_across_chunks():
+    lines = [b""] * 5 + [b"{"]
+    rows = progress_transfer.read_ndjson(lines, first_line=501)
+    with pytest.raises(progress_transfer.MalformedRow) as error:
+        list(rows)
+    assert error.value.line == 506
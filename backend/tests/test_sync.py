@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import delete, select
+
+from backend.app import crud
+from backend.app.database import get_session
+from backend.app.main import app
+from backend.app.models import ChangeLog, SyncReceipt, User
+from backend.app.services import sync as protocol
+from desktop_app.sync import AppTransport, SyncClient, client_from_env
+
+TOKEN = "sync-secret"
+
+
+class _LostReply(AppTransport):
+    """Delivers the first batch but loses the server's reply."""
+
+    def __init__(self, app, token: str) -> None:
+        super().__init__(app, token)
+        self.pushes = 0
+
+    def push(self, body: bytes) -> dict:
+        self.pushes += 1
+        receipt = super().push(body)
+        if self.pushes == 1:
+            raise ConnectionResetError("connection reset by peer")
+        return receipt
+
+
+@pytest.fixture
+def client_state(tmp_path, monkeypatch):
+    """A client that has synced before, with a drained change log."""
+    monkeypatch.setenv("VISHMAT_SYNC_TOKEN", TOKEN)
+    protocol.acknowledge(10**9)
+    path = tmp_path / "sync-state.json"
+    path.write_text(json.dumps({"client_id": uuid.uuid4().hex, "version": 0}), encoding="utf-8")
+    return path
+
+
+def _answer(user_id: int, topic_id: str = "first-order") -> None:
+    crud.upsert_progress(user_id=user_id, topic_id=topic_id, correct=True, difficulty=2, time_spent_seconds=5)
+
+
+def _account(email: str) -> User:
+    with get_session() as session:
+        return session.exec(select(User).where(User.email == email)).one()
+
+
+def _remote(email: str) -> dict:
+    return crud.get_progress_payload(_account(email).id)
+
+
+def _answer_on_the_server(email: str, topic_id: str) -> None:
+    """An answer on the web; client and server share one database here, so its log entry is dropped."""
+    account = _account(email)
+    _answer(account.id, topic_id)
+    _drop_from_log(ChangeLog.user_id == account.id)
+
+
+def _drop_from_log(condition) -> None:
+    with get_session() as session:
+        session.exec(delete(ChangeLog).where(condition))
+        session.commit()
+
+
+def _lessons(email: str, topic_id: str) -> int:
+    return next(row for row in _remote(email)["progress"] if row["topic_id"] == topic_id)["completed_lessons"]
+
+
+def _email() -> str:
+    return f"remote-{uuid.uuid4().hex[:8]}@university.ru"
+
+
+def test_push_merges_into_the_server_account(user, client_state):
+    _answer(user.id)
+    _answer(user.id)
+    email = _email()
+    client = SyncClient(AppTransport(app, TOKEN), email=email, state_path=client_state)
+    assert client.push() == {"batches": 1, "rows": 1}
+    assert protocol.pending_count() == 0
+    remote = _remote(email)
+    assert remote["xp"] == 80
+    assert remote["progress"][0]["completed_lessons"] == 2
+    assert client.push() == {"batches": 0, "rows": 0}
+
+
+def test_retry_after_a_lost_reply_changes_nothing(user, client_state):
+    _answer(user.id)
+    email = _email()
+    transport = _LostReply(app, TOKEN)
+    client = SyncClient(transport, email=email, state_path=client_state)
+    with pytest.raises(ConnectionResetError):
+        client.push()
+    # The server applied the batch, the client still has it in its log.
+    assert protocol.pending_count() > 0
+    assert client.push() == {"batches": 1, "rows": 1}
+    assert transport.pushes == 2
+    assert protocol.pending_count() == 0
+    assert _remote(email)["progress"][0]["completed_lessons"] == 1
+    state = json.loads(client_state.read_text(encoding="utf-8"))
+    with get_session() as session:
+        assert session.get(SyncReceipt, state["client_id"]).version == state["version"]
+
+
+def test_gap_resends_the_full_state(user, client_state):
+    _answer(user.id)
+    email = _email()
+    client = SyncClient(AppTransport(app, TOKEN), email=email, state_path=client_state)
+    # The client believes the server has acknowledged more than it has, e.g.
+    # after the server was restored from an older backup.
+    client.state["version"] = 10**8
+    assert client.push()["batches"] >= 1
+    assert protocol.pending_count() == 0
+    assert _remote(email)["progress"][0]["completed_lessons"] >= 1
+    with get_session() as session:
+        assert session.get(SyncReceipt, client.state["client_id"]).version == client.state["version"]
+
+
+def test_progress_on_both_sides_adds_up(user, client_state):
+    topic_id = f"topic-{uuid.uuid4().hex[:8]}"
+    email = _email()
+    client = SyncClient(AppTransport(app, TOKEN), email=email, state_path=client_state)
+    _answer(user.id, topic_id)
+    client.push()
+    # The student answers on the web and on the desktop before the next sync.
+    _answer_on_the_server(email, topic_id)
+    _answer(user.id, topic_id)
+    _answer(user.id, topic_id)
+    client.push()
+    assert _lessons(email, topic_id) == 4
+    assert _remote(email)["xp"] == 4 * 40
+
+
+def test_full_resend_after_a_gap_adds_only_what_is_new(user, client_state, monkeypatch):
+    seed = protocol.seed_log
+
+    def _seed_this_install() -> int:
+        # Only the desktop user lives in the client's database.
+        seeded = seed()
+        _drop_from_log(ChangeLog.user_id != user.id)
+        return seeded
+
+    monkeypatch.setattr(protocol, "seed_log", _seed_this_install)
+    topic_id = f"topic-{uuid.uuid4().hex[:8]}"
+    email = _email()
+    client = SyncClient(AppTransport(app, TOKEN), email=email, state_path=client_state)
+    _answer(user.id, topic_id)
+    client.push()
+    _answer_on_the_server(email, topic_id)
+    _answer(user.id, topic_id)
+    client.state["version"] = 10**8
+    client.push()
+    assert _lessons(email, topic_id) == 3
+    assert client.push() == {"batches": 0, "rows": 0}
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [[{"xp": 10}], [{"email": "a@b.ru", "xp": "10"}], ["row"], [{"email": "a@b.ru", "topic_total": "yes"}]],
+)
+def test_malformed_rows_are_a_400(client_state, rows):
+    batch = protocol.Batch(client_id=uuid.uuid4().hex, since=0, until=1, rows=rows)
+    response = TestClient(app).post(
+        "/api/sync/push",
+        content=protocol.encode_batch(batch),
+        headers={"Content-Encoding": "gzip", "X-Sync-Token": TOKEN},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Неверный формат пакета синхронизации")
+
+
+def test_email_is_required(client_state, monkeypatch):
+    with pytest.raises(ValueError):
+        SyncClient(AppTransport(app, TOKEN), email="", state_path=client_state)
+    monkeypatch.setenv("VISHMAT_SYNC_URL", "https://vishmat.example.ru")
+    monkeypatch.delenv("VISHMAT_SYNC_EMAIL", raising=False)
+    with pytest.raises(ValueError):
+        client_from_env()
+    monkeypatch.setenv("VISHMAT_SYNC_EMAIL", "student@university.ru")
+    assert client_from_env().email == "student@university.ru"
+
+
+@pytest.mark.parametrize("email", [crud.DEFAULT_USER_EMAIL, None])
+def test_server_refuses_the_demo_account(client_state, email):
+    batch = protocol.Batch(
+        client_id=uuid.uuid4().hex,
+        since=0,
+        until=1,
+        rows=[{"email": crud.DEFAULT_USER_EMAIL, "xp": 10}],
+        email=email,
+    )
+    response = TestClient(app).post(
+        "/api/sync/push",
+        content=protocol.encode_batch(batch),
+        headers={"Content-Encoding": "gzip", "X-Sync-Token": TOKEN},
+    )
+    assert response.status_code == 400
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from backend.app.data import topics
+from backend.app.services import task_service
+from backend.app.services.task_service import Singleflight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = Singleflight()
+    calls = []
+    entered = threading.Event()
+
+    def _slow() -> int:
+        calls.append(1)
+        entered.set()
+        time.sleep(0.2)
+        return 42
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", _slow)))
+    leader.start()
+    entered.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", _slow))) for _ in range(5)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+    assert results == [42] * 6
+    assert len(calls) == 1
+    # Nothing is cached once the call is over.
+    assert flight.do("key", lambda: 7) == 7
+
+
+def test_followers_get_the_leaders_exception():
+    flight = Singleflight()
+    entered, release = threading.Event(), threading.Event()
+
+    def _failing() -> None:
+        entered.set()
+        release.wait(5)
+        raise RuntimeError("grader crashed")
+
+    errors = []
+
+    def _call() -> None:
+        try:
+            flight.do("key", _failing)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    leader = threading.Thread(target=_call)
+    leader.start()
+    entered.wait(5)
+    follower = threading.Thread(target=_call)
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in (leader, follower):
+        thread.join()
+    assert errors == ["grader crashed"] * 2
+    assert not flight._calls
+
+
+def test_distinct_keys_run_separately():
+    flight = Singleflight()
+    assert [flight.do(key, lambda key=key: key * 2) for key in (1, 2, 3)] == [2, 4, 6]
+
+
+@pytest.mark.parametrize(
+    "task_id, topic_id, first, second, shared",
+    [
+        ("fo-linear-2", "ode-first-order", "C*exp(-x) + exp(x)/2", " C*exp(-x)  +\texp(x)/2\n", True),
+        ("fo-linear-2", "ode-first-order", "exp(1 0*x)", "exp(10*x)", False),
+        ("fo-linear-2", "ode-first-order", "x y", "xy", False),
+        ("so-characteristic-1", "ode-second-order", "Два", " Два", False),
+        ("numeric-euler-1", "numerical-methods", 1.1, "1.1", False),
+    ],
+)
+def test_coalescing_key(task_id, topic_id, first, second, shared):
+    task = topics.find_task(task_id, topic_id)
+    keys = task_service._canonical_answer(task, first), task_service._canonical_answer(task, second)
+    assert (keys[0] == keys[1]) is shared
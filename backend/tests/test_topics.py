@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import shutil
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.data import topics
+from backend.app.data.topics import Hint, Task
+from backend.app.main import app
+
+
+def _task(number: int) -> Task:
+    return Task(
+        id=f"t-{number}",
+        topic_id="first-order",
+        title="Задача",
+        type="numeric",
+        prompt="…",
+        difficulty=1,
+        hints=[{"level": 1, "text": f"Подсказка {number}"}],
+        options=["a", "b"],
+    )
+
+
+def test_equal_hints_and_options_are_shared():
+    first, second = _task(1), Task(**{**_task(1).to_record(), "id": "t-other"})
+    assert first.hints is second.hints
+    assert first.options is second.options
+    assert first.hints == (Hint(1, "Подсказка 1"),)
+
+
+def test_interning_table_is_bounded(monkeypatch):
+    monkeypatch.setattr(topics, "_INTERN_LIMIT", 16)
+    for number in range(100):
+        _task(number)
+    assert len(topics._INTERNED) <= 16
+    # The options tuple is used by every task, so it is never evicted.
+    assert ("a", "b") in topics._INTERNED
+
+
+def test_reload_drops_the_interning_table():
+    _task(1)
+    assert topics._INTERNED
+    topics.reload()
+    assert not topics._INTERNED
+
+
+@pytest.fixture
+def two_courses(tmp_path):
+    shutil.copy(topics.COURSES_DIR / "diffeq.json", tmp_path / "diffeq.json")
+    extra = {
+        "format": topics.COURSE_FORMAT,
+        "id": "extra",
+        "title": "Дополнительный курс",
+        "topics": [{"id": "extra-topic", "title": "Тема"}, {"id": "extra-empty", "title": "Пустая тема"}],
+        "tasks": [
+            {
+                "id": "extra-1",
+                "topic_id": "extra-topic",
+                "title": "Задача",
+                "type": "theory",
+                "prompt": "…",
+                "difficulty": 1,
+                "hints": [],
+                "expected": True,
+            }
+        ],
+    }
+    (tmp_path / "extra.json").write_text(json.dumps(extra, ensure_ascii=False), encoding="utf-8")
+    topics.reload(tmp_path)
+    yield
+    topics.reload()
+
+
+def test_find_task_looks_in_every_loaded_course(two_courses):
+    assert topics.course("extra") is not None
+    assert topics.find_task("extra-1", "ode-first-order").id == "extra-1"
+    assert topics.find_task("fo-ivp-1", "extra-topic").id == "fo-ivp-1"
+    assert topics.find_task("missing", "extra-topic") is None
+
+
+@pytest.mark.parametrize("topic_id", ["no-such-topic", "extra-empty"])
+def test_sample_task_without_tasks_raises(two_courses, topic_id):
+    with pytest.raises(topics.TopicNotFound):
+        topics.sample_task(topic_id, 3)
+
+
+def test_unknown_topic_is_a_404(two_courses, user):
+    client = TestClient(app)
+    response = client.post(
+        "/api/practice/check",
+        json={"user_id": user.id, "task_id": "missing", "topic_id": "extra-empty", "user_answer": "1"},
+    )
+    assert response.status_code == 404
+    assert client.post("/api/practice/generate", json={"topic_id": "no-such-topic"}).status_code == 404
+    response = client.post(
+        "/api/practice/check",
+        json={"user_id": user.id, "task_id": "extra-1", "topic_id": "ode-first-order", "user_answer": True},
+    )
+    assert response.json()["correct"] is True
+
+
+def test_unknown_topic_over_the_websocket(two_courses, user):
+    with TestClient(app).websocket_connect(f"/api/practice/ws?user_id={user.id}") as socket:
+        socket.receive_json()
+        socket.send_json({"id": 1, "type": "generate", "topic_id": "extra-empty"})
+        assert socket.receive_json() == {"id": 1, "type": "error", "detail": "Тема не найдена"}
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 import socket
 import threading
 import time
@@ -8,7 +9,14 @@ from typing import Tuple
 import uvicorn
 import webview
 
-from backend.app import app as fastapi_app
+# Exam tickets are graded in threads here: a process pool is not worth it for a
+# single local user and needs extra care in a frozen PyInstaller build.
+os.environ.setdefault("VISHMAT_GRADING_PROCESSES", "0")
+# Local changes are logged so they can be pushed to a central server.
+os.environ.setdefault("VISHMAT_SYNC_LOG", "1")
+
+from backend.app import app as fastapi_app  # noqa: E402
+from desktop_app import sync  # noqa: E402
 
 SERVER_HOST = "127.0.0.1"
 SERVER_PORT = 8321
@@ -50,7 +58,13 @@ def stop_backend(server: uvicorn.Server, thread: threading.Thread) -> None:
 
 
 def main() -> None:
+    # Checked first: a sync misconfiguration is reported before any window opens.
+    sync_client = sync.client_from_env()
     server, thread = start_backend()
+    stop_sync = None
+    if sync_client is not None:
+        interval = float(os.getenv("VISHMAT_SYNC_INTERVAL", sync.DEFAULT_INTERVAL_SECONDS))
+        stop_sync = sync.start_background_sync(sync_client, interval)
     try:
         webview.create_window(
             title="VishMat Trainer",
@@ -61,6 +75,8 @@ def main() -> None:
         )
         webview.start()
     finally:
+        if stop_sync is not None:
+            stop_sync.set()
         stop_backend(server, thread)
 
 
@@ -15,7 +15,14 @@ project_root = spec_path.parent.parent
 
 block_cipher = None
 
-datas = [(str(project_root / "docs"), "docs")]
+catalog_dir = project_root / "backend" / "app" / "data"
+datas = [
+    (str(project_root / "docs"), "docs"),
+    (str(catalog_dir / "courses"), "backend/app/data/courses"),
+]
+# Built by `python -m app.cli build-snapshot`; without them courses are built on first use.
+if (catalog_dir / "snapshots").exists():
+    datas.append((str(catalog_dir / "snapshots"), "backend/app/data/snapshots"))
 
 hiddenimports = collect_submodules("sqlmodel") + collect_submodules("sympy")
 
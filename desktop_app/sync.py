@@ -0,0 +1,183 @@
+"""Push local progress to a central VishMat server in small compressed batches.
+
+    python -m desktop_app.sync --url https://vishmat.example.ru --token $TOKEN --email student@university.ru
+
+The embedded app runs the same loop in a background thread when
+``VISHMAT_SYNC_URL`` is set.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Protocol
+
+from backend.app.database import DATABASE_FILE, init_db
+from backend.app.services import sync as protocol
+
+STATE_FILE = DATABASE_FILE.with_name("sync-state.json")
+DEFAULT_INTERVAL_SECONDS = 300.0
+REQUEST_TIMEOUT_SECONDS = 30.0
+
+
+class Transport(Protocol):
+    def push(self, body: bytes) -> dict[str, Any]:
+        """Send an encoded batch; raise ``protocol.SyncGap`` on a 409 reply."""
+
+
+class HttpTransport:
+    def __init__(self, base_url: str, token: str, timeout: float = REQUEST_TIMEOUT_SECONDS) -> None:
+        self.url = base_url.rstrip("/") + "/api/sync/push"
+        self.token = token
+        self.timeout = timeout
+
+    def push(self, body: bytes) -> dict[str, Any]:
+        request = urllib.request.Request(
+            self.url,
+            data=body,
+            method="POST",
+            headers={
+                "Content-Type": "application/json",
+                "Content-Encoding": "gzip",
+                "X-Sync-Token": self.token,
+            },
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as exc:
+            if exc.code == 409:
+                raise protocol.SyncGap(json.loads(exc.read())["detail"]["version"]) from exc
+            raise
+
+
+class AppTransport:
+    """Push straight into an ASGI app, e.g. a stand-in server in tests (needs httpx)."""
+
+    def __init__(self, app: Any, token: str) -> None:
+        from fastapi.testclient import TestClient
+
+        self.client = TestClient(app)
+        self.token = token
+
+    def push(self, body: bytes) -> dict[str, Any]:
+        response = self.client.post(
+            "/api/sync/push",
+            content=body,
+            headers={"Content-Encoding": "gzip", "X-Sync-Token": self.token},
+        )
+        if response.status_code == 409:
+            raise protocol.SyncGap(response.json()["detail"]["version"])
+        response.raise_for_status()
+        return response.json()
+
+
+class SyncClient:
+    """Drains the local change log; the state file keeps the client id and receipt.
+
+    ``email`` is the account on the server. It is required: without it rows
+    would go out under the local demo account that every install shares.
+    """
+
+    def __init__(self, transport: Transport, *, email: str, state_path: Path = STATE_FILE) -> None:
+        if not email:
+            raise ValueError("Укажите учётную запись на сервере (VISHMAT_SYNC_EMAIL или --email)")
+        self.transport = transport
+        self.email = email
+        self.state_path = state_path
+        self.state = self._load_state()
+
+    def _load_state(self) -> dict[str, Any]:
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self) -> None:
+        temporary = self.state_path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self.state), encoding="utf-8")
+        os.replace(temporary, self.state_path)
+
+    def push(self) -> dict[str, int]:
+        """Send everything pending; returns how many batches and rows went out."""
+        if not self.state.get("client_id"):
+            # First sync: progress made before the log was on must go out too.
+            protocol.seed_log()
+            self.state = {"client_id": uuid.uuid4().hex, "version": 0}
+            self._save_state()
+        totals = {"batches": 0, "rows": 0}
+        while True:
+            batch = protocol.pending_batch(self.state["client_id"], self.state["version"], email=self.email)
+            if batch is None:
+                return totals
+            try:
+                receipt = self.transport.push(protocol.encode_batch(batch))
+            except protocol.SyncGap as gap:
+                # The server lost changes this client already dropped: resend
+                # the full state; the server adds only what it has not counted
+                # from this client yet.
+                protocol.seed_log()
+                self.state["version"] = gap.version
+                self._save_state()
+                continue
+            protocol.acknowledge(receipt["version"])
+            self.state["version"] = receipt["version"]
+            self._save_state()
+            totals["batches"] += 1
+            totals["rows"] += len(batch.rows)
+
+
+def start_background_sync(
+    client: SyncClient,
+    interval: float = DEFAULT_INTERVAL_SECONDS,
+    on_error: Callable[[Exception], None] | None = None,
+) -> threading.Event:
+    """Push every ``interval`` seconds until the returned event is set."""
+    stop = threading.Event()
+
+    def _loop() -> None:
+        while not stop.is_set():
+            try:
+                client.push()
+            except Exception as exc:  # the server may be unreachable; retry later
+                if on_error:
+                    on_error(exc)
+            stop.wait(interval)
+
+    threading.Thread(target=_loop, name="vishmat-sync", daemon=True).start()
+    return stop
+
+
+def client_from_env() -> SyncClient | None:
+    """The client configured by ``VISHMAT_SYNC_*``; ``ValueError`` if the email is missing."""
+    url = os.getenv("VISHMAT_SYNC_URL")
+    if not url:
+        return None
+    transport = HttpTransport(url, os.getenv("VISHMAT_SYNC_TOKEN", ""))
+    return SyncClient(transport, email=os.getenv("VISHMAT_SYNC_EMAIL", ""))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Синхронизация прогресса с сервером VishMat")
+    parser.add_argument("--url", default=os.getenv("VISHMAT_SYNC_URL"), required=not os.getenv("VISHMAT_SYNC_URL"))
+    parser.add_argument("--token", default=os.getenv("VISHMAT_SYNC_TOKEN", ""))
+    parser.add_argument(
+        "--email",
+        default=os.getenv("VISHMAT_SYNC_EMAIL"),
+        required=not os.getenv("VISHMAT_SYNC_EMAIL"),
+        help="учётная запись на сервере",
+    )
+    args = parser.parse_args()
+    init_db()
+    client = SyncClient(HttpTransport(args.url, args.token), email=args.email)
+    totals = client.push()
+    print(f"Отправлено пакетов: {totals['batches']}, строк: {totals['rows']}")
+
+
+if __name__ == "__main__":
+    main()
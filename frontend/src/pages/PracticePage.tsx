@@ -136,17 +136,22 @@ export default function PracticePage() {
     setHintLevel((prev) => Math.min(maxLevel, prev + 1));
   };
 
+  const isNumericTable = task?.validation?.type === 'numeric-table';
+
   const prepareAnswer = () => {
     if (!task) return null;
     switch (task.type) {
       case 'solve-ode':
+      case 'solve-system':
+      case 'laplace':
         return expression.trim() ? expression.trim() : null;
       case 'method-choice':
         return selectedOption || null;
       case 'theory':
         return truthValue;
       case 'numeric':
-        return numericAnswer.trim() ? Number(numericAnswer) : null;
+        if (!numericAnswer.trim()) return null;
+        return isNumericTable ? numericAnswer.trim() : Number(numericAnswer);
       case 'match':
         if (!task.pairs) return null;
         return matchAnswers.map((answer) => task.pairs?.findIndex((pair) => pair.right === answer));
@@ -193,6 +198,28 @@ export default function PracticePage() {
             disabled={loading || isTimerExpired}
           />
         );
+      case 'solve-system':
+        return (
+          <FormulaInput
+            value={expression}
+            onChange={setExpression}
+            placeholder={
+              task.validation?.mode === 'eigen'
+                ? 'Например: 2: 1, 1; -1: 1, -2'
+                : 'Например: y1 = C1*exp(2*t) + C2*exp(-t); y2 = C1*exp(2*t) - 2*C2*exp(-t)'
+            }
+            disabled={loading || isTimerExpired}
+          />
+        );
+      case 'laplace':
+        return (
+          <FormulaInput
+            value={expression}
+            onChange={setExpression}
+            placeholder="Например: 2/(s - 3) + 2/(s**2 + 4)"
+            disabled={loading || isTimerExpired}
+          />
+        );
       case 'method-choice':
         return (
           <div className="space-y-2">
@@ -241,12 +268,13 @@ export default function PracticePage() {
       case 'numeric':
         return (
           <input
-            type="number"
+            type={isNumericTable ? 'text' : 'number'}
             value={numericAnswer}
             step="0.001"
+            placeholder={isNumericTable ? '1.1; 1.22; 1.362' : undefined}
             onChange={(event) => setNumericAnswer(event.target.value)}
             disabled={loading || isTimerExpired}
-            className="w-40 rounded border border-slate-300 p-2 dark:border-slate-600 dark:bg-slate-800"
+            className={`${isNumericTable ? 'w-80' : 'w-40'} rounded border border-slate-300 p-2 dark:border-slate-600 dark:bg-slate-800`}
           />
         );
       case 'match':
@@ -1,4 +1,4 @@
-export type TaskType = 'method-choice' | 'solve-ode' | 'match' | 'numeric' | 'theory';
+export type TaskType = 'method-choice' | 'solve-ode' | 'solve-system' | 'laplace' | 'match' | 'numeric' | 'theory';
 
 export interface Hint {
   level: number;
@@ -43,6 +43,14 @@ export interface ProgressEntry {
   completed_lessons: number;
   best_score: number;
   xp_earned: number;
+  attempts?: number;
+  accuracy?: number;
+}
+
+export interface DailyXpEntry {
+  day: string;
+  xp: number;
+  answers: number;
 }
 
 export interface ProgressPayload {
@@ -52,4 +60,5 @@ export interface ProgressPayload {
   last_active: string;
   daily_goal_minutes: number;
   progress: ProgressEntry[];
+  daily_xp?: DailyXpEntry[];
 }